@@ -1,63 +1,152 @@
 import asyncio
 import json
+import time
 import uuid
+from contextlib import aclosing
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
+import os
+import re
 
-from models import Repository, CommitEvent, AgentJob, PullRequest, TestResult
-from fake_runner import FakeTestRunner, FakeCodeAnalyzer
+from models import Repository, CommitEvent, AgentJob, PullRequest, TestResult, CodeAnalysis
+from fake_runner import FakeTestRunner, FakeCodeAnalyzer, FakeBenchmarkRunner
+from code_analyzer import StaticCodeAnalyzer
+from benchmark_runner import BenchmarkRunner, format_report, summarize_report
+from analysis_cache import AnalysisCache
+from pytest_runner import PytestRunner
+from impact_map import ImpactMapStore
 from llm_client import OllamaClient
+from ollama_http import HTTPOllamaClient
+from llm_cache import CachedLLMClient, ResponseCache
+from llm_scheduler import LLMScheduler, JobBudget, BudgetExceededError, current_budget
+from llm_stream import StreamWatcher
 from git_client import MockGitClient
+from local_git import LocalGitClient
 from slack_client import MockSlackClient
 from jira_client import MockJiraClient
+from phase_graph import PhaseGraph
+from push_events import changed_paths
+from diff_engine import git_output
+from ordered_logs import OrderedLogs
 
 logger = logging.getLogger(__name__)
 
+# Traceback entries name files relative to the checkout, e.g. "src/auth.py:42: in validate_token"
+_TRACEBACK_FILE_RE = re.compile(r"(?<![\w/.])([\w.-]+(?:/[\w.-]+)*\.py):\d+")
+
 class AutonomousAgent:
-    def __init__(self):
-        self.test_runner = FakeTestRunner()
-        self.code_analyzer = FakeCodeAnalyzer()
-        self.llm_client = OllamaClient()
-        self.git_client = MockGitClient()
+    def __init__(self, max_parallel_fixes: int = 4, cache_dir: Optional[str] = None, llm_concurrency: int = 2, llm_token_budget: int = 50000, llm_time_budget: float = 600, ollama_url: Optional[str] = None, git_cache_dir: Optional[str] = None, git_cache_max_bytes: int = 2 * 1024 ** 3, test_workers: Optional[int] = None, test_timeout: float = 60, test_impact: bool = True, test_warm_workers: bool = True, analysis_workers: Optional[int] = None, benchmark_seconds: float = 120, min_improvement: float = 15):
+        # Real checkouts get their tests run and their code analyzed for real, otherwise results are simulated
+        if git_cache_dir:
+            impact = ImpactMapStore(os.path.join(git_cache_dir, "impact")) if test_impact else None
+            self.test_runner = PytestRunner(test_workers, test_timeout, impact=impact, warm=test_warm_workers)
+            self.code_analyzer = StaticCodeAnalyzer(AnalysisCache(os.path.join(git_cache_dir, "analysis.sqlite3")), analysis_workers)
+            self.benchmark_runner = BenchmarkRunner(max_seconds=benchmark_seconds)
+        else:
+            self.test_runner = FakeTestRunner()
+            self.code_analyzer = FakeCodeAnalyzer()
+            self.benchmark_runner = FakeBenchmarkRunner()
+        # Optimizations need at least this much less time, at the benchmarks' confidence bound, to get a PR
+        self.min_improvement = min_improvement
+        self.llm_cache = ResponseCache(os.path.join(cache_dir, "llm_responses.sqlite3") if cache_dir else None)
+        # Talk to a real Ollama server when one is configured, otherwise use the mock
+        self.llm_backend = HTTPOllamaClient(ollama_url) if ollama_url else OllamaClient()
+        self.llm_scheduler = LLMScheduler(self.llm_backend, max_concurrency=llm_concurrency)
+        self.llm_client = CachedLLMClient(self.llm_scheduler, self.llm_cache)
+        self.llm_token_budget = llm_token_budget
+        self.llm_time_budget = llm_time_budget
+        # Check out real code from cached mirrors when a git cache is configured, otherwise use the mock
+        self.git_client = LocalGitClient(git_cache_dir, git_cache_max_bytes) if git_cache_dir else MockGitClient()
         self.slack_client = MockSlackClient()
         self.jira_client = MockJiraClient()
         
+        # Bounds how many failed tests of one job are analyzed and fixed at the same time
+        self.max_parallel_fixes = max_parallel_fixes
+        
     async def process_commit(self, repository: Repository, commit_event: CommitEvent, job: AgentJob) -> Dict[str, Any]:
         """Main workflow: analyze commit, run tests, propose fixes, create PRs"""
         
-        job.logs.append(f"🚀 Starting analysis for commit {commit_event.commit_hash[:8]}")
+        if len(commit_event.commits) > 1:
+            base = commit_event.base_hash[:8] if commit_event.base_hash else "root"
+            job.logs.append(f"🚀 Starting analysis for {len(commit_event.commits)} commits {base}..{commit_event.commit_hash[:8]}")
+        else:
+            job.logs.append(f"🚀 Starting analysis for commit {commit_event.commit_hash[:8]}")
         
-        # Phase 1: Repository Connection & Initial Analysis
-        result = await self._phase_1_analysis(repository, commit_event, job)
+        # Every LLM call made on behalf of this job, including from phase tasks, draws on one budget
+        budget = JobBudget(self.llm_token_budget, self.llm_time_budget)
+        budget_token = current_budget.set(budget)
         
-        # Phase 2: Improvements & Optimizations
-        if result.get("fixes_applied"):
-            improvement_result = await self._phase_2_improvements(repository, commit_event, job)
-            result.update(improvement_result)
+        try:
+            result, timings = await self._run_phases(repository, commit_event, job)
+        finally:
+            current_budget.reset(budget_token)
         
-        # Phase 3: Roadmap Awareness
-        roadmap_result = await self._phase_3_roadmap(repository, commit_event, job)
-        result.update(roadmap_result)
+        job.logs.append(f"🧮 LLM usage: {budget.calls} calls, ~{budget.tokens_used} tokens")
         
         # Send notifications
+        started = time.perf_counter()
         await self._send_notifications(repository, result, job)
+        timings["notifications"] = round(time.perf_counter() - started, 3)
+        
+        job.phase_timings = timings
         
         return result
     
+    async def close(self):
+        """Release network connections, cache handles and test workers"""
+        if hasattr(self.llm_backend, "aclose"):
+            await self.llm_backend.aclose()
+        if hasattr(self.test_runner, "close"):
+            await self.test_runner.close()
+        if hasattr(self.code_analyzer, "close"):
+            self.code_analyzer.close()
+        self.llm_cache.close()
+    
+    async def _run_phases(self, repository: Repository, commit_event: CommitEvent, job: AgentJob):
+        """Run the analysis, improvement and roadmap phases as a dependency graph"""
+        
+        graph = PhaseGraph()
+        
+        # Phase 1: Repository Connection & Initial Analysis
+        graph.add_phase("analysis", lambda deps: self._phase_1_analysis(repository, commit_event, job))
+        
+        # Phase 2: Improvements & Optimizations, only once phase 1 has applied fixes
+        graph.add_phase(
+            "improvements",
+            lambda deps: self._phase_2_if_fixed(repository, commit_event, job, deps["analysis"]),
+            depends_on=["analysis"]
+        )
+        
+        # Phase 3: Roadmap Awareness, independent of the commit's test results
+        graph.add_phase("roadmap", lambda deps: self._phase_3_roadmap(repository, commit_event, job))
+        
+        return await graph.run()
+    
     async def _phase_1_analysis(self, repository: Repository, commit_event: CommitEvent, job: AgentJob) -> Dict[str, Any]:
         """Phase 1: Clone repo, run tests, find errors, propose fixes"""
         
         job.logs.append("📥 Cloning repository...")
-        await asyncio.sleep(1)  # Simulate clone time
         
-        # Mock clone repository
-        clone_result = await self.git_client.clone_repository(repository.url)
+        clone_result = await self.git_client.clone_repository(repository.url, commit_event.commit_hash)
         job.logs.append(f"✅ Repository cloned to {clone_result['path']}")
         
+        try:
+            return await self._analyze_checkout(repository, commit_event, job, clone_result['path'])
+        finally:
+            await self.git_client.remove_worktree(clone_result['path'])
+    
+    async def _analyze_checkout(self, repository: Repository, commit_event: CommitEvent, job: AgentJob, repo_path: str) -> Dict[str, Any]:
+        """Run the test suite on a checkout and propose fixes for what fails"""
+        
         # Run initial tests
         job.logs.append("🧪 Running test suite...")
-        test_results = await self.test_runner.run_tests(clone_result['path'])
+        range_files = await self._range_files(commit_event, repo_path)
+        selection = await self.test_runner.select_tests(repo_path, repository.id, commit_event.base_hash, range_files)
+        if selection is not None:
+            scope = "full suite" if selection.full else "affected tests only"
+            job.logs.append(f"🎯 Running {scope}: {selection.reason}")
+        test_results = await self.test_runner.run_tests(repo_path, selection)
         
         failed_tests = [t for t in test_results if t.status == "failed"]
         job.logs.append(f"📊 Test Results: {len(test_results)} total, {len(failed_tests)} failed")
@@ -74,101 +163,281 @@ class AutonomousAgent:
             # Analyze failed tests and propose fixes
             job.logs.append("🔍 Analyzing failed tests...")
             
-            for failed_test in failed_tests:
-                job.logs.append(f"🐛 Analyzing failure: {failed_test.test_name}")
+            logs = OrderedLogs(job.logs, len(failed_tests))
+            fix_slots = asyncio.Semaphore(self.max_parallel_fixes)
+            
+            tasks = [
+                asyncio.create_task(self._fix_failed_test(repository, commit_event, repo_path, failed_test, index, logs, fix_slots))
+                for index, failed_test in enumerate(failed_tests)
+            ]
+            try:
+                pull_requests = await asyncio.gather(*tasks)
+            except BaseException:
+                # One fix failing or the job being cancelled stops the others and their worktrees
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            
+            result["pull_requests"] = [pr for pr in pull_requests if pr is not None]
+            result["fixes_applied"] = bool(result["pull_requests"])
+        
+        else:
+            job.logs.append("✅ All tests passing, looking for optimization opportunities...")
+        
+        return result
+    
+    async def _fix_failed_test(self, repository: Repository, commit_event: CommitEvent, repo_path: str, failed_test: TestResult, index: int, logs: OrderedLogs, fix_slots: asyncio.Semaphore) -> Optional[PullRequest]:
+        """Analyze, fix and re-test one failure in its own worktree; returns the PR if the fix holds"""
+        
+        async with fix_slots:
+            try:
+                worktree = await self.git_client.create_worktree(repo_path, f"fix-{index}")
                 
-                # Get LLM analysis and fix
-                fix_analysis = await self.llm_client.analyze_test_failure(
-                    failed_test.test_name,
-                    failed_test.error_message,
-                    commit_event.message
-                )
+                try:
+                    return await self._fix_in_worktree(repository, commit_event, worktree['path'], failed_test, index, logs)
+                except BudgetExceededError as e:
+                    logs.append(index, f"⏱️ Skipping {failed_test.test_name}: {str(e)}")
+                    return None
+                finally:
+                    await self.git_client.remove_worktree(worktree['path'])
+            finally:
+                logs.close(index)
+    
+    async def _fix_in_worktree(self, repository: Repository, commit_event: CommitEvent, worktree_path: str, failed_test: TestResult, index: int, logs: OrderedLogs) -> Optional[PullRequest]:
+        logs.append(index, f"🐛 Analyzing failure: {failed_test.test_name}")
+        
+        # Stream the LLM analysis: reasoning reaches the job log as it is generated,
+        # and the fix is applied as soon as its code block is complete
+        fix_analysis = None
+        apply_task = None
+        watcher = StreamWatcher()
+        
+        try:
+            async for event in self.llm_client.stream_analyze_test_failure(
+                failed_test.test_name,
+                failed_test.error_message,
+                commit_event.message,
+                source=self._failure_source(repository, worktree_path, failed_test)
+            ):
+                if event["type"] == "token":
+                    lines, _ = watcher.feed(event["text"])
+                    for line in lines:
+                        logs.append(index, f"💭 {line}")
                 
-                job.logs.append(f"🤖 LLM proposed fix for {failed_test.test_name}")
+                elif event["type"] == "code" and event["field"] == "fix_code" and apply_task is None:
+                    logs.append(index, f"🤖 LLM proposed fix for {failed_test.test_name}")
+                    
+                    # Apply fix (simulated) while the rest of the response streams in
+                    apply_task = asyncio.create_task(self.git_client.apply_fix(
+                        worktree_path,
+                        failed_test.test_name,
+                        event["code"]
+                    ))
                 
-                # Apply fix (simulated)
+                elif event["type"] == "result":
+                    fix_analysis = event["data"]
+            
+            for line in watcher.flush():
+                logs.append(index, f"💭 {line}")
+            
+            # A truncated or unparsable response ends the stream without a result
+            if fix_analysis is None or not fix_analysis.get('fix_code'):
+                logs.append(index, f"❌ LLM returned no fix for {failed_test.test_name}")
+                if apply_task is not None:
+                    apply_task.cancel()
+                    await asyncio.gather(apply_task, return_exceptions=True)
+                return None
+            
+            if apply_task is None:
+                logs.append(index, f"🤖 LLM proposed fix for {failed_test.test_name}")
                 fix_result = await self.git_client.apply_fix(
-                    clone_result['path'],
+                    worktree_path,
                     failed_test.test_name,
                     fix_analysis['fix_code']
                 )
-                
-                # Test the fix
-                job.logs.append(f"🔄 Testing fix for {failed_test.test_name}...")
-                retest_results = await self.test_runner.run_specific_test(
-                    clone_result['path'], 
-                    failed_test.test_name
-                )
-                
-                if retest_results.status == "passed":
-                    job.logs.append(f"✅ Fix successful for {failed_test.test_name}")
-                    
-                    # Create pull request
-                    pr = await self._create_pull_request(
-                        repository,
-                        f"fix: resolve {failed_test.test_name}",
-                        fix_analysis,
-                        [retest_results],
-                        "bug_fix"
-                    )
-                    
-                    result["pull_requests"].append(pr)
-                    result["fixes_applied"] = True
-                    
-                else:
-                    job.logs.append(f"❌ Fix failed for {failed_test.test_name}")
+            else:
+                fix_result = await apply_task
+        
+        except BaseException:
+            if apply_task is not None:
+                apply_task.cancel()
+            raise
+        
+        if fix_result['status'] != "success":
+            logs.append(index, f"❌ Could not apply the fix for {failed_test.test_name}: it does not replace any existing code")
+            return None
+        
+        # Test the fix
+        logs.append(index, f"🔄 Testing fix for {failed_test.test_name}...")
+        retest_results = await self.test_runner.run_specific_test(
+            worktree_path, 
+            failed_test.test_name
+        )
         
-        else:
-            job.logs.append("✅ All tests passing, looking for optimization opportunities...")
+        if retest_results.status != "passed":
+            logs.append(index, f"❌ Fix failed for {failed_test.test_name}")
+            return None
         
-        return result
+        logs.append(index, f"✅ Fix successful for {failed_test.test_name}")
+        
+        # Create pull request
+        return await self._create_pull_request(
+            repository,
+            f"fix: resolve {failed_test.test_name}",
+            fix_analysis,
+            [retest_results],
+            "bug_fix",
+            worktree_path
+        )
+    
+    def _failure_source(self, repository: Repository, repo_path: str, failed_test: TestResult) -> Optional[str]:
+        """The failing test's file and the modules it ran, so an analysis is only reused for the same code"""
+        paths = {failed_test.test_name.split("::")[0]}
+        paths.update(self.test_runner.covered_files(repository.id, failed_test.test_name))
+        for match in _TRACEBACK_FILE_RE.finditer(failed_test.error_message or ""):
+            path = os.path.normpath(match.group(1))
+            if not path.startswith(".."):
+                paths.add(path)
+        
+        sources = []
+        for path in sorted(paths):
+            content = self._read_source(repo_path, path)
+            if content is not None:
+                sources.append(f"# {path}\n{content}")
+        
+        return "\n".join(sources) or None
+    
+    def _read_source(self, repo_path: str, relative_path: str) -> Optional[str]:
+        """Read a file from a working copy, or None when it is not on disk"""
+        try:
+            with open(os.path.join(repo_path, relative_path), encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    async def _phase_2_if_fixed(self, repository: Repository, commit_event: CommitEvent, job: AgentJob, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Run phase 2 only when phase 1 applied at least one fix"""
+        if not analysis_result.get("fixes_applied"):
+            return {}
+        
+        return await self._phase_2_improvements(repository, commit_event, job)
     
     async def _phase_2_improvements(self, repository: Repository, commit_event: CommitEvent, job: AgentJob) -> Dict[str, Any]:
         """Phase 2: Code optimizations and improvements"""
         
         job.logs.append("🚀 Phase 2: Analyzing code for improvements...")
         
-        # Analyze code for optimization opportunities
-        analysis_results = await self.code_analyzer.analyze_codebase("/tmp/repo")
+        if not isinstance(self.git_client, LocalGitClient):
+            return await self._improve_checkout(repository, commit_event, job, "/tmp/repo")
+        
+        # Phase 1's checkout is gone by now; mirrors make a second one cheap
+        clone_result = await self.git_client.clone_repository(repository.url, commit_event.commit_hash)
+        try:
+            return await self._improve_checkout(repository, commit_event, job, clone_result['path'])
+        finally:
+            await self.git_client.remove_worktree(clone_result['path'])
+    
+    async def _range_files(self, commit_event: CommitEvent, repo_path: str) -> Optional[List[str]]:
+        """Files changed by the whole pushed range base_hash..head, or None when the range is unknown"""
+        if not commit_event.base_hash:
+            return None
+        
+        diff = await git_output(repo_path, "diff", "--name-only", "--no-renames", commit_event.base_hash, "HEAD")
+        if diff is not None:
+            return [line for line in diff.splitlines() if line]
         
+        # Simulated checkouts, or a base the mirror does not have: use the files the payload lists
+        return changed_paths(commit_event.commits) or None
+    
+    async def _improve_checkout(self, repository: Repository, commit_event: CommitEvent, job: AgentJob, repo_path: str) -> Dict[str, Any]:
+        """Analyze a checkout and propose optimizations for the hottest files the push changed"""
+        
+        # Analyses stream in as files are parsed, so optimization starts with the first hot file
         improvements = []
+        analyzed = 0
+        
+        range_files = await self._range_files(commit_event, repo_path)
+        if range_files is not None:
+            job.logs.append(f"🎯 Looking for optimizations in the {len(range_files)} files changed by the push")
+        
+        try:
+            async with aclosing(self.code_analyzer.analyze_codebase(repo_path, repository.id)) as analyses:
+                async for analysis in analyses:
+                    analyzed += 1
+                    if range_files is not None and analysis.file_path not in range_files:
+                        continue
+                    if analysis.complexity_score > 7:  # High complexity
+                        job.logs.append(f"🎯 Found optimization opportunity in {analysis.file_path}")
+                        for issue in analysis.issues[:3]:
+                            if "line" in issue:
+                                job.logs.append(f"💭 {analysis.file_path}:{issue['line']} {issue['description']}")
+                        
+                        # Get LLM optimization suggestions
+                        optimization = await self.llm_client.suggest_optimization(
+                            analysis.file_path,
+                            analysis.issues,
+                            analysis.suggestions,
+                            source=self._read_source(repo_path, analysis.file_path)
+                        )
+                        
+                        job.logs.append(f"🤖 LLM suggested optimization: {optimization['type']}")
+                        
+                        pr = await self._measure_optimization(repository, job, repo_path, analysis, optimization, analyzed)
+                        
+                        if pr is not None:
+                            improvements.append(pr)
+                            job.logs.append(f"✅ Created optimization PR: {pr.title}")
+        except BudgetExceededError as e:
+            job.logs.append(f"⏱️ Stopping optimizations: {str(e)}")
         
-        for analysis in analysis_results:
-            if analysis.complexity_score > 7:  # High complexity
-                job.logs.append(f"🎯 Found optimization opportunity in {analysis.file_path}")
-                
-                # Get LLM optimization suggestions
-                optimization = await self.llm_client.suggest_optimization(
-                    analysis.file_path,
-                    analysis.issues,
-                    analysis.suggestions
-                )
-                
-                job.logs.append(f"🤖 LLM suggested optimization: {optimization['type']}")
-                
-                # Apply optimization (simulated)
-                await asyncio.sleep(0.5)  # Simulate optimization time
-                
-                # Test optimization
-                test_results = await self.test_runner.run_performance_tests("/tmp/repo")
-                
-                if optimization['estimated_improvement'] > 15:  # Significant improvement
-                    pr = await self._create_pull_request(
-                        repository,
-                        f"perf: {optimization['title']}",
-                        optimization,
-                        test_results,
-                        "optimization"
-                    )
-                    
-                    improvements.append(pr)
-                    job.logs.append(f"✅ Created optimization PR: {pr.title}")
+        job.logs.append(f"📐 Analyzed {analyzed} files")
         
         return {
             "phase_2_improvements": len(improvements),
             "optimization_prs": improvements
         }
     
+    async def _measure_optimization(self, repository: Repository, job: AgentJob, repo_path: str, analysis: CodeAnalysis, optimization: Dict[str, Any], index: int) -> Optional[PullRequest]:
+        """Apply an optimization in its own worktree; returns a PR only if the benchmarks show it pays off"""
+        
+        worktree = await self.git_client.create_worktree(repo_path, f"opt-{index}")
+        try:
+            apply_result = await self.git_client.apply_fix(worktree['path'], analysis.file_path, optimization['optimization_code'])
+            if apply_result['status'] != "success":
+                job.logs.append(f"🤷 The optimization for {analysis.file_path} does not replace any existing code")
+                return None
+            
+            # Time the affected functions before and after the change
+            job.logs.append(f"⏱️ Benchmarking {', '.join(apply_result['modified_files'])}...")
+            report = await self.benchmark_runner.compare(repo_path, worktree['path'], apply_result['modified_files'])
+            for line in summarize_report(report):
+                job.logs.append(f"📏 {line}")
+            
+            if report.improvement is None or report.improvement <= self.min_improvement:
+                if report.error:
+                    reason = report.error
+                elif report.improvement is None:
+                    reason = "no size was timed both before and after"
+                else:
+                    reason = f"only {report.improvement:.0f}% faster at the 95% confidence bound"
+                job.logs.append(f"📉 No optimization PR for {analysis.file_path}: {reason}")
+                return None
+            
+            # Test optimization
+            test_results = await self.test_runner.run_performance_tests(worktree['path'])
+            
+            return await self._create_pull_request(
+                repository,
+                f"perf: {optimization['title']}",
+                {**optimization, "measured_improvement": report.improvement, "benchmark": format_report(report)},
+                test_results,
+                "optimization",
+                worktree['path']
+            )
+        finally:
+            await self.git_client.remove_worktree(worktree['path'])
+    
     async def _phase_3_roadmap(self, repository: Repository, commit_event: CommitEvent, job: AgentJob) -> Dict[str, Any]:
         """Phase 3: Roadmap-aware development"""
         
@@ -182,51 +451,54 @@ class AutonomousAgent:
         if upcoming_features:
             job.logs.append(f"📋 Found {len(upcoming_features)} upcoming features")
             
-            for feature in upcoming_features[:2]:  # Limit to 2 features for demo
-                job.logs.append(f"🎯 Analyzing feature: {feature.summary}")
-                
-                # Check if current changes align with roadmap
-                alignment_analysis = await self.llm_client.analyze_roadmap_alignment(
-                    commit_event.message,
-                    feature.description,
-                    feature.summary
-                )
-                
-                if alignment_analysis['alignment_score'] > 0.7:
-                    job.logs.append(f"✅ High alignment with {feature.key}")
+            try:
+                for feature in upcoming_features[:2]:  # Limit to 2 features for demo
+                    job.logs.append(f"🎯 Analyzing feature: {feature.summary}")
                     
-                    # Suggest preparatory work
-                    prep_work = await self.llm_client.suggest_preparatory_work(
+                    # Check if current changes align with roadmap
+                    alignment_analysis = await self.llm_client.analyze_roadmap_alignment(
+                        commit_event.message,
                         feature.description,
-                        commit_event.message
+                        feature.summary
                     )
                     
-                    if prep_work['suggestions']:
-                        pr = await self._create_pull_request(
-                            repository,
-                            f"feat: prepare for {feature.summary}",
-                            prep_work,
-                            [],
-                            "roadmap_preparation"
+                    if alignment_analysis['alignment_score'] > 0.7:
+                        job.logs.append(f"✅ High alignment with {feature.key}")
+                        
+                        # Suggest preparatory work
+                        prep_work = await self.llm_client.suggest_preparatory_work(
+                            feature.description,
+                            commit_event.message
                         )
                         
-                        roadmap_tasks.append(pr)
-                        job.logs.append(f"🚀 Created roadmap preparation PR: {pr.title}")
-        
+                        if prep_work['suggestions']:
+                            pr = await self._create_pull_request(
+                                repository,
+                                f"feat: prepare for {feature.summary}",
+                                prep_work,
+                                [],
+                                "roadmap_preparation"
+                            )
+                            
+                            roadmap_tasks.append(pr)
+                            job.logs.append(f"🚀 Created roadmap preparation PR: {pr.title}")
+            except BudgetExceededError as e:
+                job.logs.append(f"⏱️ Stopping roadmap analysis: {str(e)}")
+            
         return {
             "phase_3_roadmap": len(roadmap_tasks),
             "roadmap_prs": roadmap_tasks,
             "upcoming_features": len(upcoming_features)
         }
     
-    async def _create_pull_request(self, repository: Repository, title: str, analysis: Dict, test_results: List, pr_type: str) -> PullRequest:
+    async def _create_pull_request(self, repository: Repository, title: str, analysis: Dict, test_results: List, pr_type: str, repo_path: Optional[str] = None) -> PullRequest:
         """Create a pull request with analysis and test results"""
         
         pr_id = str(uuid.uuid4())
         branch_name = f"agent/{pr_type}-{uuid.uuid4().hex[:8]}"
         
-        # Generate diff based on analysis
-        diff = await self.git_client.generate_diff(analysis.get('fix_code', analysis.get('optimization_code', '')))
+        # Diff the working copy the change was applied to, when there is one
+        diff = await self.git_client.generate_diff(analysis.get('fix_code', analysis.get('optimization_code', '')), repo_path)
         
         # Create reasoning section
         reasoning = self._generate_reasoning(analysis, pr_type)
@@ -282,11 +554,7 @@ I identified a performance bottleneck with complexity score {analysis.get('compl
 
 {analysis.get('optimization_description', 'Implemented a more efficient algorithm.')}
 
-## 📈 Expected Impact
-
-- **Performance**: ~{analysis.get('estimated_improvement', 20)}% improvement
-- **Scalability**: Better handling of larger datasets
-- **Resource Usage**: Reduced memory/CPU consumption
+{self._format_impact(analysis)}
             """.strip()
         
         elif pr_type == "roadmap_preparation":
@@ -308,6 +576,27 @@ This change prepares the codebase for upcoming feature: {analysis.get('feature_n
         
         return "Automated improvement by AI agent."
     
+    def _format_impact(self, analysis: Dict) -> str:
+        """Measured benchmark results when there are some, the LLM's estimate otherwise"""
+        
+        if "benchmark" not in analysis:
+            return f"""
+## 📈 Expected Impact
+
+- **Performance**: ~{analysis.get('estimated_improvement', 20)}% improvement
+- **Scalability**: Better handling of larger datasets
+- **Resource Usage**: Reduced memory/CPU consumption
+            """.strip()
+        
+        benchmark = "\n".join(analysis['benchmark'])
+        return f"""
+## 📈 Measured Impact
+
+At least {analysis['measured_improvement']:.1f}% less time at the largest input measured, at 95% confidence.
+
+{benchmark}
+        """.strip()
+    
     def _format_pr_description(self, analysis: Dict, test_results: List, reasoning: str, pr_type: str) -> str:
         """Format the complete PR description"""
         
@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import CodeAnalysis
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"files": 0, "functions": 0, "issues": 0, "issue_types": {}}
+
+def _issue_types(analysis: CodeAnalysis) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for issue in analysis.issues:
+        counts[issue.get("type", "unknown")] = counts.get(issue.get("type", "unknown"), 0) + 1
+    return counts
+
+def _apply(totals: Dict[str, Any], files: int, functions: int, issues: int, issue_types: Dict[str, int], sign: int):
+    totals["files"] += sign * files
+    totals["functions"] += sign * functions
+    totals["issues"] += sign * issues
+    for kind, count in issue_types.items():
+        remaining = totals["issue_types"].get(kind, 0) + sign * count
+        if remaining:
+            totals["issue_types"][kind] = remaining
+        else:
+            totals["issue_types"].pop(kind, None)
+
+class AnalysisCache:
+    """SQLite store for static analysis results.
+
+    File results are keyed by git blob, path and analyzer version, so a file
+    is only parsed again when its content or the analyzer changes, in any
+    repository. Per repository it keeps the last analyzed commit, one row
+    per analyzed file and running totals that are adjusted by each file's
+    old and new row, so an update costs as much as the files it touches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS file_analyses (
+                blob TEXT NOT NULL,
+                path TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                analysis TEXT NOT NULL,
+                PRIMARY KEY (blob, path, version)
+            );
+            CREATE TABLE IF NOT EXISTS repository_files (
+                repository_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                blob TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                functions INTEGER NOT NULL,
+                issues INTEGER NOT NULL,
+                issue_types TEXT NOT NULL,
+                PRIMARY KEY (repository_id, path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_repository_files_score ON repository_files (repository_id, score);
+            CREATE TABLE IF NOT EXISTS repository_state (
+                repository_id TEXT PRIMARY KEY,
+                commit_hash TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                totals TEXT NOT NULL,
+                analyzed_at REAL NOT NULL
+            );
+        """)
+
+    def get_analysis(self, blob: str, path: str, version: int) -> Optional[CodeAnalysis]:
+        with self._lock:
+            row = self._db.execute("SELECT analysis FROM file_analyses WHERE blob = ? AND path = ? AND version = ?", (blob, path, version)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CodeAnalysis.model_validate_json(row[0])
+
+    def put_analyses(self, version: int, entries: Iterable[Tuple[str, CodeAnalysis]]):
+        """Store (blob, analysis) pairs"""
+        rows = [(blob, analysis.file_path, version, analysis.model_dump_json()) for blob, analysis in entries]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO file_analyses (blob, path, version, analysis) VALUES (?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+
+    def get_state(self, repository_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT commit_hash, version, totals, analyzed_at FROM repository_state WHERE repository_id = ?", (repository_id,)).fetchone()
+        if row is None:
+            return None
+        return {"commit": row[0], "version": row[1], "totals": json.loads(row[2]), "analyzed_at": row[3]}
+
+    def update_repository(self, repository_id: str, commit: str, version: int, removed: List[str], updated: List[Tuple[str, CodeAnalysis]], reset: bool = False) -> Dict[str, Any]:
+        """Move a repository's state to ``commit``; returns the new totals.
+
+        ``removed`` are paths that no longer have an analysis, ``updated``
+        are (blob, analysis) pairs for new or changed files. With ``reset``
+        everything recorded for the repository is replaced.
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                row = None if reset else self._db.execute("SELECT totals FROM repository_state WHERE repository_id = ?", (repository_id,)).fetchone()
+                totals = json.loads(row[0]) if row else _empty_totals()
+                if reset:
+                    self._db.execute("DELETE FROM repository_files WHERE repository_id = ?", (repository_id,))
+                else:
+                    # Take every touched path's old row out of the totals, then add the new ones in
+                    touched = removed + [analysis.file_path for _, analysis in updated]
+                    for path in touched:
+                        old = self._db.execute("SELECT functions, issues, issue_types FROM repository_files WHERE repository_id = ? AND path = ?", (repository_id, path)).fetchone()
+                        if old is not None:
+                            _apply(totals, 1, old[0], old[1], json.loads(old[2]), -1)
+                    self._db.executemany("DELETE FROM repository_files WHERE repository_id = ? AND path = ?", [(repository_id, path) for path in touched])
+
+                rows = []
+                for blob, analysis in updated:
+                    issue_types = _issue_types(analysis)
+                    _apply(totals, 1, analysis.functions, len(analysis.issues), issue_types, 1)
+                    rows.append((repository_id, analysis.file_path, blob, analysis.complexity_score, analysis.functions, len(analysis.issues), json.dumps(issue_types)))
+                self._db.executemany("INSERT INTO repository_files (repository_id, path, blob, score, functions, issues, issue_types) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+                self._db.execute(
+                    "INSERT OR REPLACE INTO repository_state (repository_id, commit_hash, version, totals, analyzed_at) VALUES (?, ?, ?, ?, ?)",
+                    (repository_id, commit, version, json.dumps(totals), time.time())
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return totals
+
+    def hot_files(self, repository_id: str, min_score: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT path, score, functions, issues FROM repository_files WHERE repository_id = ? AND score >= ? ORDER BY score DESC, path LIMIT ?",
+                (repository_id, min_score, limit)
+            ).fetchall()
+        return [{"path": path, "score": score, "functions": functions, "issues": issues} for path, score, functions, issues in rows]
+
+    def remove_repository(self, repository_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM repository_files WHERE repository_id = ?", (repository_id,))
+            self._db.execute("DELETE FROM repository_state WHERE repository_id = ?", (repository_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,15 +1,28 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import asyncio
+import base64
+import hashlib
 import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
+import os
 
 from agent import AutonomousAgent
+from local_git import LocalGitClient
+from pytest_runner import PytestRunner
+from code_analyzer import StaticCodeAnalyzer
 from models import Repository, CommitEvent, AgentJob, JobStatus
+from job_queue import JobQueue, QueueFullError
+from storage import JobCursor, create_store
+from stats import JobStats
+from job_events import JobEventHub
+from push_events import commit_event_from_push, merge_commit_events
+from webhook_ingest import DeliveryDeduper, InvalidSignatureError, RetryLater, WebhookIngestor, WebhookLog
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,24 +37,128 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# In-memory storage for demo (in production, use a database)
-repositories: Dict[str, Repository] = {}
-jobs: Dict[str, AgentJob] = {}
-agent = AutonomousAgent()
-
-class WebhookPayload(BaseModel):
-    repository: Dict
-    commits: List[Dict]
-    ref: str
-    pusher: Dict
+# Persistent repository and job storage; AGENT_DB_PATH=:memory: keeps everything in memory
+store = create_store(
+    os.getenv("AGENT_DB_PATH", "/tmp/agent_data/agent.sqlite3"),
+    retention_days=int(os.getenv("AGENT_JOB_RETENTION_DAYS", "30")),
+    max_jobs=int(os.getenv("AGENT_MAX_STORED_JOBS", "10000"))
+)
+job_stats = JobStats()
+job_stats.load(store.job_counts(), store.job_times_since(datetime.now() - timedelta(days=1)))
+store.add_listener(job_stats.on_job_change)
+job_events = JobEventHub(store)
+agent = AutonomousAgent(
+    max_parallel_fixes=int(os.getenv("AGENT_MAX_PARALLEL_FIXES", "4")),
+    cache_dir=os.getenv("AGENT_CACHE_DIR", "/tmp/agent_cache"),
+    llm_concurrency=int(os.getenv("AGENT_LLM_CONCURRENCY", "2")),
+    llm_token_budget=int(os.getenv("AGENT_LLM_JOB_TOKENS", "50000")),
+    llm_time_budget=float(os.getenv("AGENT_LLM_JOB_SECONDS", "600")),
+    ollama_url=os.getenv("OLLAMA_URL"),
+    git_cache_dir=os.getenv("AGENT_GIT_CACHE_DIR"),
+    git_cache_max_bytes=int(os.getenv("AGENT_GIT_CACHE_MAX_MB", "2048")) * 1024 * 1024,
+    test_workers=int(os.getenv("AGENT_TEST_WORKERS", "0")) or None,
+    test_timeout=float(os.getenv("AGENT_TEST_TIMEOUT_SECONDS", "60")),
+    test_impact=os.getenv("AGENT_TEST_IMPACT", "1") == "1",
+    test_warm_workers=os.getenv("AGENT_TEST_WARM_WORKERS", "1") == "1",
+    analysis_workers=int(os.getenv("AGENT_ANALYSIS_WORKERS", "0")) or None,
+    benchmark_seconds=float(os.getenv("AGENT_BENCHMARK_SECONDS", "120")),
+    min_improvement=float(os.getenv("AGENT_MIN_IMPROVEMENT_PERCENT", "15"))
+)
 
 class RepositoryConnect(BaseModel):
     repo_url: str
     repo_name: str
     access_token: Optional[str] = None
 
+async def run_job(job: AgentJob, repository: Repository, commit_event: CommitEvent):
+    """Run a queued job with the autonomous agent"""
+    job.status = JobStatus.RUNNING
+    store.save_job(job)
+    
+    try:
+        # Run the autonomous agent
+        result = await agent.process_commit(repository, commit_event, job)
+        
+        job.status = JobStatus.COMPLETED
+        job.completed_at = datetime.now()
+        job.result = result
+        
+        logger.info(f"Job {job.id} completed successfully")
+        
+    except Exception as e:
+        job.status = JobStatus.FAILED
+        job.error = str(e)
+        job.completed_at = datetime.now()
+        
+        logger.error(f"Job {job.id} failed: {str(e)}")
+    
+    store.save_job(job)
+
+job_queue = JobQueue(
+    run_job,
+    max_size=int(os.getenv("AGENT_MAX_QUEUED_JOBS", "100")),
+    num_workers=int(os.getenv("AGENT_WORKERS", "4")),
+    per_repo_limit=int(os.getenv("AGENT_PER_REPO_CONCURRENCY", "1"))
+)
+# Pushes to the same branch within this window are analyzed together as one job
+PUSH_DEBOUNCE_SECONDS = float(os.getenv("AGENT_PUSH_DEBOUNCE_SECONDS", "2"))
+
+async def handle_github_event(event: str, payload: Dict):
+    """Turn a logged GitHub delivery into agent work; runs in the webhook consumer"""
+    if event != "push":
+        return
+    
+    # Find connected repository by exact URL or full name
+    repository = payload.get("repository", {})
+    repo = store.find_repository(
+        repository.get("clone_url"),
+        repository.get("html_url"),
+        repository.get("ssh_url"),
+        repository.get("full_name")
+    )
+    
+    if not repo:
+        logger.warning(f"Ignoring push for unconnected repository {repository.get('full_name')}")
+        return
+    
+    # One commit event covers the whole pushed range
+    commit_event = commit_event_from_push(repo.id, payload)
+    
+    if commit_event is None:
+        return
+    
+    try:
+        enqueue_push(repo, commit_event)
+    except HTTPException as e:
+        if e.status_code == 429:
+            raise RetryLater(e.detail)
+        raise
+
+webhook_ingestor = WebhookIngestor(
+    WebhookLog(os.getenv("AGENT_WEBHOOK_LOG", "/tmp/agent_data/webhooks.log")),
+    handle_github_event,
+    secret=os.getenv("GITHUB_WEBHOOK_SECRET"),
+    deduper=DeliveryDeduper(ttl_seconds=float(os.getenv("AGENT_WEBHOOK_DEDUPE_HOURS", "72")) * 3600)
+)
+
+@app.on_event("startup")
+async def start_background_services():
+    await store.start()
+    await job_events.start()
+    await job_queue.start()
+    await webhook_ingestor.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await webhook_ingestor.stop()
+    await job_queue.stop()
+    await agent.close()
+    await job_events.stop()
+    await store.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Autonomous Developer Agent API", "status": "running"}
@@ -49,7 +166,7 @@ async def root():
 @app.get("/repositories")
 async def get_repositories():
     """Get all connected repositories"""
-    return {"repositories": list(repositories.values())}
+    return {"repositories": store.list_repositories()}
 
 @app.post("/repositories/connect")
 async def connect_repository(repo_data: RepositoryConnect):
@@ -64,49 +181,62 @@ async def connect_repository(repo_data: RepositoryConnect):
         status="connected"
     )
     
-    repositories[repo_id] = repository
+    if store.repository_index.owner(repository):
+        raise HTTPException(status_code=409, detail="Repository already connected")
+    
+    store.add_repository(repository)
     
     logger.info(f"Connected repository: {repo_data.repo_name}")
     
     return {"message": "Repository connected successfully", "repository": repository}
 
-@app.post("/webhook/github")
-async def github_webhook(payload: WebhookPayload, background_tasks: BackgroundTasks):
-    """Handle GitHub webhook events"""
-    repo_name = payload.repository.get("full_name", "unknown/repo")
+@app.delete("/repositories/{repo_id}")
+async def disconnect_repository(repo_id: str):
+    """Disconnect a repository; its past jobs are kept"""
+    repository = store.remove_repository(repo_id)
     
-    # Find connected repository
-    repo = None
-    for r in repositories.values():
-        if repo_name in r.url or r.name == repo_name:
-            repo = r
-            break
+    if repository is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
     
-    if not repo:
-        raise HTTPException(status_code=404, detail="Repository not connected")
+    logger.info(f"Disconnected repository: {repository.name}")
     
-    # Create commit event
-    commit_event = CommitEvent(
-        repository_id=repo.id,
-        commit_hash=payload.commits[0]["id"] if payload.commits else "unknown",
-        author=payload.commits[0]["author"]["name"] if payload.commits else "unknown",
-        message=payload.commits[0]["message"] if payload.commits else "No message",
-        timestamp=datetime.now()
-    )
+    return {"message": "Repository disconnected successfully", "repository": repository}
+
+@app.post("/webhook/github")
+async def github_webhook(request: Request):
+    """Accept a GitHub webhook delivery; parsing and job creation happen in the background"""
+    body = await request.body()
+    delivery_id = request.headers.get("x-github-delivery") or str(uuid.uuid4())
     
-    # Start agent job in background
-    background_tasks.add_task(process_commit, repo, commit_event)
+    try:
+        accepted = webhook_ingestor.ingest(
+            delivery_id,
+            request.headers.get("x-github-event", "push"),
+            body,
+            request.headers.get("x-hub-signature-256")
+        )
+    except InvalidSignatureError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    
+    if not accepted:
+        return {"message": "Duplicate delivery ignored", "delivery": delivery_id}
     
-    return {"message": "Webhook received, processing commit"}
+    return JSONResponse(status_code=202, content={"message": "Webhook accepted", "delivery": delivery_id})
+
+@app.get("/webhook/stats")
+async def get_webhook_stats():
+    """Get webhook ingestion and consumer counters"""
+    return webhook_ingestor.stats()
 
 @app.post("/demo/trigger-commit")
-async def trigger_demo_commit(background_tasks: BackgroundTasks):
+async def trigger_demo_commit():
     """Manually trigger a commit event for demo purposes"""
+    repositories = store.list_repositories()
     if not repositories:
         raise HTTPException(status_code=400, detail="No repositories connected")
     
     # Use the first connected repository
-    repo = list(repositories.values())[0]
+    repo = repositories[0]
     
     commit_event = CommitEvent(
         repository_id=repo.id,
@@ -116,71 +246,216 @@ async def trigger_demo_commit(background_tasks: BackgroundTasks):
         timestamp=datetime.now()
     )
     
-    # Start agent job in background
-    background_tasks.add_task(process_commit, repo, commit_event)
+    # Queue agent job for the worker pool
+    queued = enqueue_commit(repo, commit_event)
     
-    return {"message": "Demo commit triggered", "commit": commit_event}
+    return {"message": "Demo commit triggered", "commit": commit_event, **queued}
 
-async def process_commit(repository: Repository, commit_event: CommitEvent):
-    """Process a commit event with the autonomous agent"""
+def enqueue_commit(repository: Repository, commit_event: CommitEvent, key: Optional[str] = None, delay: float = 0.0) -> Dict:
+    """Create a pending job for a commit and queue it, or reject with 429 when the queue is full"""
     job_id = str(uuid.uuid4())
     
     job = AgentJob(
         id=job_id,
         repository_id=repository.id,
         commit_hash=commit_event.commit_hash,
-        status=JobStatus.RUNNING,
+        status=JobStatus.PENDING,
         created_at=datetime.now(),
         logs=[]
     )
     
-    jobs[job_id] = job
+    try:
+        position = job_queue.submit(job, repository, commit_event, key=key, delay=delay)
+    except QueueFullError as e:
+        logger.warning(f"Rejected commit {commit_event.commit_hash}: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    
+    store.add_job(job)
     
+    return {"job_id": job_id, "status": job.status, "queue_position": position}
+
+def enqueue_push(repository: Repository, commit_event: CommitEvent) -> Dict:
+    """Fold a push into the job still queued for its branch, or queue a new debounced job"""
+    if commit_event.branch is None:
+        return enqueue_commit(repository, commit_event)
+    
+    key = f"{repository.id}:{commit_event.branch}"
+    entry = job_queue.pending_for(key)
+    
+    if entry is None:
+        return enqueue_commit(repository, commit_event, key=key, delay=PUSH_DEBOUNCE_SECONDS)
+    
+    merged = merge_commit_events(entry.commit_event, commit_event)
+    position = job_queue.supersede(entry, merged, delay=PUSH_DEBOUNCE_SECONDS)
+    
+    job = entry.job
+    job.commit_hash = merged.commit_hash
+    job.logs.append(f"🔀 Superseded by push {merged.commit_hash[:8]}, now covering {len(merged.commits)} commits")
+    store.save_job(job)
+    
+    return {"job_id": job.id, "status": job.status, "queue_position": position, "coalesced": True}
+
+@app.get("/queue")
+async def get_queue_stats():
+    """Get job queue depth and worker utilisation"""
+    return job_queue.stats()
+
+# Job fields returned by GET /jobs unless ``fields`` is given; logs and result are fetched per job
+JOB_SUMMARY_FIELDS = ["id", "repository_id", "commit_hash", "status", "created_at", "completed_at", "error", "log_count", "last_log"]
+JOB_FIELDS = set(AgentJob.model_fields) | {"log_count", "last_log"}
+
+def encode_cursor(job: AgentJob) -> str:
+    return base64.urlsafe_b64encode(f"{job.created_at.timestamp()!r}|{job.id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> JobCursor:
     try:
-        # Run the autonomous agent
-        result = await agent.process_commit(repository, commit_event, job)
-        
-        job.status = JobStatus.COMPLETED
-        job.completed_at = datetime.now()
-        job.result = result
-        
-        logger.info(f"Job {job_id} completed successfully")
-        
-    except Exception as e:
-        job.status = JobStatus.FAILED
-        job.error = str(e)
-        job.completed_at = datetime.now()
-        
-        logger.error(f"Job {job_id} failed: {str(e)}")
+        created_at, job_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split("|", 1)
+        return float(created_at), job_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @app.get("/jobs")
-async def get_jobs():
-    """Get all agent jobs"""
-    return {"jobs": list(jobs.values())}
+async def get_jobs(
+    request: Request,
+    status: Optional[List[JobStatus]] = Query(None),
+    repository_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = None
+):
+    """Get a newest-first page of agent jobs, filtered and projected to the requested fields"""
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else JOB_SUMMARY_FIELDS
+    unknown = set(selected) - JOB_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown job fields: {', '.join(sorted(unknown))}")
+    
+    # The store version changes on every job write, so an unchanged version means an unchanged page
+    etag = f'W/"{hashlib.sha1(f"{store.version}?{request.url.query}".encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    page = store.query_jobs(
+        statuses=status,
+        repository_id=repository_id,
+        created_after=since,
+        created_before=until,
+        after=decode_cursor(cursor) if cursor else None,
+        limit=limit + 1,
+        with_logs="logs" in selected
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    summaries = store.log_summary([job.id for job in page]) if {"log_count", "last_log"} & set(selected) else {}
+    include = set(selected) - {"log_count", "last_log"}
+    
+    items = []
+    for job in page:
+        item = job.model_dump(mode="json", include=include)
+        log_count, last_log = summaries.get(job.id, (0, None))
+        if "log_count" in selected:
+            item["log_count"] = log_count
+        if "last_log" in selected:
+            item["last_log"] = last_log
+        items.append(item)
+    
+    return JSONResponse(
+        content={"jobs": items, "next_cursor": encode_cursor(page[-1]) if has_more else None},
+        headers=headers
+    )
 
 @app.get("/jobs/{job_id}")
 async def get_job(job_id: str):
     """Get a specific job by ID"""
-    if job_id not in jobs:
+    job = store.get_job(job_id)
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status == JobStatus.PENDING:
+        return {"job": job, "queue_position": job_queue.position(job_id)}
+    
+    return {"job": job}
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request, offset: int = Query(0, ge=0)):
+    """Stream a job's log lines and status changes as server-sent events.
+    
+    Reconnecting clients resume after the last line they received, taken
+    from the Last-Event-ID header that EventSource sends or from ``offset``.
+    """
+    if store.get_job(job_id) is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return {"job": jobs[job_id]}
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+    
+    async def body():
+        async for event in job_events.stream(job_id, offset):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"id: {event['offset']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    return StreamingResponse(body(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/jobs/{job_id}")
+async def job_events_websocket(websocket: WebSocket, job_id: str, offset: int = 0):
+    """Same events as /jobs/{job_id}/events over a WebSocket, one JSON message each"""
+    await websocket.accept()
+    
+    if store.get_job(job_id) is None:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    
+    try:
+        async for event in job_events.stream(job_id, offset):
+            await websocket.send_json(event or {"type": "ping"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    """Get LLM response cache, request coalescing and scheduler statistics"""
+    return {**agent.llm_client.stats(), "scheduler": agent.llm_scheduler.stats()}
+
+@app.get("/git/stats")
+async def get_git_stats():
+    """Get repository mirror cache statistics, when the local git backend is enabled"""
+    if not isinstance(agent.git_client, LocalGitClient):
+        return {"backend": "mock"}
+    
+    return {"backend": "local", **agent.git_client.mirrors.stats()}
+
+@app.get("/tests/stats")
+async def get_test_runner_stats():
+    """Get test runner statistics, when tests run for real"""
+    if not isinstance(agent.test_runner, PytestRunner):
+        return {"runner": "simulated"}
+    
+    return {"runner": "pytest", **agent.test_runner.stats()}
+
+@app.get("/repositories/{repo_id}/analysis")
+async def get_repository_analysis(repo_id: str):
+    """Get static analysis totals and the hottest files as of the repository's last analyzed commit"""
+    if store.get_repository(repo_id) is None:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    
+    summary = agent.code_analyzer.repository_summary(repo_id) if isinstance(agent.code_analyzer, StaticCodeAnalyzer) else None
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Repository has not been analyzed yet")
+    
+    return summary
 
 @app.get("/dashboard/stats")
 async def get_dashboard_stats():
-    """Get dashboard statistics"""
-    total_repos = len(repositories)
-    total_jobs = len(jobs)
-    completed_jobs = len([j for j in jobs.values() if j.status == JobStatus.COMPLETED])
-    failed_jobs = len([j for j in jobs.values() if j.status == JobStatus.FAILED])
-    
-    return {
-        "total_repositories": total_repos,
-        "total_jobs": total_jobs,
-        "completed_jobs": completed_jobs,
-        "failed_jobs": failed_jobs,
-        "success_rate": (completed_jobs / total_jobs * 100) if total_jobs > 0 else 0
-    }
+    """Get dashboard statistics, with per-repository and last hour/day breakdowns"""
+    return {"total_repositories": store.count_repositories(), **job_stats.snapshot()}
 
 if __name__ == "__main__":
     import uvicorn
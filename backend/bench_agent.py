@@ -0,0 +1,97 @@
+"""
+End-to-end agent benchmark against the local Ollama stand-in.
+
+Starts ollama_stub on a free local port, pushes a batch of demo commits
+through AutonomousAgent using the HTTP backend and reports per-job wall
+time, phase timings and LLM layer statistics. Needs no network access.
+
+    python bench_agent.py --commits 8 --latency 0.3 --token-delay 0.005
+"""
+
+import argparse
+import asyncio
+import socket
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+import uvicorn
+
+from agent import AutonomousAgent
+from models import Repository, CommitEvent, AgentJob, JobStatus
+from ollama_stub import create_app
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def run_benchmark(commits: int, latency: float, token_delay: float, llm_concurrency: int):
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(latency, token_delay), host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    agent = AutonomousAgent(llm_concurrency=llm_concurrency, ollama_url=f"http://127.0.0.1:{port}")
+    repository = Repository(
+        id="bench-repo",
+        name="demo_repo",
+        url="https://github.com/demo-org/demo_repo.git",
+        connected_at=datetime.now(),
+        status="connected"
+    )
+
+    async def run_one(index: int) -> AgentJob:
+        commit_event = CommitEvent(
+            repository_id=repository.id,
+            commit_hash=f"bench-{uuid.uuid4().hex[:8]}",
+            author="Benchmark",
+            message=f"feat: benchmark commit {index}",
+            timestamp=datetime.now()
+        )
+        job = AgentJob(
+            id=str(uuid.uuid4()),
+            repository_id=repository.id,
+            commit_hash=commit_event.commit_hash,
+            status=JobStatus.RUNNING,
+            created_at=datetime.now()
+        )
+
+        started = time.perf_counter()
+        await agent.process_commit(repository, commit_event, job)
+        job.phase_timings["total"] = round(time.perf_counter() - started, 3)
+
+        return job
+
+    try:
+        started = time.perf_counter()
+        finished = await asyncio.gather(*[run_one(i) for i in range(commits)])
+        elapsed = time.perf_counter() - started
+    finally:
+        await agent.close()
+        server.should_exit = True
+        await server_task
+
+    totals = [job.phase_timings["total"] for job in finished]
+    print(f"{commits} commits in {elapsed:.2f}s ({commits / elapsed:.2f} commits/s)")
+    print(f"per-job wall time: median {statistics.median(totals):.2f}s, max {max(totals):.2f}s")
+
+    for phase in ("analysis", "improvements", "roadmap", "notifications"):
+        values = [job.phase_timings.get(phase, 0) for job in finished]
+        print(f"  {phase:<14} median {statistics.median(values):.2f}s")
+
+    print(f"LLM: {agent.llm_client.stats()}")
+    print(f"scheduler: {agent.llm_scheduler.stats()}")
+    print(f"backend: {agent.llm_backend.requests} requests, {agent.llm_backend.retries} retries")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end agent benchmark against a local Ollama stand-in")
+    parser.add_argument("--commits", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="stand-in time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--llm-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.commits, args.latency, args.token_delay, args.llm_concurrency))
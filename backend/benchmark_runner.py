@@ -0,0 +1,399 @@
+import ast
+import asyncio
+import copy
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from models import BenchmarkCase, BenchmarkReport, BenchmarkResult
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_worker.py")
+BENCHMARK_DIR = "benchmarks"
+
+# Candidate growth functions for fit_complexity, simplest first
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log(n)),
+    ("O(n²)", lambda n: float(n) ** 2),
+    ("O(n³)", lambda n: float(n) ** 3)
+]
+
+class BenchmarkError(Exception):
+    """Raised when a benchmark worker cannot start, a case fails or a call runs out of time"""
+
+def speedup_interval(before: List[float], after: List[float], confidence: float = 0.95, resamples: int = 2000, seed: int = 0) -> Tuple[float, float]:
+    """Bootstrap percentile interval of median(before) / median(after)"""
+    rng = random.Random(seed)
+    ratios = sorted(
+        statistics.median(rng.choices(before, k=len(before))) / statistics.median(rng.choices(after, k=len(after)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return ratios[int(tail * resamples)], ratios[min(resamples - 1, int((1 - tail) * resamples))]
+
+def fit_complexity(sizes: List[int], seconds: List[float]) -> Optional[str]:
+    """Growth class whose scaled curve fits the timings best, by least squares in log space"""
+    if len(sizes) < 2:
+        return None
+
+    best = None
+    for name, growth in COMPLEXITY_CLASSES:
+        residuals = [math.log(t) - math.log(growth(max(n, 2))) for n, t in zip(sizes, seconds)]
+        offset = statistics.fmean(residuals)
+        error = sum((r - offset) ** 2 for r in residuals)
+        if best is None or error < best[0]:
+            best = (error, name)
+    return best[1]
+
+def _collect_definitions(body: List[ast.stmt], prefix: str, definitions: Dict[str, str]):
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            definitions[prefix + node.name] = ast.dump(node)
+        elif isinstance(node, ast.ClassDef):
+            # A class's own entry covers its bases, decorators and attributes; each method gets its own
+            members = [child for child in node.body if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+            own = copy.copy(node)
+            own.body = [child for child in node.body if child not in members]
+            definitions[prefix + node.name] = ast.dump(own)
+            _collect_definitions(members, f"{prefix}{node.name}.", definitions)
+
+def _definitions(source: str) -> Optional[Dict[str, str]]:
+    """AST dumps of the functions, classes and methods in ``source`` by qualified name"""
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    definitions: Dict[str, str] = {}
+    _collect_definitions(tree.body, "", definitions)
+    return definitions
+
+def changed_definitions(before_path: str, after_path: str, files: List[str]) -> Dict[str, Optional[Set[str]]]:
+    """Qualified names of the functions, classes and methods that differ in each file; None when a side does not parse"""
+    changed: Dict[str, Optional[Set[str]]] = {}
+    for path in files:
+        sources = []
+        for root in (before_path, after_path):
+            try:
+                with open(os.path.join(root, path), encoding="utf-8") as f:
+                    sources.append(f.read())
+            except OSError:
+                sources.append("")
+
+        before, after = _definitions(sources[0]), _definitions(sources[1])
+        if before is None or after is None:
+            changed[path] = None
+        else:
+            changed[path] = {name for name in before.keys() | after.keys() if before.get(name) != after.get(name)}
+    return changed
+
+def _covers(target: str, changed: Dict[str, Optional[Set[str]]]) -> bool:
+    """Whether the target itself, or the own part of a class enclosing it, changed"""
+    path, _, qualname = target.partition("::")
+    if path not in changed:
+        return False
+    names = changed[path]
+    if names is None or not qualname:
+        return True
+    parts = qualname.split(".")
+    return any(".".join(parts[:depth]) in names for depth in range(1, len(parts) + 1))
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+def summarize_report(report: BenchmarkReport) -> List[str]:
+    """One line per case: the speedup at its largest size timed on both sides, and the fitted growth"""
+    lines = []
+    for case in report.cases:
+        paired = [result for result in case.results if result.speedup is not None]
+        if not paired:
+            lines.append(f"{case.target}: not timed on both sides ({'; '.join(case.notes) or 'no sizes'})")
+            continue
+        result = paired[-1]
+        lines.append(
+            f"{case.target}: ×{result.speedup:.1f} at size {result.size:,} "
+            f"(95% CI ×{result.speedup_low:.1f}–×{result.speedup_high:.1f}), "
+            f"{case.complexity_before or '?'} → {case.complexity_after or '?'}"
+        )
+    return lines
+
+def format_report(report: BenchmarkReport) -> List[str]:
+    """Markdown lines describing a report, one table per case"""
+    if report.error:
+        return [f"Benchmarks did not run: {report.error}"]
+
+    lines = []
+    for case in report.cases:
+        complexity = f"{case.complexity_before or '?'} → {case.complexity_after or '?'}"
+        lines += [f"**{case.target}** ({complexity})", "", "| Size | Before | After | Speedup (95% CI) |", "|---:|---:|---:|---:|"]
+        for result in case.results:
+            before = _format_seconds(result.before_median) if result.before_median is not None else "–"
+            after = _format_seconds(result.after_median) if result.after_median is not None else "–"
+            speedup = f"×{result.speedup:.2f} (×{result.speedup_low:.2f}–×{result.speedup_high:.2f})" if result.speedup is not None else "–"
+            lines.append(f"| {result.size:,} | {before} | {after} | {speedup} |")
+        lines += [f"- {note}" for note in case.notes]
+        lines.append("")
+    return lines
+
+class _Worker:
+    """A benchmark_worker process in one checkout; restarted on the next request after it is killed"""
+
+    def __init__(self, name: str, repo_path: str, command: List[str], env: Dict[str, str], start_timeout: float):
+        self.name = name
+        self.repo_path = repo_path
+        self.command = command
+        self.env = env
+        self.start_timeout = start_timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self) -> List[Dict[str, Any]]:
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            cwd=self.repo_path,
+            env=self.env,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=2 ** 20
+        )
+        ready = await self._reply(self.start_timeout)
+        if not ready.get("ready"):
+            await self.close()
+            error = (ready.get("error") or "unknown error").strip().splitlines()[-1]
+            raise BenchmarkError(f"benchmarks in the {self.name} checkout do not import: {error}")
+        return ready["cases"]
+
+    async def _reply(self, timeout: float) -> Dict[str, Any]:
+        try:
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            await self.close()
+            raise BenchmarkError(f"{self.name} took over {timeout:.0f}s")
+        if not line:
+            await self.close()
+            raise BenchmarkError(f"the {self.name} worker exited")
+        return json.loads(line)
+
+    async def request(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        if self.process is None:
+            await self.start()
+
+        try:
+            self.process.stdin.write((json.dumps(message) + "\n").encode())
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            await self.close()
+            raise BenchmarkError(f"the {self.name} worker exited")
+
+        reply = await self._reply(timeout)
+        if "error" in reply:
+            raise BenchmarkError(f"{self.name}: {reply['error'].strip().splitlines()[-1]}")
+        return reply
+
+    async def close(self):
+        process, self.process = self.process, None
+        if process is not None and process.returncode is None:
+            process.kill()
+            await process.wait()
+
+class BenchmarkRunner:
+    """Measures an optimization by timing the repository's benchmark cases before and after it.
+
+    Both checkouts get their own worker process. Only cases whose
+    ``target`` is a function or class the change touches are run. For
+    each case the smallest size is run once on both sides to check that
+    the results match, then every size is timed, smallest first: each
+    sample is the mean of enough calls to last ``min_sample_seconds``,
+    samples alternate between the two sides so drift affects both alike,
+    and the speedup is the ratio of the medians with a bootstrap
+    confidence interval. A side is no longer timed at sizes it is not
+    expected to finish within ``size_seconds``, extrapolating from the
+    sizes already measured. Growth classes are fitted per side over the
+    sizes it was timed at.
+    """
+
+    def __init__(self, python: str = sys.executable, max_seconds: float = 120, size_seconds: float = 20, min_sample_seconds: float = 0.05, min_repeats: int = 5, max_repeats: int = 15, confidence: float = 0.95, start_timeout: float = 60):
+        self.python = python
+        self.max_seconds = max_seconds
+        self.size_seconds = size_seconds
+        self.min_sample_seconds = min_sample_seconds
+        self.min_repeats = min_repeats
+        self.max_repeats = max_repeats
+        self.confidence = confidence
+        self.start_timeout = start_timeout
+
+        # Timings taken side by side would disturb each other
+        self._lock = asyncio.Lock()
+        self.comparisons = 0
+
+    def _env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        # Same set and dict ordering on both sides
+        env["PYTHONHASHSEED"] = "0"
+        return env
+
+    async def compare(self, before_path: str, after_path: str, changed_files: List[str]) -> BenchmarkReport:
+        """Time the benchmark cases covering ``changed_files`` in both checkouts"""
+        if not changed_files:
+            return BenchmarkReport(error="the change touches no files")
+
+        async with self._lock:
+            self.comparisons += 1
+            command = [self.python, WORKER_SCRIPT]
+            workers = {
+                "before": _Worker("before", before_path, command, self._env(), self.start_timeout),
+                "after": _Worker("after", after_path, command, self._env(), self.start_timeout)
+            }
+            started = time.perf_counter()
+            try:
+                report = await self._compare(workers, before_path, after_path, changed_files)
+            finally:
+                await asyncio.gather(*[worker.close() for worker in workers.values()])
+
+        logger.info(f"Benchmarked {after_path} against {before_path} in {time.perf_counter() - started:.1f}s: {report.error or f'{len(report.cases)} cases'}")
+        return report
+
+    async def _compare(self, workers: Dict[str, "_Worker"], before_path: str, after_path: str, changed_files: List[str]) -> BenchmarkReport:
+        try:
+            cases = await workers["before"].start()
+            await workers["after"].start()
+        except BenchmarkError as e:
+            return BenchmarkReport(error=str(e))
+
+        changed = await asyncio.to_thread(changed_definitions, before_path, after_path, changed_files)
+        selected = [case for case in cases if _covers(case["target"], changed)]
+        if not selected:
+            return BenchmarkReport(error=f"no case in {BENCHMARK_DIR}/ covers what changed in {', '.join(changed_files)}")
+
+        deadline = time.monotonic() + self.max_seconds
+        reports = [await self._measure(workers, case, deadline) for case in selected]
+
+        report = BenchmarkReport(cases=reports)
+        mismatched = [case.case for case in reports if case.outputs_match is False]
+        if mismatched:
+            report.error = f"results differ in {', '.join(mismatched)}"
+            return report
+
+        # Every case here times code the change touched; the least improvement any of them
+        # shows at its largest size timed on both sides decides
+        improvements = []
+        for case in reports:
+            paired = [result for result in case.results if result.speedup is not None]
+            if paired:
+                improvements.append(100 * (1 - 1 / paired[-1].speedup_low))
+        report.improvement = min(improvements) if improvements else None
+
+        return report
+
+    def _predict(self, results: List[BenchmarkResult], side: str, size: int) -> Optional[float]:
+        """Per-call time of ``side`` at ``size``, extrapolated from the sizes timed so far"""
+        timed = [(result.size, getattr(result, f"{side}_median")) for result in results if getattr(result, f"{side}_median") is not None]
+        if not timed:
+            return None
+        last_size, last_seconds = timed[-1]
+        if len(timed) >= 2 and last_size > timed[-2][0]:
+            exponent = max(1.0, math.log(last_seconds / timed[-2][1]) / math.log(last_size / timed[-2][0]))
+        else:
+            # Assume quadratic growth until there are two points to go by
+            exponent = 2.0
+        return last_seconds * (size / last_size) ** exponent
+
+    async def _measure(self, workers: Dict[str, "_Worker"], case: Dict[str, Any], deadline: float) -> BenchmarkCase:
+        report = BenchmarkCase(case=case["id"], target=case["target"])
+        sizes = sorted(case["sizes"])
+        active = dict(workers)
+
+        try:
+            digests = [(await worker.request({"case": case["id"], "size": sizes[0], "check": True}, self.size_seconds))["digest"] for worker in workers.values()]
+        except BenchmarkError as e:
+            report.notes.append(f"Could not run: {str(e)}")
+            return report
+        report.outputs_match = None if None in digests else digests[0] == digests[1]
+        if report.outputs_match is False:
+            report.notes.append(f"Results differ at size {sizes[0]:,}")
+            return report
+
+        for size in sizes:
+            budget = min(self.size_seconds, deadline - time.monotonic())
+            for side in list(active):
+                predicted = self._predict(report.results, side, size)
+                if budget <= 0 or (predicted is not None and predicted * (self.min_repeats + 1) * len(active) > budget):
+                    reason = "out of time" if budget <= 0 else f"~{_format_seconds(predicted)} per call"
+                    report.notes.append(f"{side.capitalize()} not timed from size {size:,} ({reason})")
+                    del active[side]
+            if not active:
+                break
+
+            samples = await self._sample(active, case["id"], size, budget, report)
+            if not samples:
+                continue
+            report.results.append(self._result(size, samples))
+
+        for side in workers:
+            timed = [(result.size, getattr(result, f"{side}_median")) for result in report.results if getattr(result, f"{side}_median") is not None]
+            setattr(report, f"complexity_{side}", fit_complexity([s for s, _ in timed], [t for _, t in timed]))
+
+        return report
+
+    async def _sample(self, active: Dict[str, "_Worker"], case_id: str, size: int, budget: float, report: BenchmarkCase) -> Dict[str, List[float]]:
+        """Interleaved per-call timings of each active side at ``size``; sides that fail are dropped"""
+        started = time.monotonic()
+        loops: Dict[str, int] = {}
+        round_seconds = 0.0
+
+        # The first call warms up and tells how many calls make a sample
+        for side, worker in list(active.items()):
+            try:
+                first = (await worker.request({"case": case_id, "size": size, "loops": 1}, budget))["seconds"]
+            except BenchmarkError as e:
+                report.notes.append(f"{side.capitalize()} stopped at size {size:,}: {str(e)}")
+                del active[side]
+                continue
+            loops[side] = max(1, min(10 ** 6, math.ceil(self.min_sample_seconds / max(first, 1e-9))))
+            round_seconds += first * loops[side]
+
+        remaining = budget - (time.monotonic() - started)
+        repeats = max(self.min_repeats, min(self.max_repeats, int(remaining / max(round_seconds, 1e-9))))
+
+        samples: Dict[str, List[float]] = {side: [] for side in loops}
+        for _ in range(repeats):
+            for side in list(samples):
+                try:
+                    reply = await active[side].request({"case": case_id, "size": size, "loops": loops[side]}, budget)
+                except BenchmarkError as e:
+                    report.notes.append(f"{side.capitalize()} stopped at size {size:,}: {str(e)}")
+                    del active[side]
+                    del samples[side]
+                    continue
+                samples[side].append(reply["seconds"])
+
+        return samples
+
+    def _result(self, size: int, samples: Dict[str, List[float]]) -> BenchmarkResult:
+        result = BenchmarkResult(
+            size=size,
+            repeats=max(len(values) for values in samples.values()),
+            before_median=statistics.median(samples["before"]) if "before" in samples else None,
+            after_median=statistics.median(samples["after"]) if "after" in samples else None
+        )
+        if result.before_median is not None and result.after_median is not None:
+            result.speedup = result.before_median / result.after_median
+            result.speedup_low, result.speedup_high = speedup_interval(samples["before"], samples["after"], self.confidence)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"comparisons": self.comparisons, "max_seconds": self.max_seconds, "size_seconds": self.size_seconds}
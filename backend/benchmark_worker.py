@@ -0,0 +1,138 @@
+"""Benchmark worker started by BenchmarkRunner in one checkout.
+
+Benchmark cases live in the repository under ``benchmarks/bench_*.py``.
+A case is a class with a ``target`` of the form ``"path.py::Qualified.name"``,
+a list of input ``sizes``, an optional ``setup(self, size)`` that builds
+the inputs and a ``run(self)`` that calls the code under test and returns
+its result. ``setup`` must be deterministic; ``run`` is called many times
+on the same inputs and must not change them.
+
+On start the worker imports the cases and writes
+``{"ready": true, "cases": [...]}`` on stdout. Each request on stdin is a
+JSON line: ``{"case": ..., "size": ..., "loops": ...}`` runs the case
+``loops`` times with the garbage collector off and replies
+``{"seconds": ...}`` per call; ``{"case": ..., "size": ..., "check": true}``
+runs it once and replies with a ``digest`` of its result, so two checkouts
+can be checked for returning the same thing.
+"""
+
+import gc
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from collections.abc import Iterable, Mapping
+
+# Run as a script, the backend directory would shadow the repository's own modules
+sys.path[0] = os.getcwd()
+
+BENCHMARK_DIR = "benchmarks"
+
+def _discover():
+    cases = {}
+    directory = os.path.join(os.getcwd(), BENCHMARK_DIR)
+    if not os.path.isdir(directory):
+        return cases
+
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("bench_") and name.endswith(".py")):
+            continue
+        module_name = f"_agent_benchmarks.{name[:-3]}"
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(directory, name))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+
+        for attr, value in vars(module).items():
+            if inspect.isclass(value) and value.__module__ == module_name and hasattr(value, "target") and hasattr(value, "run"):
+                cases[f"{name[:-3]}.{attr}"] = value
+    return cases
+
+def _canonical(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, Mapping):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=repr)
+    if isinstance(value, Iterable):
+        return [_canonical(item) for item in value]
+    return repr(value)
+
+class _Instances:
+    """The set-up instance of the case and size being timed; one at a time to bound memory"""
+
+    def __init__(self, cases):
+        self.cases = cases
+        self.key = None
+        self.instance = None
+
+    def get(self, case, size):
+        if self.key != (case, size):
+            self.instance = None
+            gc.collect()
+            # Same inputs in every checkout
+            random.seed(0)
+            instance = self.cases[case]()
+            if hasattr(instance, "setup"):
+                instance.setup(size)
+            self.key, self.instance = (case, size), instance
+        return self.instance
+
+def _handle(request, instances):
+    instance = instances.get(request["case"], request["size"])
+
+    if request.get("check"):
+        result = instance.run()
+        try:
+            encoded = json.dumps(_canonical(result), sort_keys=True, default=repr)
+        except (RecursionError, ValueError):
+            return {"digest": None}
+        return {"digest": hashlib.sha1(encoded.encode()).hexdigest()}
+
+    loops = request["loops"]
+    run = instance.run
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+    return {"seconds": elapsed / loops}
+
+def main():
+    # Keep the protocol channel away from anything the code under test prints
+    out = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+
+    def send(message):
+        out.write(json.dumps(message) + "\n")
+        out.flush()
+
+    try:
+        cases = _discover()
+    except Exception:
+        send({"ready": False, "error": traceback.format_exc(limit=3)})
+        return
+    send({"ready": True, "cases": [{"id": case_id, "target": case.target, "sizes": list(getattr(case, "sizes", [1000]))} for case_id, case in cases.items()]})
+
+    instances = _Instances(cases)
+    for line in sys.stdin:
+        try:
+            send(_handle(json.loads(line), instances))
+        except Exception:
+            instances.key = instances.instance = None
+            send({"error": traceback.format_exc(limit=3)})
+
+if __name__ == "__main__":
+    main()
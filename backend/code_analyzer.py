@@ -0,0 +1,498 @@
+import ast
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from analysis_cache import AnalysisCache
+from diff_engine import git_output
+from models import CodeAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Bump when the analysis changes, so results cached by an older version are not reused
+ANALYZER_VERSION = 2
+
+SKIPPED_DIRS = {"__pycache__", "node_modules", "venv", "env", "site-packages", "build", "dist", "tests", "test", "benchmarks"}
+MAX_FILE_BYTES = 512 * 1024
+
+HTTP_CLIENTS = {"requests", "httpx", "session", "client", "http", "urllib3"}
+HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "request", "urlopen"}
+DB_METHODS = {"execute", "executemany", "query", "raw", "fetch", "fetchrow", "fetchval"}
+ORM_MANAGER_METHODS = {"get", "filter", "exclude", "first", "last", "count", "all", "exists"}
+
+SEVERITY_POINTS = {"high": 3, "medium": 2, "low": 1}
+COMPLEXITY_THRESHOLD = 10
+DEEP_NESTING_THRESHOLD = 3
+
+LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+def is_analyzed_file(relative_path: str) -> bool:
+    """Python sources the analyzer looks at; tests and vendored directories are skipped"""
+    parts = relative_path.split("/")
+    name = parts[-1]
+    if not name.endswith(".py") or name.startswith("test_") or name.endswith("_test.py"):
+        return False
+    return not any(part.startswith(".") or part in SKIPPED_DIRS for part in parts[:-1])
+
+def iter_python_files(repo_path: str) -> List[str]:
+    """Relative paths of the files ``analyze_codebase`` covers, sorted"""
+    files = []
+    for root, dirs, names in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d not in SKIPPED_DIRS]
+        for name in names:
+            relative_path = os.path.relpath(os.path.join(root, name), repo_path).replace(os.sep, "/")
+            if is_analyzed_file(relative_path):
+                files.append(relative_path)
+    return sorted(files)
+
+def _receiver(node: ast.AST) -> Optional[str]:
+    """Last name in a call receiver: ``requests`` for requests.get, ``session`` for self.session.get"""
+    if isinstance(node, ast.Name):
+        return node.id.lower()
+    if isinstance(node, ast.Attribute):
+        return node.attr.lower()
+    return None
+
+def _io_call(call: ast.Call) -> Optional[str]:
+    """Describe ``call`` if it looks like a network or database round trip"""
+    func = call.func
+    if isinstance(func, ast.Name) and func.id == "urlopen":
+        return "urlopen"
+    if not isinstance(func, ast.Attribute):
+        return None
+
+    receiver = _receiver(func.value)
+    if func.attr in HTTP_METHODS and receiver in HTTP_CLIENTS:
+        return f"{receiver}.{func.attr}"
+    if func.attr in DB_METHODS:
+        return f"{receiver or 'db'}.{func.attr}"
+    if func.attr in ORM_MANAGER_METHODS and receiver == "objects":
+        return f"objects.{func.attr}"
+    return None
+
+def _functions(body: List[ast.stmt], prefix: str = "") -> List[Tuple[str, ast.AST]]:
+    """(qualified name, node) for every function and method, nested ones included"""
+    found = []
+    for node in body:
+        if isinstance(node, FUNCTION_NODES):
+            name = f"{prefix}{node.name}"
+            found.append((name, node))
+            found.extend(_functions(node.body, f"{name}."))
+        elif isinstance(node, ast.ClassDef):
+            found.extend(_functions(node.body, f"{prefix}{node.name}."))
+    return found
+
+def _own_nodes(function: ast.AST):
+    """Walk a function's body without descending into nested functions or classes"""
+    stack = list(reversed(function.body))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, FUNCTION_NODES + (ast.ClassDef,)):
+            continue
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+
+def cyclomatic_complexity(function: ast.AST) -> int:
+    """McCabe complexity: one plus the number of decision points"""
+    complexity = 1
+    for node in _own_nodes(function):
+        if isinstance(node, (ast.If, ast.IfExp, ast.ExceptHandler, ast.Assert) + LOOP_NODES):
+            complexity += 1
+        elif isinstance(node, ast.BoolOp):
+            complexity += len(node.values) - 1
+        elif isinstance(node, ast.comprehension):
+            complexity += 1 + len(node.ifs)
+        elif isinstance(node, ast.match_case):
+            complexity += 1
+    return complexity
+
+class _LoopVisitor(ast.NodeVisitor):
+    """Finds loop-related performance patterns in one function body"""
+
+    def __init__(self, function_name: str, io_helpers: Set[str]):
+        self.function_name = function_name
+        self.io_helpers = io_helpers
+        # (dump of the iterated expression, line) for each enclosing loop
+        self.loops: List[Tuple[Optional[str], int]] = []
+        self.max_depth = 0
+        self.issues: List[Dict] = []
+        self._reported: Set[Tuple[str, int]] = set()
+
+    def _issue(self, kind: str, severity: str, line: int, description: str, suggestion: str):
+        if (kind, line) in self._reported:
+            return
+        self._reported.add((kind, line))
+        self.issues.append({
+            "type": kind,
+            "severity": severity,
+            "line": line,
+            "function": self.function_name,
+            "description": description,
+            "suggestion": suggestion
+        })
+
+    def _enter_loop(self, iterable: Optional[ast.AST], line: int):
+        key = ast.dump(iterable) if iterable is not None else None
+        for outer_key, outer_line in self.loops:
+            if key is not None and key == outer_key:
+                name = ast.unparse(iterable)
+                self._issue(
+                    "nested_loop_scan", "high", line,
+                    f"{self.function_name} rescans {name} inside the loop over it at line {outer_line}, O(n²)",
+                    f"Index {name} once before the loop at line {outer_line} (dict or set keyed by what the inner loop matches on) instead of rescanning it per element"
+                )
+                break
+        self.loops.append((key, line))
+        self.max_depth = max(self.max_depth, len(self.loops))
+
+    def _visit_loop(self, node: ast.AST, iterable: Optional[ast.AST]):
+        if iterable is not None:
+            self.visit(iterable)
+        self._enter_loop(iterable, node.lineno)
+        for child in ast.iter_child_nodes(node):
+            if child is not iterable:
+                self.visit(child)
+        self.loops.pop()
+
+    def visit_For(self, node):
+        self._visit_loop(node, node.iter)
+
+    visit_AsyncFor = visit_For
+
+    def visit_While(self, node):
+        self._visit_loop(node, None)
+
+    def _visit_comprehension(self, node):
+        # Generators run in order, each nested in the ones before it; the element runs innermost
+        entered = 0
+        for generator in node.generators:
+            self.visit(generator.iter)
+            self._enter_loop(generator.iter, node.lineno)
+            entered += 1
+            for condition in generator.ifs:
+                self.visit(condition)
+        for child in ("elt", "key", "value"):
+            if hasattr(node, child):
+                self.visit(getattr(node, child))
+        del self.loops[len(self.loops) - entered:]
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+    def visit_Call(self, node):
+        if self.loops:
+            io = _io_call(node)
+            func = node.func
+            if io is not None:
+                self._issue(
+                    "n_plus_one", "high", node.lineno,
+                    f"{self.function_name} calls {io} once per loop iteration (N+1 round trips)",
+                    "Fetch everything in one batched request or query before the loop, or issue the calls concurrently"
+                )
+            elif isinstance(func, ast.Attribute) and func.attr == "index":
+                self._issue(
+                    "index_in_loop", "medium", node.lineno,
+                    f"{self.function_name} calls {ast.unparse(func)}() inside a loop, a linear search per iteration",
+                    "Track positions with enumerate() or a dict built once, instead of .index() in the loop"
+                )
+            else:
+                helper = self._helper_name(func)
+                if helper in self.io_helpers:
+                    self._issue(
+                        "n_plus_one", "high", node.lineno,
+                        f"{self.function_name} calls {ast.unparse(func)}, which makes a network or database call, once per loop iteration (N+1 round trips)",
+                        f"Add a batch variant of {helper} and call it once with all items"
+                    )
+        self.generic_visit(node)
+
+    def _helper_name(self, func: ast.AST) -> Optional[str]:
+        if isinstance(func, ast.Name):
+            return func.id
+        if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name) and func.value.id in ("self", "cls"):
+            return func.attr
+        return None
+
+    def visit_FunctionDef(self, node):
+        # Nested functions are analyzed on their own
+        pass
+
+    visit_AsyncFunctionDef = visit_ClassDef = visit_Lambda = visit_FunctionDef
+
+def analyze_source(file_path: str, source: str) -> Optional[CodeAnalysis]:
+    """Analyze one file's source; None if it does not parse"""
+    try:
+        tree = ast.parse(source, filename=file_path)
+    except (SyntaxError, ValueError, RecursionError) as e:
+        logger.debug(f"Skipping {file_path}: {str(e)}")
+        return None
+
+    functions = _functions(tree.body)
+
+    # Functions that make a round trip themselves; calling them in a loop is N+1 too
+    io_helpers = {
+        name.rsplit(".", 1)[-1]
+        for name, node in functions
+        if any(isinstance(inner, ast.Call) and _io_call(inner) for inner in _own_nodes(node))
+    }
+
+    issues: List[Dict] = []
+    max_complexity = 0
+    max_depth = 0
+
+    for name, node in functions:
+        complexity = cyclomatic_complexity(node)
+        visitor = _LoopVisitor(name, io_helpers)
+        for statement in node.body:
+            visitor.visit(statement)
+
+        max_complexity = max(max_complexity, complexity)
+        max_depth = max(max_depth, visitor.max_depth)
+        issues.extend(visitor.issues)
+
+        if complexity > COMPLEXITY_THRESHOLD:
+            issues.append({
+                "type": "high_complexity",
+                "severity": "medium",
+                "line": node.lineno,
+                "function": name,
+                "description": f"{name} has cyclomatic complexity {complexity}",
+                "suggestion": f"Split {name} into smaller functions or replace branch chains with lookup tables"
+            })
+        if visitor.max_depth >= DEEP_NESTING_THRESHOLD:
+            issues.append({
+                "type": "deep_loop_nesting",
+                "severity": "medium",
+                "line": node.lineno,
+                "function": name,
+                "description": f"{name} nests loops {visitor.max_depth} deep",
+                "suggestion": f"Precompute lookups outside {name}'s outer loop so the inner loops can go"
+            })
+
+    issues.sort(key=lambda issue: issue["line"])
+
+    suggestions = []
+    for issue in issues:
+        suggestion = f"{file_path}:{issue['line']} {issue['function']}: {issue['suggestion']}"
+        if suggestion not in suggestions:
+            suggestions.append(suggestion)
+
+    # Scaled so that files with several real findings land above phase 2's threshold of 7
+    score = min(4, max_complexity // 3) + sum(SEVERITY_POINTS[issue["severity"]] for issue in issues)
+
+    return CodeAnalysis(
+        file_path=file_path,
+        issues=issues,
+        suggestions=suggestions,
+        complexity_score=max(1, min(10, score)),
+        functions=len(functions),
+        max_complexity=max_complexity,
+        max_loop_depth=max_depth
+    )
+
+def analyze_file(repo_path: str, relative_path: str) -> Optional[CodeAnalysis]:
+    path = os.path.join(repo_path, relative_path)
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return None
+        with open(path, encoding="utf-8", errors="replace") as f:
+            source = f.read()
+    except OSError as e:
+        logger.debug(f"Skipping {relative_path}: {str(e)}")
+        return None
+
+    return analyze_source(relative_path, source)
+
+def _hottest_first(analyses: List[CodeAnalysis]) -> List[CodeAnalysis]:
+    return sorted(analyses, key=lambda analysis: (-analysis.complexity_score, analysis.file_path))
+
+def _parse_raw_diff(raw: str) -> List[Tuple[str, str, str]]:
+    """(status, new blob, path) from ``git diff --raw -z --no-abbrev``, regular files only"""
+    fields = raw.split("\0")
+    changes = []
+    for index in range(0, len(fields) - 1, 2):
+        meta, path = fields[index], fields[index + 1]
+        if not meta.startswith(":"):
+            break
+        _, new_mode, _, new_blob, status = meta[1:].split(" ")
+        if status == "D" or new_mode.startswith("100"):
+            changes.append((status, new_blob, path))
+    return changes
+
+def _parse_ls_tree(raw: str) -> List[Tuple[str, str]]:
+    """(blob, path) of the regular files in ``git ls-tree -r -z`` output"""
+    entries = []
+    for record in raw.split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        mode, kind, blob = meta.split(" ")
+        if kind == "blob" and mode.startswith("100"):
+            entries.append((blob, path))
+    return entries
+
+def _analyze_chunk(repo_path: str, paths: List[str]) -> List[CodeAnalysis]:
+    """Analyze a chunk of files; runs in a pool process"""
+    return [analysis for analysis in (analyze_file(repo_path, path) for path in paths) if analysis is not None]
+
+class StaticCodeAnalyzer:
+    """Finds optimization opportunities by parsing the repository's Python files.
+
+    Reports cyclomatic complexity and loop nesting per function, and
+    flags collections rescanned inside loops over themselves, ``.index()``
+    searches inside loops and network or database calls made once per
+    iteration, each with its file and line.
+
+    Parsing runs on a pool of ``workers`` processes, ``chunk_files`` files
+    per task, so it neither blocks the event loop nor contends for the GIL,
+    and analyses are yielded as their chunk finishes.
+
+    With a ``cache`` and a repository ID, only files that changed since the
+    repository's last analyzed commit are looked at, and of those only
+    the ones whose blob has not been analyzed before are parsed.
+    """
+
+    def __init__(self, cache: Optional[AnalysisCache] = None, workers: Optional[int] = None, chunk_files: int = 32):
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_files = chunk_files
+        self.files_parsed = 0
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def _parse(self, repo_path: str, paths: List[str]) -> AsyncIterator[List[CodeAnalysis]]:
+        """Parse ``paths`` on the process pool, yielding each chunk's analyses, hottest first, as it finishes"""
+        if not paths:
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+
+        async def parse(chunk: List[str]) -> List[CodeAnalysis]:
+            analyses = await loop.run_in_executor(pool, _analyze_chunk, repo_path, chunk)
+            self.files_parsed += len(chunk)
+            return analyses
+
+        tasks = [asyncio.ensure_future(parse(paths[index:index + self.chunk_files])) for index in range(0, len(paths), self.chunk_files)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield _hottest_first(await next_done)
+        except BrokenProcessPool:
+            # A worker died; the next analysis starts a fresh pool
+            if self._pool is pool:
+                self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            # The consumer may stop early; chunks that have not started are dropped
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _lookup(self, entries: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, CodeAnalysis]], List[Tuple[str, str]]]:
+        """Split (blob, path) entries into cached (blob, analysis) pairs and ones still to parse"""
+        found = []
+        missing = []
+        for blob, path in entries:
+            cached = self.cache.get_analysis(blob, path, ANALYZER_VERSION)
+            if cached is not None:
+                found.append((blob, cached))
+            else:
+                missing.append((blob, path))
+        return found, missing
+
+    async def _changes(self, repo_path: str, repository_id: str) -> Optional[Tuple[str, List[str], List[Tuple[str, str]], bool]]:
+        """(head, removed paths, (blob, path) entries to analyze, whether totals start over), or None outside git"""
+        head = await git_output(repo_path, "rev-parse", "HEAD")
+        if head is None:
+            return None
+        head = head.strip()
+
+        state = self.cache.get_state(repository_id)
+        raw_diff = None
+        if state is not None and state["version"] == ANALYZER_VERSION:
+            raw_diff = await git_output(repo_path, "diff", "--raw", "-z", "--no-renames", "--no-abbrev", state["commit"], head)
+
+        if raw_diff is not None:
+            changes = [change for change in _parse_raw_diff(raw_diff) if is_analyzed_file(change[2])]
+            removed = [path for status, _, path in changes if status == "D"]
+            entries = [(blob, path) for status, blob, path in changes if status != "D"]
+            return head, removed, entries, False
+
+        # First analysis, analyzer upgrade or unknown base commit: index the whole tree
+        tree = await git_output(repo_path, "ls-tree", "-r", "-z", "--full-tree", head)
+        if tree is None:
+            return None
+        return head, [], [(blob, path) for blob, path in _parse_ls_tree(tree) if is_analyzed_file(path)], True
+
+    async def _analyze_incremental(self, repo_path: str, repository_id: str, head: str, removed: List[str], entries: List[Tuple[str, str]], reset: bool) -> AsyncIterator[CodeAnalysis]:
+        found, missing = await asyncio.to_thread(self._lookup, entries)
+        for _, analysis in sorted(found, key=lambda pair: (-pair[1].complexity_score, pair[1].file_path)):
+            yield analysis
+
+        blobs = {path: blob for blob, path in missing}
+        updated = list(found)
+        async for analyses in self._parse(repo_path, [path for _, path in missing]):
+            parsed = [(blobs[analysis.file_path], analysis) for analysis in analyses]
+            await asyncio.to_thread(self.cache.put_analyses, ANALYZER_VERSION, parsed)
+            updated.extend(parsed)
+            for analysis in analyses:
+                yield analysis
+
+        # Files that no longer parse drop out of the totals like deleted ones
+        analyzed = {analysis.file_path for _, analysis in updated}
+        removed += [path for _, path in entries if path not in analyzed]
+
+        totals = await asyncio.to_thread(self.cache.update_repository, repository_id, head, ANALYZER_VERSION, removed, updated, reset)
+        logger.info(f"Analyzed {len(entries)} changed files of {repository_id} at {head[:8]}; {totals['files']} files, {totals['issues']} issues in total")
+
+    async def analyze_codebase(self, repo_path: str, repository_id: Optional[str] = None) -> AsyncIterator[CodeAnalysis]:
+        """Analyze the Python files under ``repo_path``, yielding each file's analysis as soon as it is ready.
+
+        With a cache and ``repository_id``, covers only the files that
+        changed since the repository was last analyzed (all files the first
+        time); cached ones come first. The repository's state only moves
+        on once every file has been yielded, so a consumer that stops early
+        gets the same files again next time.
+        """
+        changes = None
+        if self.cache is not None and repository_id is not None:
+            changes = await self._changes(repo_path, repository_id)
+
+        if changes is not None:
+            async for analysis in self._analyze_incremental(repo_path, repository_id, *changes):
+                yield analysis
+            return
+
+        paths = await asyncio.to_thread(iter_python_files, repo_path)
+        async for analyses in self._parse(repo_path, paths):
+            for analysis in analyses:
+                yield analysis
+
+    def repository_summary(self, repository_id: str, limit: int = 20) -> Optional[Dict]:
+        """Totals and hottest files as of the repository's last analyzed commit"""
+        if self.cache is None:
+            return None
+        state = self.cache.get_state(repository_id)
+        if state is None:
+            return None
+        return {
+            "commit": state["commit"],
+            "analyzed_at": state["analyzed_at"],
+            **state["totals"],
+            "hot_files": self.cache.hot_files(repository_id, limit=limit)
+        }
+
+    def stats(self) -> Dict:
+        return {"workers": self.workers, "files_parsed": self.files_parsed, **(self.cache.stats() if self.cache else {})}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self.cache is not None:
+            self.cache.close()
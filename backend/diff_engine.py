@@ -0,0 +1,151 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Optional
+
+# Upper bound for the diff stored on a PullRequest; the full diff can always be streamed
+DEFAULT_MAX_DIFF_BYTES = 256 * 1024
+
+@dataclass
+class FileDiff:
+    """Unified diff of one file, split into its header and hunks"""
+    old_path: Optional[str]
+    new_path: Optional[str]
+    header: List[str] = field(default_factory=list)
+    hunks: List[List[str]] = field(default_factory=list)
+    binary: bool = False
+    renamed: bool = False
+
+    @property
+    def additions(self) -> int:
+        return sum(1 for hunk in self.hunks for line in hunk[1:] if line.startswith("+"))
+
+    @property
+    def deletions(self) -> int:
+        return sum(1 for hunk in self.hunks for line in hunk[1:] if line.startswith("-"))
+
+@dataclass
+class DiffSummary:
+    text: str
+    files: int = 0
+    additions: int = 0
+    deletions: int = 0
+    binary_skipped: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+def _strip_prefix(path: str) -> Optional[str]:
+    if path == "/dev/null":
+        return None
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+async def _git_lines(repo_path: str, *args: str) -> AsyncIterator[str]:
+    process = await asyncio.create_subprocess_exec(
+        "git", "-C", repo_path, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        async for raw in process.stdout:
+            yield raw.decode("utf-8", errors="replace").rstrip("\n")
+    finally:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
+
+async def git_output(repo_path: str, *args: str) -> Optional[str]:
+    """stdout of a git command, or None if it failed"""
+    process = await asyncio.create_subprocess_exec(
+        "git", "-C", repo_path, *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await process.communicate()
+    return stdout.decode("utf-8", errors="replace") if process.returncode == 0 else None
+
+async def iter_file_diffs(repo_path: str, base: str = "HEAD", find_renames: bool = True) -> AsyncIterator[FileDiff]:
+    """Stream the diff between ``base`` and the working tree one file at a time.
+
+    New untracked files are included, renames are detected, and binary
+    files are reported with ``binary`` set and no hunks. Only one file is
+    held in memory at a time.
+    """
+    # Intent-to-add makes untracked files show up in the diff without staging their content
+    intent = await asyncio.create_subprocess_exec("git", "-C", repo_path, "add", "--intent-to-add", "--all", stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL)
+    await intent.wait()
+
+    args = ["diff", "--no-color", "--no-ext-diff", base]
+    if find_renames:
+        args.insert(1, "-M")
+
+    current: Optional[FileDiff] = None
+
+    async for line in _git_lines(repo_path, *args):
+        if line.startswith("diff --git "):
+            if current is not None:
+                yield current
+            # Paths from "diff --git a/old b/new"; the ---/+++ lines refine them, but binaries have none
+            old_path, _, new_path = line[len("diff --git "):].partition(" b/")
+            current = FileDiff(old_path=_strip_prefix(old_path), new_path=new_path, header=[line])
+            continue
+
+        if current is None:
+            continue
+
+        if line.startswith("@@"):
+            current.hunks.append([line])
+        elif current.hunks:
+            current.hunks[-1].append(line)
+        else:
+            current.header.append(line)
+            if line.startswith("--- "):
+                current.old_path = _strip_prefix(line[4:])
+            elif line.startswith("+++ "):
+                current.new_path = _strip_prefix(line[4:])
+            elif line.startswith("rename from "):
+                current.old_path, current.renamed = line[len("rename from "):], True
+            elif line.startswith("rename to "):
+                current.new_path = line[len("rename to "):]
+            elif line.startswith("new file mode"):
+                current.old_path = None
+            elif line.startswith("deleted file mode"):
+                current.new_path = None
+            elif line.startswith("Binary files ") or line == "GIT binary patch":
+                current.binary = True
+
+    if current is not None:
+        yield current
+
+async def unified_diff(repo_path: str, base: str = "HEAD", max_bytes: int = DEFAULT_MAX_DIFF_BYTES) -> DiffSummary:
+    """Collect the working tree diff for a pull request, skipping binaries and capping its size"""
+    summary = DiffSummary(text="")
+    parts: List[str] = []
+    size = 0
+
+    async for file_diff in iter_file_diffs(repo_path, base):
+        summary.files += 1
+        if file_diff.binary:
+            summary.binary_skipped.append(file_diff.new_path or file_diff.old_path)
+            continue
+
+        summary.additions += file_diff.additions
+        summary.deletions += file_diff.deletions
+        if summary.truncated:
+            continue
+
+        for block in [file_diff.header, *file_diff.hunks]:
+            chunk = "\n".join(block) + "\n"
+            if size + len(chunk) > max_bytes:
+                summary.truncated = True
+                break
+            parts.append(chunk)
+            size += len(chunk)
+
+    if summary.binary_skipped:
+        parts.append("".join(f"# Binary file skipped: {path}\n" for path in summary.binary_skipped))
+    if summary.truncated:
+        parts.append(f"# Diff truncated at {max_bytes} bytes ({summary.files} files, +{summary.additions} -{summary.deletions})\n")
+
+    summary.text = "".join(parts)
+    return summary
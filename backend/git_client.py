@@ -1,6 +1,6 @@
 import asyncio
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from models import PullRequest
@@ -12,8 +12,8 @@ class MockGitClient:
         self.base_url = "https://api.github.com"
         self.created_prs = []
         
-    async def clone_repository(self, repo_url: str) -> Dict[str, Any]:
-        """Simulate cloning a repository"""
+    async def clone_repository(self, repo_url: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Simulate cloning a repository at ``ref``"""
         await asyncio.sleep(1)  # Simulate clone time
         
         repo_name = repo_url.split('/')[-1].replace('.git', '')
@@ -27,12 +27,35 @@ class MockGitClient:
             "files_count": 47
         }
     
+    async def create_worktree(self, repo_path: str, name: str) -> Dict[str, Any]:
+        """Simulate creating an isolated working copy of a cloned repository"""
+        await asyncio.sleep(0.1)
+        
+        worktree_path = f"{repo_path}-worktrees/{name}-{uuid.uuid4().hex[:8]}"
+        
+        return {
+            "path": worktree_path,
+            "base_path": repo_path,
+            "status": "success"
+        }
+    
+    async def remove_worktree(self, worktree_path: str) -> Dict[str, Any]:
+        """Simulate removing a working copy created by create_worktree"""
+        await asyncio.sleep(0.05)
+        
+        return {
+            "path": worktree_path,
+            "status": "removed"
+        }
+    
     async def apply_fix(self, repo_path: str, test_name: str, fix_code: str) -> Dict[str, Any]:
         """Simulate applying a fix to the repository"""
         await asyncio.sleep(0.5)  # Simulate fix application time
         
-        # Determine which file to "fix" based on test name
-        if "authentication" in test_name:
+        # Optimizations name the file they change; test fixes are mapped from the test name
+        if test_name.endswith(".py"):
+            file_path = test_name
+        elif "authentication" in test_name:
             file_path = "src/auth/middleware.py"
         elif "validation" in test_name:
             file_path = "src/utils/validators.py"
@@ -48,7 +71,7 @@ class MockGitClient:
             "commit_hash": f"fix-{uuid.uuid4().hex[:8]}"
         }
     
-    async def generate_diff(self, code_changes: str) -> str:
+    async def generate_diff(self, code_changes: str, repo_path: Optional[str] = None) -> str:
         """Generate a realistic-looking diff for the changes"""
         
         # Create a mock diff that looks realistic
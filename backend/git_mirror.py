@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, Optional
+
+import git
+
+logger = logging.getLogger(__name__)
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class MirrorCache:
+    """Persistent bare mirrors of remote repositories, evicted LRU by disk budget.
+
+    The first job for a repository pays for a full ``git clone --mirror``;
+    later jobs only fetch new objects, and skip the fetch entirely when
+    the commit they need is already present. Mirrors that have worktrees
+    checked out are never evicted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._in_use: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self.clones = 0
+        self.fetches = 0
+        self.fetches_skipped = 0
+        self.evictions = 0
+
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.endswith(".git") and os.path.isdir(path):
+                self._sizes[path] = _dir_size(path)
+                self._last_used[path] = os.path.getmtime(path)
+                # Forget worktrees checked out by a previous run
+                try:
+                    git.Repo(path).git.worktree("prune")
+                except git.GitCommandError as e:
+                    logger.warning(f"Could not prune worktrees of {path}: {str(e)}")
+
+    def mirror_path(self, repo_url: str) -> str:
+        name = repo_url.rstrip("/").split("/")[-1].removesuffix(".git") or "repo"
+        digest = hashlib.sha1(repo_url.encode()).hexdigest()[:12]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    def lock(self, path: str) -> asyncio.Lock:
+        """Serializes fetches and worktree changes on one mirror"""
+        if path not in self._locks:
+            self._locks[path] = asyncio.Lock()
+        return self._locks[path]
+
+    async def ensure(self, repo_url: str, ref: Optional[str] = None) -> str:
+        """Create or update the mirror for ``repo_url``; must be called with its lock held"""
+        path = self.mirror_path(repo_url)
+
+        if not os.path.isdir(path):
+            started = time.perf_counter()
+            await asyncio.to_thread(git.Repo.clone_from, repo_url, path, mirror=True)
+            self.clones += 1
+            logger.info(f"Mirrored {repo_url} in {time.perf_counter() - started:.2f}s")
+        elif ref and await asyncio.to_thread(self.has_commit, path, ref):
+            self.fetches_skipped += 1
+        else:
+            await asyncio.to_thread(git.Repo(path).git.fetch, "--prune", "origin")
+            self.fetches += 1
+
+        self._sizes[path] = await asyncio.to_thread(_dir_size, path)
+        self.touch(path)
+
+        return path
+
+    def has_commit(self, path: str, ref: str) -> bool:
+        try:
+            git.Repo(path).git.rev_parse("--verify", "--quiet", f"{ref}^{{commit}}")
+            return True
+        except git.GitCommandError:
+            return False
+
+    def touch(self, path: str):
+        self._last_used[path] = time.time()
+        os.utime(path)
+
+    def acquire(self, path: str):
+        self._in_use[path] = self._in_use.get(path, 0) + 1
+
+    def release(self, path: str):
+        self._in_use[path] -= 1
+        if not self._in_use[path]:
+            del self._in_use[path]
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used idle mirrors until the cache fits its budget"""
+        total = sum(self._sizes.values())
+
+        for path in sorted(self._last_used, key=self._last_used.get):
+            if total <= self.max_bytes:
+                break
+            if path in self._in_use or (path in self._locks and self._locks[path].locked()):
+                continue
+
+            shutil.rmtree(path, ignore_errors=True)
+            total -= self._sizes.pop(path, 0)
+            self._last_used.pop(path, None)
+            self._locks.pop(path, None)
+            self.evictions += 1
+            logger.info(f"Evicted repository mirror {path}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mirrors": len(self._sizes),
+            "bytes": sum(self._sizes.values()),
+            "max_bytes": self.max_bytes,
+            "in_use": dict(self._in_use),
+            "clones": self.clones,
+            "fetches": self.fetches,
+            "fetches_skipped": self.fetches_skipped,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Set
+
+from diff_engine import git_output
+
+logger = logging.getLogger(__name__)
+
+# Changes to these can affect any test, so they always trigger a full run
+GLOBAL_FILES = {"conftest.py", "pytest.ini", "tox.ini", "setup.cfg", "setup.py", "pyproject.toml"}
+
+def _affects_everything(path: str) -> bool:
+    name = os.path.basename(path)
+    return name in GLOBAL_FILES or (name.startswith("requirements") and name.endswith(".txt"))
+
+def _is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+@dataclass
+class ImpactMap:
+    """Which repository files each test (by node ID) called into, as of ``commit``"""
+    commit: str
+    tests: Dict[str, List[str]] = field(default_factory=dict)
+    built_at: float = field(default_factory=time.time)
+    incremental_runs: int = 0
+
+@dataclass
+class TestSelection:
+    """Tests to run for a checkout; ``full`` means the whole suite"""
+    repository_id: str
+    head: Optional[str]
+    full: bool
+    reason: str
+    base: Optional[str] = None
+    changed_files: List[str] = field(default_factory=list)
+    node_ids: Set[str] = field(default_factory=set)
+    test_files: Set[str] = field(default_factory=set)
+
+    def includes(self, node_id: str) -> bool:
+        return self.full or node_id in self.node_ids or node_id.split("::")[0] in self.test_files
+
+def select_tests(impact_map: ImpactMap, changed_files: List[str]) -> Optional[Dict[str, Set[str]]]:
+    """Tests affected by ``changed_files``, or None if the change can affect any test"""
+    if any(_affects_everything(path) for path in changed_files):
+        return None
+
+    tests_by_file: Dict[str, Set[str]] = {}
+    for node_id, files in impact_map.tests.items():
+        for path in files:
+            tests_by_file.setdefault(path, set()).add(node_id)
+
+    node_ids: Set[str] = set()
+    test_files: Set[str] = set()
+    for path in changed_files:
+        node_ids.update(tests_by_file.get(path, ()))
+        # New or edited test files run in full, whether or not the map knows them
+        if _is_test_file(path):
+            test_files.add(path)
+
+    return {"node_ids": node_ids, "test_files": test_files}
+
+class ImpactMapStore:
+    """Per-repository impact maps kept as JSON files.
+
+    A full run with tracing builds a repository's map at the commit it
+    ran on. Later checkouts diff against that commit and only run the
+    tests that touched a changed file; their fresh traces are merged
+    back and the map moves to the new commit. Maps older than
+    ``max_age_seconds``, or refreshed incrementally ``max_incremental_runs``
+    times, are rebuilt by a full run.
+    """
+
+    def __init__(self, root: str, max_age_seconds: float = 7 * 24 * 3600, max_incremental_runs: int = 50):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.max_incremental_runs = max_incremental_runs
+
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.selections = 0
+        self.full_runs = 0
+
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, repository_id: str) -> str:
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in repository_id)
+        return os.path.join(self.root, f"{safe_id}.json")
+
+    def load(self, repository_id: str) -> Optional[ImpactMap]:
+        try:
+            with open(self._path(repository_id)) as f:
+                return ImpactMap(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable impact map for {repository_id}: {str(e)}")
+            return None
+
+    def save(self, repository_id: str, impact_map: ImpactMap):
+        path = self._path(repository_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(asdict(impact_map), f)
+        os.replace(temp_path, path)
+
+    def remove(self, repository_id: str):
+        try:
+            os.remove(self._path(repository_id))
+        except FileNotFoundError:
+            pass
+
+    def _lock(self, repository_id: str) -> asyncio.Lock:
+        if repository_id not in self._locks:
+            self._locks[repository_id] = asyncio.Lock()
+        return self._locks[repository_id]
+
+    async def select(self, repo_path: str, repository_id: str, base: Optional[str] = None, range_files: Optional[List[str]] = None) -> TestSelection:
+        """Decide which tests a clean checkout of ``repository_id`` needs to run.
+
+        ``range_files`` are the files changed between ``base`` and the
+        checkout; when the map was last moved to ``base`` they are exactly
+        the change to select for, and no diff is needed.
+        """
+        head = await git_output(repo_path, "rev-parse", "HEAD")
+        head = head.strip() if head else None
+
+        def full(reason: str) -> TestSelection:
+            self.full_runs += 1
+            return TestSelection(repository_id=repository_id, head=head, full=True, reason=reason)
+
+        impact_map = self.load(repository_id)
+        if head is None:
+            return full("the checkout has no commit")
+        if impact_map is None:
+            return full("no impact map yet")
+        if time.time() - impact_map.built_at > self.max_age_seconds or impact_map.incremental_runs >= self.max_incremental_runs:
+            return full("the impact map is due for a rebuild")
+
+        if range_files is not None and impact_map.commit == base:
+            changed_files = range_files
+            reason = f"{len(changed_files)} files changed in the pushed range {base[:8]}..{head[:8]}"
+        else:
+            diff = await git_output(repo_path, "diff", "--name-only", "--no-renames", impact_map.commit, head)
+            if diff is None:
+                return full(f"{impact_map.commit[:8]} is no longer in the repository")
+            changed_files = [line for line in diff.splitlines() if line]
+            reason = f"{len(changed_files)} files changed since {impact_map.commit[:8]}"
+
+        selected = select_tests(impact_map, changed_files)
+        if selected is None:
+            return full("test configuration or requirements changed")
+
+        self.selections += 1
+        return TestSelection(
+            repository_id=repository_id,
+            head=head,
+            full=False,
+            reason=reason,
+            base=impact_map.commit,
+            changed_files=changed_files,
+            **selected
+        )
+
+    async def update(self, selection: TestSelection, traces: Dict[str, List[str]], complete: bool):
+        """Record the traces of a run made for ``selection``.
+
+        Incomplete runs (collection errors, tests killed before reporting)
+        are not recorded, so the same changes are selected again next time.
+        """
+        if not complete or selection.head is None:
+            return
+
+        async with self._lock(selection.repository_id):
+            if selection.full:
+                self.save(selection.repository_id, ImpactMap(commit=selection.head, tests=traces))
+                return
+
+            impact_map = self.load(selection.repository_id)
+            # Another job moved the map on since this selection was made; its traces win
+            if impact_map is None or impact_map.commit != selection.base:
+                return
+
+            impact_map.tests.update(traces)
+            impact_map.commit = selection.head
+            impact_map.incremental_runs += 1
+            self.save(selection.repository_id, impact_map)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "maps": sum(1 for name in os.listdir(self.root) if name.endswith(".json")),
+            "selections": self.selections,
+            "full_runs": self.full_runs
+        }
@@ -0,0 +1,116 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from models import AgentJob, JobStatus
+from storage import JobStore, TERMINAL_STATUSES
+
+class JobEventHub:
+    """Pushes job log lines and status changes to any number of viewers.
+
+    The agent appends to ``job.logs`` directly, so one background task
+    checks the watched jobs every ``interval`` seconds and wakes their
+    viewers when the log length or status moved. Each viewer then sends
+    only what it has not seen yet, starting from the offset it asked for,
+    which makes reconnects resume instead of replaying the whole log.
+    """
+
+    def __init__(self, store: JobStore, interval: float = 0.2, heartbeat: float = 15.0):
+        self.store = store
+        self.interval = interval
+        self.heartbeat = heartbeat
+
+        self._watched: Dict[str, AgentJob] = {}
+        self._viewers: Dict[str, int] = {}
+        self._seen: Dict[str, Tuple[int, JobStatus]] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # Wake every viewer so their streams notice the shutdown
+        for event in self._changed.values():
+            event.set()
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+
+            for job_id, job in list(self._watched.items()):
+                state = (len(job.logs), job.status)
+                if state != self._seen.get(job_id):
+                    self._seen[job_id] = state
+                    self._changed[job_id].set()
+                    self._changed[job_id] = asyncio.Event()
+
+    def _watch(self, job: AgentJob):
+        self._viewers[job.id] = self._viewers.get(job.id, 0) + 1
+        if job.id not in self._watched:
+            self._watched[job.id] = job
+            self._seen[job.id] = (len(job.logs), job.status)
+            self._changed[job.id] = asyncio.Event()
+
+    def _unwatch(self, job_id: str):
+        self._viewers[job_id] -= 1
+        if self._viewers[job_id] == 0:
+            for registry in (self._viewers, self._watched, self._seen, self._changed):
+                registry.pop(job_id, None)
+
+    def viewers(self) -> int:
+        return sum(self._viewers.values())
+
+    async def stream(self, job_id: str, offset: int = 0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield log and status events for a job, ending after its final status.
+
+        Log events carry ``offset``, the number of lines delivered so far,
+        which is what a reconnecting viewer passes back. ``None`` is
+        yielded as a keep-alive when nothing happened for a while.
+        """
+        job = self.store.get_job(job_id)
+        if job is None:
+            return
+
+        self._watch(job)
+        offset = min(offset, len(job.logs))
+        sent_status = None
+
+        try:
+            while True:
+                # Take the wake-up event before reading, so a change made meanwhile is not missed
+                changed = self._changed[job_id]
+                logs = job.logs
+
+                for index in range(offset, len(logs)):
+                    yield {"type": "log", "offset": index + 1, "line": logs[index]}
+                offset = max(offset, len(logs))
+
+                if job.status != sent_status:
+                    sent_status = job.status
+                    yield {
+                        "type": "status",
+                        "offset": offset,
+                        "status": job.status.value,
+                        "error": job.error,
+                        "completed_at": job.completed_at.isoformat() if job.completed_at else None
+                    }
+
+                if job.status in TERMINAL_STATUSES:
+                    yield {"type": "end", "offset": offset, "status": job.status.value}
+                    return
+
+                if self._task is None:
+                    return
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._unwatch(job_id)
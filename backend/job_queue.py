@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from models import Repository, CommitEvent, AgentJob
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AgentJob, Repository, CommitEvent], Awaitable[Any]]
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+@dataclass
+class QueuedJob:
+    job: AgentJob
+    repository: Repository
+    commit_event: CommitEvent
+    key: Optional[str] = None  # Jobs with the same key are coalesced while queued
+    ready_at: float = 0.0  # time.monotonic() before which the job is held back
+
+class JobQueue:
+    """Bounded job queue drained by a fixed pool of async workers.
+
+    Jobs wait in FIFO order, but a worker skips over jobs whose repository
+    already has ``per_repo_limit`` jobs running, so one busy repository
+    cannot hold up the others. A job submitted with a ``key`` and a
+    ``delay`` is held back for that long, and while it waits newer work
+    for the same key can be folded into it with ``supersede``.
+    """
+
+    def __init__(self, handler: JobHandler, max_size: int = 100, num_workers: int = 4, per_repo_limit: int = 1):
+        self.handler = handler
+        self.max_size = max_size
+        self.num_workers = num_workers
+        self.per_repo_limit = per_repo_limit
+
+        self._pending: Deque[QueuedJob] = deque()
+        self._by_key: Dict[str, QueuedJob] = {}
+        self._running: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+        self.processed_count = 0
+        self.rejected_count = 0
+        self.superseded_count = 0
+
+    def submit(self, job: AgentJob, repository: Repository, commit_event: CommitEvent, key: Optional[str] = None, delay: float = 0.0) -> int:
+        """Queue a job and return its 1-based position in the queue"""
+        if len(self._pending) >= self.max_size:
+            self.rejected_count += 1
+            raise QueueFullError(f"Job queue is full ({self.max_size} jobs pending)")
+
+        entry = QueuedJob(job, repository, commit_event, key, time.monotonic() + delay)
+        self._pending.append(entry)
+        if key is not None:
+            self._by_key[key] = entry
+        self._wakeup.set()
+
+        return len(self._pending)
+
+    def pending_for(self, key: str) -> Optional[QueuedJob]:
+        """The queued job holding ``key``, if it has not started yet"""
+        return self._by_key.get(key)
+
+    def supersede(self, entry: QueuedJob, commit_event: CommitEvent, delay: float = 0.0) -> int:
+        """Replace a queued job's commit event and restart its hold-back delay; returns its position"""
+        entry.commit_event = commit_event
+        entry.ready_at = time.monotonic() + delay
+        self.superseded_count += 1
+        self._wakeup.set()
+
+        return self._pending.index(entry) + 1
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Get the 1-based queue position of a pending job"""
+        for index, entry in enumerate(self._pending):
+            if entry.job.id == job_id:
+                return index + 1
+        return None
+
+    async def start(self):
+        """Spawn the worker tasks"""
+        if self._workers:
+            return
+
+        for worker_id in range(self.num_workers):
+            self._workers.append(asyncio.create_task(self._worker(worker_id)))
+
+        logger.info(f"Job queue started with {self.num_workers} workers")
+
+    async def stop(self):
+        """Cancel the worker tasks; pending jobs stay queued"""
+        for task in self._workers:
+            task.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and worker utilisation"""
+        return {
+            "pending": len(self._pending),
+            "running": sum(self._running.values()),
+            "running_by_repository": dict(self._running),
+            "max_size": self.max_size,
+            "workers": self.num_workers,
+            "per_repository_limit": self.per_repo_limit,
+            "processed": self.processed_count,
+            "rejected": self.rejected_count,
+            "superseded": self.superseded_count
+        }
+
+    def _next_runnable(self) -> Optional[QueuedJob]:
+        """Pop the oldest ready job whose repository is below its concurrency limit"""
+        now = time.monotonic()
+        for entry in self._pending:
+            if entry.ready_at <= now and self._running.get(entry.repository.id, 0) < self.per_repo_limit:
+                self._pending.remove(entry)
+                if entry.key is not None and self._by_key.get(entry.key) is entry:
+                    del self._by_key[entry.key]
+                return entry
+        return None
+
+    def _next_ready_in(self) -> Optional[float]:
+        """Seconds until the earliest held-back job becomes ready"""
+        held = [entry.ready_at for entry in self._pending if entry.ready_at > time.monotonic()]
+        return max(0.0, min(held) - time.monotonic()) if held else None
+
+    async def _worker(self, worker_id: int):
+        while True:
+            entry = self._next_runnable()
+
+            if entry is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_ready_in())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            repo_id = entry.repository.id
+            self._running[repo_id] = self._running.get(repo_id, 0) + 1
+
+            try:
+                await self.handler(entry.job, entry.repository, entry.commit_event)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on job {entry.job.id}: {str(e)}")
+            finally:
+                self._running[repo_id] -= 1
+                if not self._running[repo_id]:
+                    del self._running[repo_id]
+
+                self.processed_count += 1
+                # A repository slot was freed, so a skipped job may now be runnable
+                self._wakeup.set()
@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from llm_scheduler import BudgetExceededError, current_budget, estimate_tokens
+from llm_stream import CODE_FIELDS
+from singleflight import SingleFlight
+
+# Bump when prompts or response shapes change so stale entries stop matching
+CACHE_KEY_VERSION = 1
+
+# Object addresses in tracebacks and reprs differ on every run
+_ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]+")
+
+def _normalize(value: Any) -> Any:
+    """Normalize prompt inputs so cosmetic differences hash the same"""
+    if isinstance(value, str):
+        return _ADDRESS_RE.sub("0x?", " ".join(value.split()))
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+def make_cache_key(model: str, method: str, inputs: Dict[str, Any], source: Optional[str] = None) -> str:
+    """Content hash of everything that determines an LLM response"""
+    payload = json.dumps({
+        "version": CACHE_KEY_VERSION,
+        "model": model,
+        "method": method,
+        "inputs": _normalize(inputs),
+        "source": hashlib.sha256(source.encode()).hexdigest() if source is not None else None
+    }, sort_keys=True, default=str)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    """Two-tier LLM response cache: an in-memory LRU in front of SQLite.
+
+    Entries expire after ``ttl_seconds``. The memory tier holds at most
+    ``memory_size`` entries; the disk tier evicts least recently used rows
+    once it grows past ``max_disk_bytes``. Pass ``path=None`` for a
+    memory-only cache.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = 256, ttl_seconds: int = 7 * 24 * 3600, max_disk_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            self._open_disk(path)
+
+    def _open_disk(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at)")
+
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a response, promoting disk hits into the memory tier"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created_at, size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    raw, created_at, size = row
+                    if now - created_at <= self.ttl_seconds:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        value = json.loads(raw)
+                        self._remember(key, created_at, value)
+                        self.disk_hits += 1
+                        return copy.deepcopy(value)
+
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._disk_bytes -= size
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a response in both tiers"""
+        now = time.time()
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            self._remember(key, now, value)
+
+            if self._db is not None:
+                raw = json.dumps(value, default=str)
+                old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, raw, len(raw), now, now)
+                )
+                self._disk_bytes += len(raw) - (old[0] if old else 0)
+                self._evict_disk()
+
+    def _remember(self, key: str, created_at: float, value: Dict[str, Any]):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        """Drop least recently used rows until the disk tier fits its budget"""
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                break
+
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in rows])
+            self._disk_bytes -= sum(size for _, size in rows)
+            self.evictions += len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier sizes"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+            "persistent": self._db is not None
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class CachedLLMClient:
+    """Wraps an LLM client and serves repeated prompts from a ResponseCache.
+
+    The optional ``source`` argument carries the code the prompt is about;
+    it only feeds the cache key, so an edited file never reuses an answer
+    given for its old contents. Misses for the same key that arrive while a
+    call is already running share that call instead of starting another.
+    Streaming calls share the cache but are never coalesced, since each
+    consumer needs its own token stream.
+    """
+
+    def __init__(self, client, cache: ResponseCache, flights: Optional[SingleFlight] = None):
+        self.client = client
+        self.cache = cache
+        self.flights = flights or SingleFlight()
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def _key(self, method: str, inputs: Dict[str, Any], source: Optional[str], key_inputs: Optional[Dict[str, Any]]) -> str:
+        return make_cache_key(self.client.model, method, inputs if key_inputs is None else key_inputs, source)
+
+    async def _cached(self, method: str, inputs: Dict[str, Any], source: Optional[str] = None, key_inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = self._key(method, inputs, source, key_inputs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def fetch() -> Dict[str, Any]:
+            response = await getattr(self.client, method)(**inputs)
+            self.cache.set(key, response)
+            return response
+
+        # The shared call serves every waiting job, so it runs outside any one job's budget;
+        # each caller checks and pays from its own budget here instead
+        shared = contextvars.copy_context()
+        shared.run(current_budget.set, None)
+
+        budget = current_budget.get()
+        if budget is None:
+            return await self.flights.do(key, fetch, context=shared)
+
+        budget.check()
+        try:
+            response = await asyncio.wait_for(self.flights.do(key, fetch, context=shared), budget.remaining_seconds())
+        except asyncio.TimeoutError:
+            raise BudgetExceededError("LLM time budget exhausted")
+
+        budget.charge(estimate_tokens(inputs) + estimate_tokens(response))
+        return response
+
+    async def _cached_stream(self, method: str, inputs: Dict[str, Any], source: Optional[str] = None, key_inputs: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        key = self._key(method, inputs, source, key_inputs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            # A hit has no tokens to replay; hand over the code and the result at once
+            for name in CODE_FIELDS:
+                if name in cached:
+                    yield {"type": "code", "field": name, "code": cached[name]}
+            yield {"type": "result", "data": cached}
+            return
+
+        async with aclosing(getattr(self.client, f"stream_{method}")(**inputs)) as events:
+            async for event in events:
+                if event["type"] == "result":
+                    self.cache.set(key, event["data"])
+                yield event
+
+    async def analyze_test_failure(self, test_name: str, error_message: str, commit_message: str, source: Optional[str] = None) -> Dict[str, Any]:
+        # The commit message is context only; leaving it out of the key lets
+        # the same failure on the next commit reuse the earlier analysis
+        return await self._cached("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        }, source, key_inputs={
+            "test_name": test_name,
+            "error_message": error_message
+        })
+
+    def stream_analyze_test_failure(self, test_name: str, error_message: str, commit_message: str, source: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        return self._cached_stream("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        }, source, key_inputs={
+            "test_name": test_name,
+            "error_message": error_message
+        })
+
+    async def suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str], source: Optional[str] = None) -> Dict[str, Any]:
+        return await self._cached("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        }, source)
+
+    def stream_suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str], source: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        return self._cached_stream("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        }, source)
+
+    async def analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> Dict[str, Any]:
+        return await self._cached("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    def stream_analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._cached_stream("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    async def suggest_preparatory_work(self, feature_description: str, commit_message: str) -> Dict[str, Any]:
+        return await self._cached("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    def stream_suggest_preparatory_work(self, feature_description: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._cached_stream("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    async def health_check(self) -> Dict[str, Any]:
+        return await self.client.health_check()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.stats(),
+            "coalescing": self.flights.stats()
+        }
@@ -1,16 +1,34 @@
 import asyncio
 import random
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any
+
+from llm_stream import CODE_FIELDS, StreamWatcher, render_response, split_tokens
 
 class OllamaClient:
     """Mock Ollama client that simulates LLM responses for demo purposes"""
     
+    # Lets LLMScheduler hand several queued prompts to run_batch at once
+    supports_batching = True
+    
     def __init__(self):
         self.model = "codellama:7b"  # Simulated model
+    
+    async def run_batch(self, method: str, inputs_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Simulate one batched generation answering several prompts of the same kind"""
+        return await asyncio.gather(*[getattr(self, method)(**inputs) for inputs in inputs_list])
         
     async def analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> Dict[str, Any]:
         """Simulate LLM analysis of test failures"""
         await asyncio.sleep(1)  # Simulate LLM processing time
+        return self._test_failure_response(test_name, error_message, commit_message)
+    
+    async def stream_analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of analyze_test_failure"""
+        async for event in self._stream(self._test_failure_response(test_name, error_message, commit_message), 1):
+            yield event
+    
+    def _test_failure_response(self, test_name: str, error_message: str, commit_message: str) -> Dict[str, Any]:
+        """Canned fix analysis chosen by the failing test's name"""
         
         # Generate realistic fix analysis based on test name and error
         if "authentication" in test_name.lower():
@@ -89,6 +107,15 @@ def fixed_function(input_data):
     async def suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> Dict[str, Any]:
         """Simulate LLM optimization suggestions"""
         await asyncio.sleep(1.5)  # Simulate LLM processing time
+        return self._optimization_response(file_path, issues, suggestions)
+    
+    async def stream_suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of suggest_optimization"""
+        async for event in self._stream(self._optimization_response(file_path, issues, suggestions), 1.5):
+            yield event
+    
+    def _optimization_response(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> Dict[str, Any]:
+        """Canned optimization chosen by the file path"""
         
         if "data_processor" in file_path:
             return {
@@ -186,6 +213,15 @@ class PaymentService:
     async def analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> Dict[str, Any]:
         """Simulate LLM analysis of roadmap alignment"""
         await asyncio.sleep(1)  # Simulate processing time
+        return self._roadmap_alignment_response(commit_message, feature_description, feature_summary)
+    
+    async def stream_analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of analyze_roadmap_alignment"""
+        async for event in self._stream(self._roadmap_alignment_response(commit_message, feature_description, feature_summary), 1):
+            yield event
+    
+    def _roadmap_alignment_response(self, commit_message: str, feature_description: str, feature_summary: str) -> Dict[str, Any]:
+        """Keyword-overlap alignment score between a commit and a feature"""
         
         # Simple keyword matching for demo
         commit_words = set(commit_message.lower().split())
@@ -207,6 +243,15 @@ class PaymentService:
     async def suggest_preparatory_work(self, feature_description: str, commit_message: str) -> Dict[str, Any]:
         """Simulate LLM suggestions for preparatory work"""
         await asyncio.sleep(1)
+        return self._preparatory_work_response(feature_description, commit_message)
+    
+    async def stream_suggest_preparatory_work(self, feature_description: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of suggest_preparatory_work"""
+        async for event in self._stream(self._preparatory_work_response(feature_description, commit_message), 1):
+            yield event
+    
+    def _preparatory_work_response(self, feature_description: str, commit_message: str) -> Dict[str, Any]:
+        """Canned preparatory work suggestions"""
         
         # Generate realistic preparatory work suggestions
         prep_suggestions = [
@@ -242,6 +287,28 @@ class UserManager:
             "confidence": 0.86
         }
     
+    async def _stream(self, response: Dict[str, Any], latency: float) -> AsyncIterator[Dict[str, Any]]:
+        """Simulate token streaming of a response over the same total latency.
+
+        Yields ``token`` events with text chunks, a ``code`` event as soon as
+        the fenced code block has been streamed, and a final ``result`` event
+        carrying the structured response.
+        """
+        tokens = split_tokens(render_response(response))
+        delay = latency / max(len(tokens), 1)
+        code_field = next((name for name in CODE_FIELDS if name in response), None)
+        watcher = StreamWatcher()
+        
+        for token in tokens:
+            await asyncio.sleep(delay)
+            yield {"type": "token", "text": token}
+            
+            _, blocks = watcher.feed(token)
+            if blocks and code_field:
+                yield {"type": "code", "field": code_field, "code": blocks[0]}
+        
+        yield {"type": "result", "data": response}
+    
     async def health_check(self) -> Dict[str, Any]:
         """Simulate Ollama health check"""
         await asyncio.sleep(0.1)
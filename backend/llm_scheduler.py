@@ -0,0 +1,299 @@
+import asyncio
+import heapq
+import itertools
+import json
+import time
+from contextlib import aclosing
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+class Priority(IntEnum):
+    BUG_FIX = 0
+    OPTIMIZATION = 1
+    ROADMAP = 2
+
+METHOD_PRIORITIES = {
+    "analyze_test_failure": Priority.BUG_FIX,
+    "suggest_optimization": Priority.OPTIMIZATION,
+    "analyze_roadmap_alignment": Priority.ROADMAP,
+    "suggest_preparatory_work": Priority.ROADMAP
+}
+
+class BudgetExceededError(Exception):
+    """Raised when a job has used up its LLM token or time budget"""
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) for budget accounting"""
+    return max(1, len(json.dumps(value, default=str)) // 4)
+
+class JobBudget:
+    """Token and wall-clock allowance for the LLM calls of one job"""
+
+    def __init__(self, max_tokens: int, max_seconds: float):
+        self.max_tokens = max_tokens
+        self.deadline = time.monotonic() + max_seconds
+        self.tokens_used = 0
+        self.calls = 0
+
+    def remaining_seconds(self) -> float:
+        return self.deadline - time.monotonic()
+
+    def check(self):
+        if self.tokens_used >= self.max_tokens:
+            raise BudgetExceededError(f"LLM token budget of {self.max_tokens} exhausted")
+        if self.remaining_seconds() <= 0:
+            raise BudgetExceededError("LLM time budget exhausted")
+
+    def charge(self, tokens: int):
+        self.tokens_used += tokens
+        self.calls += 1
+
+# Set by the agent for the duration of a job; tasks spawned by the job inherit it
+current_budget: ContextVar[Optional[JobBudget]] = ContextVar("current_budget", default=None)
+
+@dataclass(order=True)
+class _Request:
+    priority: int
+    seq: int
+    method: str = field(compare=False)
+    inputs: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    # Streaming requests only reserve a slot; the caller consumes the stream itself
+    stream: bool = field(default=False, compare=False)
+
+class LLMScheduler:
+    """Central gate in front of an LLM client.
+
+    At most ``max_concurrency`` generations run at once. Waiting requests
+    are served by priority (bug fixes, then optimizations, then roadmap
+    work) and FIFO within a priority. If the client has ``supports_batching``
+    set, queued requests for the same method are handed to its ``run_batch``
+    together, up to ``max_batch_size`` at a time. Streaming calls queue the
+    same way and hold their slot until the stream is exhausted or closed.
+    """
+
+    def __init__(self, client, max_concurrency: int = 2, max_batch_size: int = 4):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+
+        self._queue: List[_Request] = []
+        self._seq = itertools.count()
+        self._active = 0
+
+        self.completed = 0
+        self.batches = 0
+        self.budget_rejections = 0
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    def _check_budget(self, budget: Optional[JobBudget]):
+        if budget is None:
+            return
+
+        try:
+            budget.check()
+        except BudgetExceededError:
+            self.budget_rejections += 1
+            raise
+
+    def _enqueue(self, method: str, inputs: Dict[str, Any], stream: bool = False) -> _Request:
+        request = _Request(
+            METHOD_PRIORITIES.get(method, Priority.ROADMAP),
+            next(self._seq),
+            method,
+            inputs,
+            asyncio.get_running_loop().create_future(),
+            stream
+        )
+        heapq.heappush(self._queue, request)
+        self._dispatch()
+
+        return request
+
+    async def _wait(self, request: _Request, budget: Optional[JobBudget]) -> Any:
+        if budget is None:
+            return await request.future
+
+        try:
+            return await asyncio.wait_for(request.future, budget.remaining_seconds())
+        except asyncio.TimeoutError:
+            self.budget_rejections += 1
+            raise BudgetExceededError("LLM time budget exhausted")
+
+    async def _submit(self, method: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        budget = current_budget.get()
+        self._check_budget(budget)
+
+        request = self._enqueue(method, inputs)
+        response = await self._wait(request, budget)
+
+        if budget is not None:
+            budget.charge(estimate_tokens(inputs) + estimate_tokens(response))
+
+        return response
+
+    async def _submit_stream(self, method: str, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        budget = current_budget.get()
+        self._check_budget(budget)
+
+        request = self._enqueue(method, inputs, stream=True)
+        try:
+            await self._wait(request, budget)
+        except BaseException:
+            # The slot may have been granted just as the caller gave up
+            if request.future.done() and not request.future.cancelled():
+                self._release(1)
+            raise
+
+        response = None
+        try:
+            # Closed right here, not when collected, so the backend sees an abandoned stream at once
+            async with aclosing(getattr(self.client, f"stream_{method}")(**inputs)) as events:
+                async for event in events:
+                    if budget is not None and budget.remaining_seconds() <= 0:
+                        self.budget_rejections += 1
+                        raise BudgetExceededError("LLM time budget exhausted")
+
+                    if event["type"] == "result":
+                        response = event["data"]
+                    yield event
+        finally:
+            self._release(1)
+
+        if budget is not None and response is not None:
+            budget.charge(estimate_tokens(inputs) + estimate_tokens(response))
+
+    def _dispatch(self):
+        """Start queued requests while generation slots are free"""
+        while self._active < self.max_concurrency and self._queue:
+            request = heapq.heappop(self._queue)
+            if request.future.done():
+                # The caller gave up (cancelled or out of time) while queued
+                continue
+
+            self._active += 1
+
+            if request.stream:
+                # Hand the slot to the streaming caller
+                request.future.set_result(None)
+                continue
+
+            batch = [request]
+            if getattr(self.client, "supports_batching", False):
+                batch.extend(self._take_batch_mates(request))
+
+            asyncio.create_task(self._run(batch))
+
+    def _take_batch_mates(self, head: _Request) -> List[_Request]:
+        mates = [
+            r for r in sorted(self._queue)
+            if r.method == head.method and not r.stream and not r.future.done()
+        ][:self.max_batch_size - 1]
+
+        if mates:
+            self._queue = [r for r in self._queue if r not in mates]
+            heapq.heapify(self._queue)
+
+        return mates
+
+    async def _run(self, batch: List[_Request]):
+        try:
+            if len(batch) == 1:
+                responses = [await getattr(self.client, batch[0].method)(**batch[0].inputs)]
+            else:
+                self.batches += 1
+                responses = await self.client.run_batch(batch[0].method, [r.inputs for r in batch])
+
+            for request, response in zip(batch, responses):
+                if not request.future.done():
+                    request.future.set_result(response)
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._release(len(batch))
+
+    def _release(self, completed: int):
+        """Free a generation slot and start whatever is next in line"""
+        self.completed += completed
+        self._active -= 1
+        self._dispatch()
+
+    async def analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> Dict[str, Any]:
+        return await self._submit("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        })
+
+    def stream_analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._submit_stream("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        })
+
+    async def suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> Dict[str, Any]:
+        return await self._submit("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        })
+
+    def stream_suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        return self._submit_stream("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        })
+
+    async def analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> Dict[str, Any]:
+        return await self._submit("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    def stream_analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._submit_stream("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    async def suggest_preparatory_work(self, feature_description: str, commit_message: str) -> Dict[str, Any]:
+        return await self._submit("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    def stream_suggest_preparatory_work(self, feature_description: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._submit_stream("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    async def health_check(self) -> Dict[str, Any]:
+        return await self.client.health_check()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get slot usage, queue depth per priority and budget rejections"""
+        waiting = {p.name.lower(): 0 for p in Priority}
+        for request in self._queue:
+            if not request.future.done():
+                waiting[Priority(request.priority).name.lower()] += 1
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "waiting": waiting,
+            "completed": self.completed,
+            "batches": self.batches,
+            "budget_rejections": self.budget_rejections
+        }
@@ -0,0 +1,103 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+# Response fields that hold code and are streamed as a fenced block
+CODE_FIELDS = ("fix_code", "optimization_code")
+
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into word-sized chunks that concatenate back to the original"""
+    return _TOKEN_RE.findall(text)
+
+def _label(name: str) -> str:
+    return name.replace("_", " ").capitalize()
+
+def render_response(response: Dict[str, Any]) -> str:
+    """Render a structured response as the text a model would stream, field by field"""
+    parts = []
+
+    for name, value in response.items():
+        if name in CODE_FIELDS:
+            parts.append(f"```python\n{value}\n```")
+        elif isinstance(value, list):
+            parts.append(f"{_label(name)}: " + "; ".join(str(v) for v in value))
+        else:
+            parts.append(f"{_label(name)}: {value}")
+
+    return "\n".join(parts) + "\n"
+
+def parse_response(text: str, fields: Dict[str, type]) -> Dict[str, Any]:
+    """Parse text in the render_response layout back into a response dict.
+
+    ``fields`` maps each expected field to its type; lines with unknown
+    labels are ignored and missing fields come back empty.
+    """
+    labels = {_label(name).lower(): name for name in fields}
+    code_field = next((name for name in fields if name in CODE_FIELDS), None)
+    response: Dict[str, Any] = {}
+
+    watcher = StreamWatcher()
+    lines, blocks = watcher.feed(text + "\n")
+
+    for line in lines:
+        label, _, value = line.partition(":")
+        name = labels.get(label.strip().lower())
+        if name is None or name in response:
+            continue
+
+        value = value.strip()
+        kind = fields[name]
+        try:
+            if kind is list:
+                response[name] = [v.strip() for v in value.split(";") if v.strip()]
+            elif kind is int:
+                response[name] = int(float(value))
+            elif kind is float:
+                response[name] = float(value)
+            else:
+                response[name] = value
+        except ValueError:
+            continue
+
+    if code_field and blocks:
+        response[code_field] = blocks[0]
+
+    for name, kind in fields.items():
+        response.setdefault(name, kind())
+
+    return response
+
+class StreamWatcher:
+    """Splits streamed LLM text into prose lines and fenced code blocks as each one completes"""
+
+    def __init__(self):
+        self._pending = ""
+        self._in_code = False
+        self._code_lines: List[str] = []
+
+    def feed(self, text: str) -> Tuple[List[str], List[str]]:
+        """Add a chunk; returns the prose lines and code blocks finished by it"""
+        self._pending += text
+        lines: List[str] = []
+        blocks: List[str] = []
+
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+
+            if line.strip().startswith("```"):
+                if self._in_code:
+                    blocks.append("\n".join(self._code_lines))
+                    self._code_lines = []
+                self._in_code = not self._in_code
+            elif self._in_code:
+                self._code_lines.append(line)
+            elif line.strip():
+                lines.append(line.strip())
+
+        return lines, blocks
+
+    def flush(self) -> List[str]:
+        """Return any trailing prose that did not end with a newline"""
+        line, self._pending = self._pending.strip(), ""
+        return [line] if line and not self._in_code else []
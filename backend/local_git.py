@@ -0,0 +1,182 @@
+import ast
+import asyncio
+import logging
+import os
+import shutil
+import textwrap
+import uuid
+from typing import Any, Dict, List, Optional
+
+import git
+
+from diff_engine import DEFAULT_MAX_DIFF_BYTES, unified_diff
+from git_client import MockGitClient
+from git_mirror import MirrorCache
+
+logger = logging.getLogger(__name__)
+
+def _top_level_definitions(source: str) -> Dict[str, ast.AST]:
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+    return {node.name: node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+
+def splice_definitions(source: str, fix_code: str) -> Optional[str]:
+    """Replace the top-level functions and classes in ``source`` that ``fix_code`` redefines.
+
+    Returns the new source, or None when the fix does not redefine
+    anything in it.
+    """
+    replacements = _top_level_definitions(textwrap.dedent(fix_code))
+    targets = _top_level_definitions(source)
+    matched = [name for name in replacements if name in targets]
+    if not matched:
+        return None
+
+    fix_lines = textwrap.dedent(fix_code).splitlines()
+    lines = source.splitlines()
+
+    # Splice from the bottom up so earlier line numbers stay valid
+    for name in sorted(matched, key=lambda n: targets[n].lineno, reverse=True):
+        old, new = targets[name], replacements[name]
+        old_start = min([old.lineno] + [d.lineno for d in old.decorator_list]) - 1
+        new_start = min([new.lineno] + [d.lineno for d in new.decorator_list]) - 1
+        lines[old_start:old.end_lineno] = fix_lines[new_start:new.end_lineno]
+
+    return "\n".join(lines) + "\n"
+
+class LocalGitClient(MockGitClient):
+    """Git client that checks out real code from cached mirrors.
+
+    Each job gets its own detached worktree of the mirror, and fix
+    worktrees branch off that one, so no job ever copies the repository.
+    Hosting API calls (pull requests, repository info) are still the mock
+    ones.
+    """
+
+    def __init__(self, cache_dir: str, max_cache_bytes: int = 2 * 1024 ** 3):
+        super().__init__()
+        self.worktree_root = os.path.join(cache_dir, "worktrees")
+        self._worktree_mirrors: Dict[str, str] = {}
+
+        # Worktrees left behind by a previous run are stale; removed before the
+        # mirror cache prunes its worktree records, so none of them survive
+        shutil.rmtree(self.worktree_root, ignore_errors=True)
+        os.makedirs(self.worktree_root, exist_ok=True)
+        self.mirrors = MirrorCache(os.path.join(cache_dir, "mirrors"), max_cache_bytes)
+
+    async def _add_worktree(self, mirror: str, path: str, ref: str) -> str:
+        """Check out ``ref`` at ``path``; returns the commit it resolved to"""
+        repo = git.Repo(mirror)
+        await asyncio.to_thread(repo.git.worktree, "add", "--detach", path, ref)
+        self._worktree_mirrors[path] = mirror
+        self.mirrors.acquire(mirror)
+        return await asyncio.to_thread(git.Repo(path).git.rev_parse, "HEAD")
+
+    async def clone_repository(self, repo_url: str, ref: Optional[str] = None) -> Dict[str, Any]:
+        """Fetch the repository into its mirror and check ``ref`` (default branch if unknown) out for one job"""
+        mirror = self.mirrors.mirror_path(repo_url)
+
+        async with self.mirrors.lock(mirror):
+            await self.mirrors.ensure(repo_url, ref)
+
+            if not ref or not await asyncio.to_thread(self.mirrors.has_commit, mirror, ref):
+                if ref:
+                    logger.warning(f"{ref} not found in {repo_url}, using the default branch")
+                ref = "HEAD"
+
+            repo_name = os.path.basename(mirror).rsplit("-", 1)[0]
+            path = os.path.join(self.worktree_root, f"{repo_name}-{uuid.uuid4().hex[:8]}")
+            commit = await self._add_worktree(mirror, path, ref)
+
+        return {
+            "path": path,
+            "repo_name": repo_name,
+            "status": "success",
+            "commit": commit,
+            "mirror": mirror
+        }
+
+    async def create_worktree(self, repo_path: str, name: str) -> Dict[str, Any]:
+        """Create a detached worktree at the same commit as ``repo_path``"""
+        mirror = self._worktree_mirrors[repo_path]
+        path = f"{repo_path}-{name}-{uuid.uuid4().hex[:8]}"
+
+        async with self.mirrors.lock(mirror):
+            head = await asyncio.to_thread(git.Repo(repo_path).git.rev_parse, "HEAD")
+            await self._add_worktree(mirror, path, head)
+
+        return {
+            "path": path,
+            "base_path": repo_path,
+            "status": "success"
+        }
+
+    def _find_fix_target(self, worktree_path: str, fix_code: str) -> Optional[str]:
+        """Relative path of the first non-test module that defines something the fix redefines"""
+        names = list(_top_level_definitions(textwrap.dedent(fix_code)))
+        if not names:
+            return None
+
+        candidates: List[str] = []
+        for root, dirs, files in os.walk(worktree_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in ("tests", "test", "__pycache__"))
+            candidates.extend(os.path.join(root, name) for name in sorted(files) if name.endswith(".py") and not name.startswith("test_"))
+
+        for path in candidates:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                source = f.read()
+            # Cheap text check before parsing
+            if any(f"def {name}" in source or f"class {name}" in source for name in names):
+                if any(name in _top_level_definitions(source) for name in names):
+                    return os.path.relpath(path, worktree_path)
+
+        return None
+
+    async def apply_fix(self, repo_path: str, test_name: str, fix_code: str) -> Dict[str, Any]:
+        """Write the fix into the module that defines the functions or classes it replaces"""
+        if repo_path not in self._worktree_mirrors:
+            return await super().apply_fix(repo_path, test_name, fix_code)
+
+        target = await asyncio.to_thread(self._find_fix_target, repo_path, fix_code)
+        if target is None:
+            logger.info(f"No definition in {repo_path} matches the fix for {test_name}, leaving the tree unchanged")
+            return {"status": "no_match", "modified_files": [], "lines_changed": 0, "commit_hash": None}
+
+        path = os.path.join(repo_path, target)
+        with open(path, encoding="utf-8") as f:
+            patched = splice_definitions(f.read(), fix_code)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(patched)
+
+        return {
+            "status": "success",
+            "modified_files": [target],
+            "lines_changed": len(fix_code.split('\n')),
+            "commit_hash": None
+        }
+
+    async def generate_diff(self, code_changes: str, repo_path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_DIFF_BYTES) -> str:
+        """Unified diff of a worktree against the commit it was checked out at"""
+        if repo_path not in self._worktree_mirrors:
+            return await super().generate_diff(code_changes, repo_path)
+
+        summary = await unified_diff(repo_path, "HEAD", max_bytes)
+        return summary.text
+
+    async def remove_worktree(self, worktree_path: str) -> Dict[str, Any]:
+        """Remove a worktree created by clone_repository or create_worktree"""
+        mirror = self._worktree_mirrors.pop(worktree_path, None)
+        if mirror is None:
+            return {"path": worktree_path, "status": "unknown"}
+
+        async with self.mirrors.lock(mirror):
+            await asyncio.to_thread(git.Repo(mirror).git.worktree, "remove", "--force", worktree_path)
+
+        self.mirrors.release(mirror)
+
+        return {
+            "path": worktree_path,
+            "status": "removed"
+        }
@@ -22,12 +22,24 @@ class Repository(BaseModel):
             datetime: lambda v: v.isoformat()
         }
 
+class PushedCommit(BaseModel):
+    id: str
+    author: str
+    message: str
+    timestamp: Optional[datetime] = None
+    added: List[str] = []
+    modified: List[str] = []
+    removed: List[str] = []
+
 class CommitEvent(BaseModel):
     repository_id: str
     commit_hash: str
     author: str
     message: str
     timestamp: datetime
+    branch: Optional[str] = None
+    base_hash: Optional[str] = None  # Parent of the first commit; the range is base_hash..commit_hash
+    commits: List[PushedCommit] = []
     
     class Config:
         json_encoders = {
@@ -44,6 +56,7 @@ class AgentJob(BaseModel):
     logs: List[str] = []
     result: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    phase_timings: Dict[str, float] = {}
     
     class Config:
         json_encoders = {
@@ -61,6 +74,32 @@ class CodeAnalysis(BaseModel):
     issues: List[Dict[str, Any]]
     suggestions: List[str]
     complexity_score: int
+    functions: int = 0
+    max_complexity: int = 0
+    max_loop_depth: int = 0
+
+class BenchmarkResult(BaseModel):
+    size: int
+    repeats: int
+    before_median: Optional[float] = None  # seconds per call
+    after_median: Optional[float] = None
+    speedup: Optional[float] = None
+    speedup_low: Optional[float] = None
+    speedup_high: Optional[float] = None
+
+class BenchmarkCase(BaseModel):
+    case: str
+    target: str
+    results: List[BenchmarkResult] = []
+    complexity_before: Optional[str] = None
+    complexity_after: Optional[str] = None
+    outputs_match: Optional[bool] = None
+    notes: List[str] = []
+
+class BenchmarkReport(BaseModel):
+    cases: List[BenchmarkCase] = []
+    improvement: Optional[float] = None  # % less time at the speedup's lower bound, worst case at each case's largest size
+    error: Optional[str] = None
 
 class PullRequest(BaseModel):
     id: str
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from llm_stream import CODE_FIELDS, StreamWatcher, parse_response
+
+logger = logging.getLogger(__name__)
+
+# Fields the model is asked to produce for each method, with their types
+RESPONSE_FIELDS: Dict[str, Dict[str, type]] = {
+    "analyze_test_failure": {
+        "affected_component": str,
+        "problem_description": str,
+        "solution_description": str,
+        "fix_code": str,
+        "confidence": float
+    },
+    "suggest_optimization": {
+        "type": str,
+        "title": str,
+        "complexity_score": int,
+        "performance_issue": str,
+        "optimization_description": str,
+        "optimization_code": str,
+        "estimated_improvement": int,
+        "memory_impact": str,
+        "confidence": float
+    },
+    "analyze_roadmap_alignment": {
+        "alignment_score": float,
+        "common_concepts": list,
+        "reasoning": str,
+        "confidence": float
+    },
+    "suggest_preparatory_work": {
+        "feature_name": str,
+        "preparation_description": str,
+        "suggestions": list,
+        "optimization_code": str,
+        "estimated_impact": str,
+        "confidence": float
+    }
+}
+
+TASK_INSTRUCTIONS = {
+    "analyze_test_failure": "A test started failing after a commit. Find the root cause and propose a fix.",
+    "suggest_optimization": "Review the reported issues in this file and propose a concrete optimization.",
+    "analyze_roadmap_alignment": "Score from 0 to 1 how closely this commit relates to the roadmap feature.",
+    "suggest_preparatory_work": "Suggest refactorings that would make the upcoming feature easier to build."
+}
+
+class CircuitOpenError(Exception):
+    """Raised when calls are refused because the backend keeps failing"""
+
+class CircuitBreaker:
+    """Stops calling a failing backend for a cool-down period.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast. Once ``reset_timeout`` seconds have passed a single
+    trial call is let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self):
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            raise CircuitOpenError("Ollama backend is unavailable, circuit open")
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that was cancelled or abandoned without telling whether the backend works"""
+        self._trial_in_flight = False
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500
+
+class HTTPOllamaClient:
+    """Ollama client that talks to the Ollama HTTP API.
+
+    One pooled ``httpx.AsyncClient`` keeps connections alive across calls.
+    Failed requests are retried with exponential backoff and full jitter,
+    and a circuit breaker stops hammering a backend that is down. The model
+    answers in ``Label: value`` lines plus one fenced code block, which is
+    the layout ``llm_stream`` parses, so streamed code can be acted on as
+    soon as its block closes.
+    """
+
+    supports_batching = False
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "codellama:7b", timeout: float = 120.0, max_connections: int = 8, max_retries: int = 3, backoff_base: float = 0.5, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker = breaker or CircuitBreaker()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.retries = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections, keepalive_expiry=60.0)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _build_prompt(self, method: str, inputs: Dict[str, Any]) -> str:
+        fields = RESPONSE_FIELDS[method]
+        layout = "\n".join(
+            f"```python\n<{name}>\n```" if name in CODE_FIELDS else f"{name.replace('_', ' ').capitalize()}: <{kind.__name__}>"
+            for name, kind in fields.items()
+        )
+
+        return (
+            f"You are an autonomous developer agent.\n"
+            f"Task: {method}\n"
+            f"{TASK_INSTRUCTIONS[method]}\n\n"
+            f"Inputs:\n{json.dumps(inputs, indent=2, default=str)}\n\n"
+            f"Answer using exactly this layout, one field per line, lists separated by semicolons:\n"
+            f"{layout}\n"
+        )
+
+    async def _backoff(self, attempt: int):
+        self.retries += 1
+        await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+    async def _generate(self, method: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        body = {"model": self.model, "prompt": self._build_prompt(method, inputs), "stream": False}
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            self.requests += 1
+
+            try:
+                response = await self._http().post("/api/generate", json=body)
+                response.raise_for_status()
+                text = response.json().get("response", "")
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                logger.warning(f"Ollama request failed ({str(e)}), retrying")
+                await self._backoff(attempt)
+                continue
+            except ValueError:
+                # A body that is not JSON means the backend is not answering properly
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            return parse_response(text, RESPONSE_FIELDS[method])
+
+    async def _stream(self, method: str, inputs: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield token, code and result events; retries only before the first token"""
+        body = {"model": self.model, "prompt": self._build_prompt(method, inputs), "stream": True}
+        code_field = next((name for name in RESPONSE_FIELDS[method] if name in CODE_FIELDS), None)
+
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            self.requests += 1
+            text = ""
+            watcher = StreamWatcher()
+
+            try:
+                async with self._http().stream("POST", "/api/generate", json=body) as response:
+                    response.raise_for_status()
+
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+
+                        chunk = json.loads(line)
+                        token = chunk.get("response", "")
+                        if token:
+                            text += token
+                            yield {"type": "token", "text": token}
+
+                            _, blocks = watcher.feed(token)
+                            if blocks and code_field:
+                                yield {"type": "code", "field": code_field, "code": blocks[0]}
+
+                        if chunk.get("done"):
+                            break
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                if text or attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                logger.warning(f"Ollama stream failed ({str(e)}), retrying")
+                await self._backoff(attempt)
+                continue
+            except ValueError:
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                # Cancelled, or closed by the consumer (e.g. over budget) part way through
+                self.breaker.release()
+                raise
+
+            self.breaker.record_success()
+            yield {"type": "result", "data": parse_response(text, RESPONSE_FIELDS[method])}
+            return
+
+    async def analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> Dict[str, Any]:
+        return await self._generate("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        })
+
+    def stream_analyze_test_failure(self, test_name: str, error_message: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._stream("analyze_test_failure", {
+            "test_name": test_name,
+            "error_message": error_message,
+            "commit_message": commit_message
+        })
+
+    async def suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> Dict[str, Any]:
+        return await self._generate("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        })
+
+    def stream_suggest_optimization(self, file_path: str, issues: List[Dict], suggestions: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        return self._stream("suggest_optimization", {
+            "file_path": file_path,
+            "issues": issues,
+            "suggestions": suggestions
+        })
+
+    async def analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> Dict[str, Any]:
+        return await self._generate("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    def stream_analyze_roadmap_alignment(self, commit_message: str, feature_description: str, feature_summary: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._stream("analyze_roadmap_alignment", {
+            "commit_message": commit_message,
+            "feature_description": feature_description,
+            "feature_summary": feature_summary
+        })
+
+    async def suggest_preparatory_work(self, feature_description: str, commit_message: str) -> Dict[str, Any]:
+        return await self._generate("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    def stream_suggest_preparatory_work(self, feature_description: str, commit_message: str) -> AsyncIterator[Dict[str, Any]]:
+        return self._stream("suggest_preparatory_work", {
+            "feature_description": feature_description,
+            "commit_message": commit_message
+        })
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Check that the Ollama server is up and has the model pulled"""
+        try:
+            response = await self._http().get("/api/tags")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            return {"status": "unhealthy", "model": self.model, "error": str(e), "circuit": self.breaker.state}
+
+        models = [m.get("name") for m in response.json().get("models", [])]
+
+        return {
+            "status": "healthy" if self.model in models else "model_missing",
+            "model": self.model,
+            "available_models": models,
+            "circuit": self.breaker.state,
+            "requests": self.requests,
+            "retries": self.retries
+        }
@@ -0,0 +1,108 @@
+"""
+Local stand-in for the Ollama HTTP API, for tests and offline benchmarks.
+
+Serves /api/generate (streaming and non-streaming), /api/tags and
+/api/version. Answers come from the canned responses of the mock
+OllamaClient, rendered in the layout HTTPOllamaClient expects, after a
+configurable time-to-first-token and per-token delay.
+
+    python ollama_stub.py --port 11434 --latency 0.5 --token-delay 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from llm_client import OllamaClient
+from llm_stream import render_response, split_tokens
+
+CANNED_RESPONSES = {
+    "analyze_test_failure": "_test_failure_response",
+    "suggest_optimization": "_optimization_response",
+    "analyze_roadmap_alignment": "_roadmap_alignment_response",
+    "suggest_preparatory_work": "_preparatory_work_response"
+}
+
+class GenerateRequest(BaseModel):
+    model: str
+    prompt: str
+    stream: bool = True
+    options: Dict[str, Any] = {}
+
+def _answer(prompt: str) -> str:
+    """Pick the canned answer for the task and inputs embedded in the prompt"""
+    task = ""
+    for line in prompt.splitlines():
+        if line.startswith("Task:"):
+            task = line.split(":", 1)[1].strip()
+            break
+
+    helper = CANNED_RESPONSES.get(task)
+    if helper is None:
+        return "I am a stand-in Ollama server and only answer agent prompts.\n"
+
+    inputs_text = prompt.split("Inputs:\n", 1)[1].split("\n\nAnswer using", 1)[0]
+    inputs = json.loads(inputs_text)
+
+    return render_response(getattr(OllamaClient(), helper)(**inputs))
+
+def create_app(latency: float = 0.5, token_delay: float = 0.01, model: str = "codellama:7b") -> FastAPI:
+    """Build the stand-in server; ``latency`` is the time to first token in seconds"""
+    stub = FastAPI(title="Ollama stand-in")
+
+    def chunk(request: GenerateRequest, text: str, done: bool, **extra) -> Dict[str, Any]:
+        return {
+            "model": request.model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "response": text,
+            "done": done,
+            **extra
+        }
+
+    @stub.post("/api/generate")
+    async def generate(request: GenerateRequest):
+        started = time.perf_counter_ns()
+        tokens = split_tokens(_answer(request.prompt))
+
+        if not request.stream:
+            await asyncio.sleep(latency + token_delay * len(tokens))
+            return chunk(request, "".join(tokens), True, total_duration=time.perf_counter_ns() - started, eval_count=len(tokens))
+
+        async def body():
+            await asyncio.sleep(latency)
+            for token in tokens:
+                yield json.dumps(chunk(request, token, False)) + "\n"
+                await asyncio.sleep(token_delay)
+            yield json.dumps(chunk(request, "", True, total_duration=time.perf_counter_ns() - started, eval_count=len(tokens))) + "\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    @stub.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": model, "size": 0, "digest": "stand-in"}]}
+
+    @stub.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-stand-in"}
+
+    return stub
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the Ollama HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between tokens")
+    parser.add_argument("--model", default="codellama:7b")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.token_delay, args.model), host=args.host, port=args.port)
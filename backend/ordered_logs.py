@@ -0,0 +1,33 @@
+from typing import List
+
+class OrderedLogs:
+    """Keeps the log lines of concurrent tasks grouped per task.
+
+    Lines written by the oldest unfinished task go straight into the target
+    list; lines from later tasks are held back until every earlier task has
+    finished. The resulting log reads exactly as if the tasks had run one
+    after another, while the head task still reports progress live.
+    """
+
+    def __init__(self, target: List[str], task_count: int):
+        self.target = target
+        self._buffers: List[List[str]] = [[] for _ in range(task_count)]
+        self._done = [False] * task_count
+        self._head = 0
+
+    def append(self, index: int, line: str):
+        """Write a line on behalf of task ``index``"""
+        if index == self._head:
+            self.target.append(line)
+        else:
+            self._buffers[index].append(line)
+
+    def close(self, index: int):
+        """Mark task ``index`` finished and release any lines now at the head"""
+        self._done[index] = True
+
+        while self._head < len(self._done) and self._done[self._head]:
+            self._head += 1
+            if self._head < len(self._buffers):
+                self.target.extend(self._buffers[self._head])
+                self._buffers[self._head] = []
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+PhaseFunc = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+@dataclass
+class Phase:
+    name: str
+    func: PhaseFunc
+    depends_on: List[str] = field(default_factory=list)
+
+class PhaseGraph:
+    """Runs agent phases as a dependency graph.
+
+    Each phase starts as soon as the phases it depends on have finished and
+    receives their results keyed by phase name. Results are merged in the
+    order the phases were added, not the order they finish, so the combined
+    result is the same on every run.
+    """
+
+    def __init__(self):
+        self._phases: Dict[str, Phase] = {}
+
+    def add_phase(self, name: str, func: PhaseFunc, depends_on: Sequence[str] = ()):
+        """Register a phase; dependencies must already be registered"""
+        if name in self._phases:
+            raise ValueError(f"Phase {name} is already registered")
+
+        for dependency in depends_on:
+            if dependency not in self._phases:
+                raise ValueError(f"Phase {name} depends on unknown phase {dependency}")
+
+        self._phases[name] = Phase(name, func, list(depends_on))
+
+    async def run(self) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Run all phases and return the merged result and per-phase durations in seconds"""
+        tasks: Dict[str, asyncio.Task] = {}
+        timings: Dict[str, float] = {}
+
+        async def run_phase(phase: Phase) -> Dict[str, Any]:
+            deps = {name: await tasks[name] for name in phase.depends_on}
+
+            started = time.perf_counter()
+            try:
+                return await phase.func(deps)
+            finally:
+                timings[phase.name] = round(time.perf_counter() - started, 3)
+
+        # Dependencies are registered first, so every task a phase awaits already exists
+        for phase in self._phases.values():
+            tasks[phase.name] = asyncio.create_task(run_phase(phase))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        result: Dict[str, Any] = {}
+        for name, task in tasks.items():
+            result.update(task.result() or {})
+
+        return result, timings
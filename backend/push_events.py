@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from models import CommitEvent, PushedCommit
+
+ZERO_SHA = "0" * 40
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def _summarize(commits: List[PushedCommit]) -> str:
+    """Commit message for a range: the single message, or one subject line per commit"""
+    if len(commits) == 1:
+        return commits[0].message
+    return "\n".join(commit.message.splitlines()[0] if commit.message else commit.id[:8] for commit in commits)
+
+def changed_paths(commits: List[PushedCommit]) -> List[str]:
+    """Every path a range of commits added, modified or removed, as listed in the push payload"""
+    return sorted({path for commit in commits for path in commit.added + commit.modified + commit.removed})
+
+def commit_event_from_push(repository_id: str, payload: Dict[str, Any]) -> Optional[CommitEvent]:
+    """Turn a GitHub push payload into one CommitEvent covering every pushed commit.
+
+    Returns None for pushes with nothing to analyze, such as branch
+    deletions and tag pushes without commits.
+    """
+    if payload.get("deleted") or payload.get("after") == ZERO_SHA:
+        return None
+
+    commits = [
+        PushedCommit(
+            id=commit["id"],
+            author=commit.get("author", {}).get("name", "unknown"),
+            message=commit.get("message", ""),
+            timestamp=_parse_timestamp(commit.get("timestamp")),
+            added=commit.get("added", []),
+            modified=commit.get("modified", []),
+            removed=commit.get("removed", [])
+        )
+        for commit in payload.get("commits", [])
+    ]
+    if not commits:
+        return None
+
+    ref = payload.get("ref", "")
+    before = payload.get("before")
+
+    return CommitEvent(
+        repository_id=repository_id,
+        commit_hash=payload.get("after") or commits[-1].id,
+        author=commits[-1].author,
+        message=_summarize(commits),
+        timestamp=commits[-1].timestamp or datetime.now(),
+        branch=ref.removeprefix("refs/heads/") if ref.startswith("refs/heads/") else None,
+        base_hash=before if before and before != ZERO_SHA else None,
+        commits=commits
+    )
+
+def merge_commit_events(queued: CommitEvent, newer: CommitEvent) -> CommitEvent:
+    """Extend a queued range with a later push to the same branch.
+
+    The result starts where the queued range started and ends at the newer
+    head. When the newer push was forced, queued commits it rewrote are
+    dropped, and if it rewrote all of them the newer range is used as is.
+    """
+    ids = [commit.id for commit in queued.commits]
+
+    if not newer.base_hash or newer.base_hash == queued.commit_hash:
+        kept = queued.commits
+    elif newer.base_hash in ids:
+        kept = queued.commits[:ids.index(newer.base_hash) + 1]
+    else:
+        return newer
+
+    seen = {commit.id for commit in kept}
+    commits = kept + [commit for commit in newer.commits if commit.id not in seen]
+
+    return newer.model_copy(update={
+        "base_hash": queued.base_hash,
+        "commits": commits,
+        "message": _summarize(commits)
+    })
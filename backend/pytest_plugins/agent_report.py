@@ -0,0 +1,145 @@
+"""pytest plugin loaded into test subprocesses started by PytestRunner.
+
+Writes one JSON line per collection error and per test phase to the file
+named by AGENT_PYTEST_REPORT, restricts the run to the node IDs listed in
+AGENT_PYTEST_SHARD (one per line) when that is set, and fails any test
+phase that runs longer than AGENT_PYTEST_TIMEOUT seconds. With
+AGENT_PYTEST_TRACE set it also reports which files under the working
+directory each test called into, for test impact analysis.
+"""
+
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+MAX_LONGREPR = 4000
+
+class TestTimeout(Exception):
+    pass
+
+def _write(record):
+    path = os.environ.get("AGENT_PYTEST_REPORT")
+    if path:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+def pytest_collectreport(report):
+    if report.failed:
+        _write({"nodeid": report.nodeid, "when": "collect", "outcome": "failed", "duration": 0.0, "longrepr": str(report.longrepr)[-MAX_LONGREPR:]})
+
+def pytest_collection_modifyitems(config, items):
+    shard_path = os.environ.get("AGENT_PYTEST_SHARD")
+    if not shard_path:
+        return
+
+    with open(shard_path) as f:
+        wanted = set(line.strip() for line in f if line.strip())
+
+    selected = [item for item in items if item.nodeid in wanted]
+    deselected = [item for item in items if item.nodeid not in wanted]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = selected
+
+def pytest_collection_finish(session):
+    if session.config.option.collectonly:
+        _write({"collected": [item.nodeid for item in session.items]})
+
+def pytest_runtest_logreport(report):
+    _write({
+        "nodeid": report.nodeid,
+        "when": report.when,
+        "outcome": report.outcome,
+        "duration": report.duration,
+        "longrepr": report.longreprtext[-MAX_LONGREPR:] if report.failed else None
+    })
+
+class _CallTracer:
+    """Records the repository files whose functions are called, without line tracing"""
+
+    def __init__(self, root):
+        self.root = os.path.join(os.path.realpath(root), "")
+        self.plugin_file = os.path.realpath(__file__)
+        # A virtualenv inside the checkout is not part of the code under test
+        self.prefixes = tuple(os.path.join(os.path.realpath(prefix), "") for prefix in {sys.prefix, sys.base_prefix})
+        self._relative = {}
+        self.files = set()
+
+    def _path(self, filename):
+        if filename not in self._relative:
+            # Frozen modules and exec'd code have pseudo file names like "<string>"
+            if filename.startswith("<"):
+                self._relative[filename] = None
+                return None
+            path = os.path.realpath(filename)
+            inside = path.startswith(self.root) and not path.startswith(self.prefixes) and path != self.plugin_file
+            self._relative[filename] = os.path.relpath(path, self.root) if inside else None
+        return self._relative[filename]
+
+    def __call__(self, frame, event, arg):
+        path = self._path(frame.f_code.co_filename)
+        if path is not None:
+            self.files.add(path)
+        return None
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    if not os.environ.get("AGENT_PYTEST_TRACE"):
+        yield
+        return
+
+    tracer = _CallTracer(os.getcwd())
+    previous = sys.gettrace()
+    sys.settrace(tracer)
+    try:
+        yield
+    finally:
+        sys.settrace(previous)
+
+    # The test's own file counts even if only module-level code ran
+    tracer.files.add(item.nodeid.split("::")[0])
+    _write({"nodeid": item.nodeid, "files": sorted(tracer.files)})
+
+def _alarm(signum, frame):
+    raise TestTimeout(f"Test exceeded the {os.environ['AGENT_PYTEST_TIMEOUT']}s timeout")
+
+def _timed():
+    timeout = float(os.environ.get("AGENT_PYTEST_TIMEOUT") or 0)
+    if timeout <= 0 or not hasattr(signal, "setitimer"):
+        return None
+
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    return previous
+
+def _untimed(previous):
+    if previous is not None:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    previous = _timed()
+    try:
+        yield
+    finally:
+        _untimed(previous)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    previous = _timed()
+    try:
+        yield
+    finally:
+        _untimed(previous)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item):
+    previous = _timed()
+    try:
+        yield
+    finally:
+        _untimed(previous)
@@ -0,0 +1,106 @@
+"""Forking pytest worker started by PytestRunner's warm pool.
+
+On start it collects the test suite of the checkout named on its command
+line, which imports pytest, the test dependencies and the repository's
+own code, then forgets every module loaded from the checkout, keeping
+only the third-party ones. The worker itself runs in a directory of its
+own, since that checkout may be removed long before the worker stops. Each request on stdin is a JSON line
+``{"id": ..., "cwd": ..., "args": [...], "env": {...}}``; the worker
+forks, the child switches to ``cwd`` (any worktree of the repository),
+imports the repository code fresh from there and runs ``pytest.main``.
+
+Replies on stdout are JSON lines: ``{"ready": true}`` once warmed up,
+``{"id": ..., "pid": ...}`` when a request has been forked and
+``{"id": ..., "exit": ...}`` when its child finishes. Children write their
+own exit line, so a child that is killed never sends one.
+"""
+
+import importlib
+import json
+import os
+import signal
+import sys
+
+import pytest
+
+def _send(fd, message):
+    # Lines are far below PIPE_BUF, so writes from the worker and its children never interleave
+    os.write(fd, (json.dumps(message) + "\n").encode())
+
+def _is_local(module, root):
+    paths = [getattr(module, "__file__", None) or ""] + list(getattr(module, "__path__", None) or [])
+    return any(path and os.path.realpath(path).startswith(root) for path in paths)
+
+def _forget_local_modules(root):
+    for name, module in list(sys.modules.items()):
+        if module is not None and _is_local(module, root):
+            del sys.modules[name]
+    for path in list(sys.path_importer_cache):
+        if os.path.realpath(path).startswith(root):
+            del sys.path_importer_cache[path]
+    importlib.invalidate_caches()
+
+def _on_path(path, directory):
+    return not path or os.path.realpath(path) == directory
+
+def _warm_up(checkout, home):
+    clean_path = list(sys.path)
+    os.chdir(checkout)
+    sys.path[:] = [checkout if _on_path(path, home) else path for path in sys.path]
+
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    saved = os.dup(1)
+    os.dup2(devnull, 1)
+    try:
+        pytest.main(["--collect-only", "-q", "-p", "no:cacheprovider", "-p", "agent_report"])
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+    _forget_local_modules(os.path.join(checkout, ""))
+    sys.path[:] = clean_path
+    os.chdir(home)
+
+def _run_child(request, result_fd, home):
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+
+        cwd = os.path.realpath(request["cwd"])
+        os.chdir(cwd)
+        sys.path[:] = [cwd if _on_path(path, home) else path for path in sys.path]
+        os.environ.update(request.get("env", {}))
+
+        code = int(pytest.main(request["args"]))
+    finally:
+        try:
+            _send(result_fd, {"id": request["id"], "exit": code})
+        finally:
+            os._exit(code)
+
+def main():
+    home = os.path.realpath(os.getcwd())
+    checkout = os.path.realpath(sys.argv[1])
+    # Keep the protocol channel away from anything the warm-up prints
+    result_fd = os.dup(1)
+    os.dup2(2, 1)
+
+    _warm_up(checkout, home)
+    # Children are reaped automatically; their exit codes come back on the pipe
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    _send(result_fd, {"ready": True, "modules": len(sys.modules)})
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        pid = os.fork()
+        if pid == 0:
+            _run_child(request, result_fd, home)
+        _send(result_fd, {"id": request["id"], "pid": pid})
+
+if __name__ == "__main__":
+    main()
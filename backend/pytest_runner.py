@@ -0,0 +1,306 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from impact_map import ImpactMapStore, TestSelection
+from models import TestResult
+from warm_pool import WarmPool, WarmWorkerError
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pytest_plugins")
+
+# Time a shard gets for interpreter startup and collection on top of its tests' timeouts
+SHARD_OVERHEAD_SECONDS = 30
+
+PYTEST_ARGS = ["-p", "agent_report", "-p", "no:cacheprovider", "-q"]
+
+def _shards(node_ids: List[str], count: int) -> List[List[str]]:
+    """Split node IDs into ``count`` contiguous, nearly equal shards, so tests from one file mostly stay together"""
+    count = max(1, min(count, len(node_ids)))
+    size, extra = divmod(len(node_ids), count)
+    shards, start = [], 0
+    for index in range(count):
+        end = start + size + (1 if index < extra else 0)
+        shards.append(node_ids[start:end])
+        start = end
+    return shards
+
+def _read_records(path: str) -> List[Dict[str, Any]]:
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # The last line of a killed shard can be cut off
+                    pass
+    except FileNotFoundError:
+        pass
+    return records
+
+def _to_results(records: List[Dict[str, Any]]) -> Dict[str, TestResult]:
+    """Fold per-phase reports into one TestResult per test"""
+    results: Dict[str, TestResult] = {}
+
+    for record in records:
+        if "nodeid" not in record:
+            continue
+
+        result = results.get(record["nodeid"])
+        if result is None:
+            result = results[record["nodeid"]] = TestResult(test_name=record["nodeid"], status="passed", duration=0.0)
+
+        result.duration += record["duration"]
+        if record["outcome"] == "failed" and result.status != "failed":
+            result.status = "failed"
+            result.error_message = record["longrepr"]
+        elif record["outcome"] == "skipped" and result.status == "passed":
+            result.status = "skipped"
+
+    return results
+
+class PytestRunner:
+    """Runs a repository's pytest suite in parallel subprocesses.
+
+    The suite is collected once, split into shards and each shard runs in
+    its own ``python -m pytest`` process; at most ``workers`` processes run
+    at a time across all jobs. Results come back through a small plugin
+    that writes one JSON line per test phase, and the same plugin fails
+    tests that run longer than ``test_timeout``. A shard that hangs anyway
+    is killed and its unreported tests are marked failed.
+
+    With an ``impact`` store, ``select_tests`` narrows a run down to the
+    tests affected by what changed since the repository's last traced run.
+    With ``warm`` set, single-test re-runs after a fix are forked from a
+    pre-imported worker instead of starting pytest from scratch.
+    """
+
+    def __init__(self, workers: Optional[int] = None, test_timeout: float = 60, python: str = sys.executable, impact: Optional[ImpactMapStore] = None, warm: bool = True):
+        self.workers = workers or os.cpu_count() or 1
+        self.test_timeout = test_timeout
+        self.python = python
+        self.impact = impact
+        self.warm_pool = WarmPool([python, "-m", "agent_worker"], self._env) if warm else None
+
+        self._slots = asyncio.Semaphore(self.workers)
+        self.runs = 0
+        self.shards_run = 0
+        self.shards_killed = 0
+
+    def _plugin_env(self, report_path: str = "", shard_path: Optional[str] = None, trace: bool = False) -> Dict[str, str]:
+        """Settings for the report plugin; empty values switch a feature off"""
+        return {
+            "AGENT_PYTEST_REPORT": report_path,
+            "AGENT_PYTEST_TIMEOUT": str(self.test_timeout),
+            "AGENT_PYTEST_SHARD": shard_path or "",
+            "AGENT_PYTEST_TRACE": "1" if trace else ""
+        }
+
+    def _env(self, report_path: str = "", shard_path: Optional[str] = None, trace: bool = False) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [PLUGIN_DIR, env.get("PYTHONPATH")]))
+        # Keep bytecode and pytest's cache out of the checkout, they would end up in the diff
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        env.update(self._plugin_env(report_path, shard_path, trace))
+        return env
+
+    async def _pytest(self, repo_path: str, report_path: str, args: List[str], shard_path: Optional[str] = None, timeout: Optional[float] = None, trace: bool = False) -> Optional[int]:
+        """Run pytest with the report plugin; returns its exit code, or None if it was killed"""
+        env = self._env(report_path, shard_path, trace)
+
+        async with self._slots:
+            process = await asyncio.create_subprocess_exec(
+                self.python, "-m", "pytest", *PYTEST_ARGS, *args,
+                cwd=repo_path,
+                env=env,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            try:
+                return await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                return None
+            except BaseException:
+                process.kill()
+                await process.wait()
+                raise
+
+    async def _collect(self, repo_path: str, work_dir: str, args: List[str]) -> Dict[str, Any]:
+        report_path = os.path.join(work_dir, "collect.jsonl")
+        await self._pytest(repo_path, report_path, ["--collect-only", *args], timeout=SHARD_OVERHEAD_SECONDS)
+
+        collected: List[str] = []
+        errors = {}
+        for record in _read_records(report_path):
+            if "collected" in record:
+                collected = record["collected"]
+            else:
+                errors.update(_to_results([record]))
+
+        return {"collected": collected, "errors": errors}
+
+    async def _run_shard(self, repo_path: str, work_dir: str, index: int, node_ids: List[str], traces: Optional[Dict[str, List[str]]] = None) -> Dict[str, TestResult]:
+        shard_path = os.path.join(work_dir, f"shard-{index}.txt")
+        report_path = os.path.join(work_dir, f"shard-{index}.jsonl")
+        with open(shard_path, "w") as f:
+            f.write("\n".join(node_ids) + "\n")
+
+        # Per-test timeouts are enforced in the subprocess; this only catches a shard that stops responding
+        timeout = SHARD_OVERHEAD_SECONDS + 3 * self.test_timeout * len(node_ids)
+        exit_code = await self._pytest(repo_path, report_path, ["--continue-on-collection-errors"], shard_path, timeout, trace=traces is not None)
+        self.shards_run += 1
+
+        records = []
+        for record in _read_records(report_path):
+            if "files" in record:
+                traces[record["nodeid"]] = record["files"]
+            elif record.get("when") != "collect":
+                records.append(record)
+        results = _to_results(records)
+
+        if exit_code is None:
+            self.shards_killed += 1
+            logger.warning(f"Killed pytest shard {index} in {repo_path} after {timeout:.0f}s")
+            finished = {record["nodeid"] for record in records if record["when"] == "teardown"}
+            for node_id in node_ids:
+                if node_id not in finished:
+                    duration = results[node_id].duration if node_id in results else 0.0
+                    results[node_id] = TestResult(test_name=node_id, status="failed", duration=duration, error_message="Test shard timed out before this test finished")
+
+        return results
+
+    async def _run(self, repo_path: str, args: List[str], include: Optional[Callable[[str], bool]] = None, traces: Optional[Dict[str, List[str]]] = None) -> List[TestResult]:
+        """Collect with ``args``, keep the node IDs ``include`` accepts and run them; fills ``traces`` when given"""
+        if not os.path.isdir(repo_path):
+            logger.warning(f"Cannot run tests, {repo_path} does not exist")
+            return []
+
+        started = time.perf_counter()
+        work_dir = tempfile.mkdtemp(prefix="agent-pytest-")
+        try:
+            collection = await self._collect(repo_path, work_dir, args)
+            node_ids = collection["collected"]
+            if include is not None:
+                node_ids = [node_id for node_id in node_ids if include(node_id)]
+
+            shard_results = await asyncio.gather(*[
+                self._run_shard(repo_path, work_dir, index, shard, traces)
+                for index, shard in enumerate(_shards(node_ids, self.workers))
+                if shard
+            ])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        merged: Dict[str, TestResult] = {}
+        for results in shard_results:
+            merged.update(results)
+
+        # Collected order, then anything that could not be collected
+        ordered = [merged[node_id] for node_id in node_ids if node_id in merged]
+        ordered.extend(collection["errors"].values())
+
+        self.runs += 1
+        logger.info(f"Ran {len(ordered)} tests in {repo_path} in {time.perf_counter() - started:.2f}s")
+
+        return ordered
+
+    async def select_tests(self, repo_path: str, repository_id: str, base: Optional[str] = None, range_files: Optional[List[str]] = None) -> Optional[TestSelection]:
+        """Pick the tests a clean checkout needs to run, or None without an impact store"""
+        if self.impact is None:
+            return None
+        return await self.impact.select(repo_path, repository_id, base, range_files)
+
+    def covered_files(self, repository_id: str, node_id: str) -> List[str]:
+        """Repository files the test called into on its last traced run"""
+        impact_map = self.impact.load(repository_id) if self.impact is not None else None
+        if impact_map is None:
+            return []
+        return impact_map.tests.get(node_id, [])
+
+    async def run_tests(self, repo_path: str, selection: Optional[TestSelection] = None) -> List[TestResult]:
+        """Run the test suite, or only the part ``selection`` picked, and refresh the impact map"""
+        if selection is None:
+            results = await self._run(repo_path, [])
+        else:
+            traces: Dict[str, List[str]] = {}
+            if selection.full or selection.node_ids or selection.test_files:
+                results = await self._run(repo_path, [], None if selection.full else selection.includes, traces)
+            else:
+                logger.info(f"No tests in {repo_path} are affected by the change")
+                results = []
+
+            # Tests without a trace (collection errors, killed shards) would leave holes in the map
+            await self.impact.update(selection, traces, complete=all(result.test_name in traces for result in results))
+
+        # Failures get fixed and re-run one by one; have a warm worker ready by then
+        if self.warm_pool is not None and any(result.status == "failed" for result in results):
+            self.warm_pool.prewarm(repo_path)
+
+        return results
+
+    async def _run_warm(self, repo_path: str, test_name: str) -> Optional[List[TestResult]]:
+        """Run one test on a warm worker; None if no worker is available"""
+        work_dir = tempfile.mkdtemp(prefix="agent-pytest-")
+        report_path = os.path.join(work_dir, "warm.jsonl")
+        timeout = SHARD_OVERHEAD_SECONDS + 3 * self.test_timeout
+        try:
+            async with self._slots:
+                exit_code = await self.warm_pool.run(repo_path, [*PYTEST_ARGS, test_name], self._plugin_env(report_path), timeout)
+            records = _read_records(report_path)
+        except WarmWorkerError as e:
+            logger.warning(f"Falling back to a cold pytest run: {str(e)}")
+            return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        results = list(_to_results(records).values())
+        if exit_code is None:
+            results = [TestResult(test_name=test_name, status="failed", duration=0.0, error_message="Test timed out and was killed")]
+
+        self.runs += 1
+        return results
+
+    async def run_specific_test(self, repo_path: str, test_name: str) -> TestResult:
+        """Run one test by its pytest node ID, on a warm worker when possible"""
+        results = None
+        if self.warm_pool is not None:
+            results = await self._run_warm(repo_path, test_name)
+        if results is None:
+            results = await self._run(repo_path, [test_name])
+
+        for result in results:
+            if result.test_name == test_name:
+                return result
+
+        if results:
+            return results[0]
+        return TestResult(test_name=test_name, status="failed", duration=0.0, error_message=f"Test {test_name} was not found")
+
+    async def run_performance_tests(self, repo_path: str) -> List[TestResult]:
+        """Run tests whose names mention performance"""
+        return await self._run(repo_path, ["-k", "perf or performance or benchmark"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "test_timeout": self.test_timeout,
+            "runs": self.runs,
+            "shards_run": self.shards_run,
+            "shards_killed": self.shards_killed,
+            "impact": self.impact.stats() if self.impact else None,
+            "warm_pool": self.warm_pool.stats() if self.warm_pool else None
+        }
+
+    async def close(self):
+        if self.warm_pool is not None:
+            await self.warm_pool.close()
@@ -0,0 +1,87 @@
+import re
+from typing import Dict, List, Optional
+
+from models import Repository
+
+DEFAULT_HOST = "github.com"
+
+_SCP_URL = re.compile(r"^(?:[\w.-]+@)?(?P<host>[\w.-]+):(?P<path>[^/].*)$")
+_URL = re.compile(r"^[a-z][a-z0-9+.-]*://(?:[^@/]+@)?(?P<host>[^/:]+)(?::\d+)?/(?P<path>.*)$", re.IGNORECASE)
+
+def canonical_repo_key(identifier: str) -> Optional[str]:
+    """Normalize a clone URL, web URL or ``owner/name`` to ``host/owner/name``.
+
+    https://github.com/Org/Repo.git, git@github.com:org/repo and org/repo
+    all map to ``github.com/org/repo``; owner/name without a host is taken
+    to be on GitHub. Returns None when nothing repository-like is found.
+    """
+    identifier = identifier.strip()
+    if not identifier:
+        return None
+
+    match = _URL.match(identifier) or _SCP_URL.match(identifier)
+    if match:
+        host, path = match.group("host"), match.group("path")
+    elif identifier.count("/") == 1:
+        host, path = DEFAULT_HOST, identifier
+    else:
+        return None
+
+    path = path.strip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+
+    parts = [part for part in path.split("/") if part]
+    if len(parts) < 2:
+        return None
+
+    return f"{host.lower().removeprefix('www.')}/{'/'.join(parts[:2]).lower()}"
+
+def _name_key(name: str) -> str:
+    return f"name:{name.strip().lower()}"
+
+class RepositoryIndex:
+    """Exact lookup of connected repositories by URL or name in O(1).
+
+    Each repository is indexed under the canonical form of its URL and,
+    as a fallback for repositories connected with a bare name, under its
+    name. URL keys always win over name keys.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[str, str] = {}
+        self._keys: Dict[str, List[str]] = {}
+
+    def _keys_for(self, repository: Repository) -> List[str]:
+        keys = [canonical_repo_key(repository.url), canonical_repo_key(repository.name), _name_key(repository.name)]
+        return list(dict.fromkeys(key for key in keys if key))
+
+    def owner(self, repository: Repository) -> Optional[str]:
+        """Id of an already indexed repository with the same URL, if any"""
+        key = canonical_repo_key(repository.url)
+        return self._by_key.get(key) if key else None
+
+    def add(self, repository: Repository):
+        self.remove(repository.id)
+
+        keys = [key for key in self._keys_for(repository) if key not in self._by_key]
+        for key in keys:
+            self._by_key[key] = repository.id
+        self._keys[repository.id] = keys
+
+    def remove(self, repo_id: str):
+        for key in self._keys.pop(repo_id, []):
+            self._by_key.pop(key, None)
+
+    def lookup(self, *identifiers: Optional[str]) -> Optional[str]:
+        """Repository id for the first identifier (URL or owner/name) that is indexed"""
+        for identifier in identifiers:
+            key = canonical_repo_key(identifier) if identifier else None
+            if key and key in self._by_key:
+                return self._by_key[key]
+
+        for identifier in identifiers:
+            if identifier and _name_key(identifier) in self._by_key:
+                return self._by_key[_name_key(identifier)]
+
+        return None
@@ -0,0 +1,48 @@
+import asyncio
+import contextvars
+import copy
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one underlying call.
+
+    The first caller for a key starts the call as a standalone task; callers
+    arriving while it is in flight wait on the same task. Because the task
+    is shielded, a cancelled caller does not cancel the call for the others.
+    The call runs in ``context`` when given, so that it does not pick up
+    per-caller state from whichever caller happened to start it.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]], context: Optional[contextvars.Context] = None) -> Any:
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.get_running_loop().create_task(func(), context=context)
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.calls += 1
+            return await asyncio.shield(task)
+
+        self.coalesced += 1
+        # Followers get their own copy so no caller can mutate another's result
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get how many calls ran and how many piggybacked on one in flight"""
+        total = self.calls + self.coalesced
+
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_rate": (self.coalesced / total) if total else 0,
+            "in_flight": len(self._in_flight)
+        }
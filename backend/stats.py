@@ -0,0 +1,139 @@
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import JobStatus
+
+WINDOW_EVENTS = ("created", "completed", "failed")
+
+class RollingWindow:
+    """Event counts over the last ``span`` seconds.
+
+    Events land in a ring of fixed-width buckets and running totals are
+    kept alongside, so reading the window never walks the ring; buckets
+    that fall out of the window are subtracted as time moves past them.
+    """
+
+    def __init__(self, span: float, bucket_seconds: float, clock: Callable[[], float] = time.time):
+        self.bucket_seconds = bucket_seconds
+        self.size = max(1, int(span // bucket_seconds))
+        self.clock = clock
+
+        self._buckets: List[Dict[str, int]] = [dict.fromkeys(WINDOW_EVENTS, 0) for _ in range(self.size)]
+        self._totals = dict.fromkeys(WINDOW_EVENTS, 0)
+        self._head = int(clock() // bucket_seconds)
+
+    def _advance(self, bucket: int):
+        # Each step clears the slot that the new bucket reuses; at most one full turn is needed
+        for index in range(max(self._head + 1, bucket - self.size + 1), bucket + 1):
+            slot = self._buckets[index % self.size]
+            for event, count in slot.items():
+                self._totals[event] -= count
+                slot[event] = 0
+        self._head = max(self._head, bucket)
+
+    def add(self, event: str, at: Optional[float] = None):
+        bucket = int((self.clock() if at is None else at) // self.bucket_seconds)
+        self._advance(int(self.clock() // self.bucket_seconds))
+        if bucket <= self._head - self.size or bucket > self._head:
+            return
+
+        self._buckets[bucket % self.size][event] += 1
+        self._totals[event] += 1
+
+    def counts(self) -> Dict[str, int]:
+        self._advance(int(self.clock() // self.bucket_seconds))
+        return dict(self._totals)
+
+def _rate(completed: int, total: int) -> float:
+    return (completed / total * 100) if total > 0 else 0
+
+class JobStats:
+    """Dashboard counters maintained from job status changes.
+
+    Totals per status and per repository are adjusted on every change the
+    store reports, and the last hour and last day are rolling windows, so a
+    snapshot costs the same however many jobs have been stored.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.by_status: Dict[JobStatus, int] = dict.fromkeys(JobStatus, 0)
+        self.by_repository: Dict[str, Dict[JobStatus, int]] = {}
+        self.windows = {
+            "last_hour": RollingWindow(3600, 60, clock),
+            "last_day": RollingWindow(86400, 600, clock)
+        }
+
+    def load(self, counts: Dict[Tuple[str, JobStatus], int], recent: List[Tuple[datetime, Optional[datetime], JobStatus]]):
+        """Seed from the store's per-repository counts and the last day of job times"""
+        for (repository_id, status), count in counts.items():
+            self.by_status[status] += count
+            self._repository(repository_id)[status] += count
+
+        for created_at, completed_at, status in recent:
+            self._record("created", created_at.timestamp())
+            if completed_at is not None and status in (JobStatus.COMPLETED, JobStatus.FAILED):
+                self._record(status.value, completed_at.timestamp())
+
+    def _repository(self, repository_id: str) -> Dict[JobStatus, int]:
+        if repository_id not in self.by_repository:
+            self.by_repository[repository_id] = dict.fromkeys(JobStatus, 0)
+        return self.by_repository[repository_id]
+
+    def _record(self, event: str, at: Optional[float] = None):
+        for window in self.windows.values():
+            window.add(event, at)
+
+    def on_job_change(self, repository_id: str, old: Optional[JobStatus], new: Optional[JobStatus]):
+        """Store listener: a job was added (old is None), changed status, or removed (new is None)"""
+        repository = self._repository(repository_id)
+
+        if old is not None:
+            self.by_status[old] -= 1
+            repository[old] -= 1
+        if new is not None:
+            self.by_status[new] += 1
+            repository[new] += 1
+
+        if old is None and new is not None:
+            self._record("created")
+        if new in (JobStatus.COMPLETED, JobStatus.FAILED) and old is not None:
+            self._record(new.value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.by_status.values())
+        completed = self.by_status[JobStatus.COMPLETED]
+
+        repositories = {}
+        for repository_id, counts in self.by_repository.items():
+            repo_total = sum(counts.values())
+            if repo_total:
+                repositories[repository_id] = {
+                    "total_jobs": repo_total,
+                    **{f"{status.value}_jobs": count for status, count in counts.items()},
+                    "success_rate": _rate(counts[JobStatus.COMPLETED], repo_total)
+                }
+
+        windows = {}
+        for name, window in self.windows.items():
+            counts = window.counts()
+            finished = counts["completed"] + counts["failed"]
+            windows[name] = {
+                "created_jobs": counts["created"],
+                "completed_jobs": counts["completed"],
+                "failed_jobs": counts["failed"],
+                # Share of jobs finishing in the window that succeeded
+                "success_rate": _rate(counts["completed"], finished)
+            }
+
+        return {
+            "total_jobs": total,
+            "pending_jobs": self.by_status[JobStatus.PENDING],
+            "running_jobs": self.by_status[JobStatus.RUNNING],
+            "completed_jobs": completed,
+            "failed_jobs": self.by_status[JobStatus.FAILED],
+            "success_rate": _rate(completed, total),
+            "repositories": repositories,
+            **windows
+        }
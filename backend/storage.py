@@ -0,0 +1,582 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from models import Repository, AgentJob, JobStatus
+from repo_index import RepositoryIndex
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+# Position in the newest-first job listing: (created_at timestamp, job id)
+JobCursor = Tuple[float, str]
+
+# Called with (repository_id, old status, new status); None stands for "not stored"
+JobListener = Callable[[str, Optional[JobStatus], Optional[JobStatus]], None]
+
+class JobStore(ABC):
+    """Storage for connected repositories and agent jobs.
+
+    Jobs that are still pending or running are "live": the agent mutates
+    them in place (notably ``job.logs.append``), so the store keeps those
+    objects in memory and persists them on ``save_job`` and on periodic
+    flushes. Finished jobs are read back from storage on demand.
+    """
+
+    def __init__(self, retention_days: int = 30, max_jobs: int = 10000, flush_interval: float = 0.5, retention_interval: float = 3600):
+        self.retention_days = retention_days
+        self.max_jobs = max_jobs
+        self.flush_interval = flush_interval
+        self.retention_interval = retention_interval
+
+        self.repository_index = RepositoryIndex()
+        self._live: Dict[str, AgentJob] = {}
+        self._statuses: Dict[str, JobStatus] = {}
+        self._listeners: List[JobListener] = []
+        self._task: Optional[asyncio.Task] = None
+        self._revision = 0
+
+    @property
+    def version(self) -> str:
+        """Changes whenever any stored job changes, including log lines appended to live jobs"""
+        return f"{self._revision}.{sum(len(job.logs) for job in self._live.values())}"
+
+    def add_listener(self, listener: JobListener):
+        """Register a callback for job status changes, additions and removals"""
+        self._listeners.append(listener)
+
+    def _notify(self, repository_id: str, old: Optional[JobStatus], new: Optional[JobStatus]):
+        for listener in self._listeners:
+            try:
+                listener(repository_id, old, new)
+            except Exception as e:
+                logger.error(f"Job store listener failed: {str(e)}")
+
+    def _job_written(self, job: AgentJob):
+        """Bookkeeping after a job was added or saved"""
+        self._revision += 1
+
+        old = self._statuses.get(job.id)
+        if old != job.status:
+            self._notify(job.repository_id, old, job.status)
+
+        if job.status in TERMINAL_STATUSES:
+            self._live.pop(job.id, None)
+            self._statuses.pop(job.id, None)
+        else:
+            self._statuses[job.id] = job.status
+
+    def _jobs_removed(self, removed: List[Tuple[str, JobStatus]]):
+        """Bookkeeping after retention deleted (repository_id, status) jobs"""
+        if removed:
+            self._revision += 1
+        for repository_id, status in removed:
+            self._notify(repository_id, status, None)
+
+    async def start(self):
+        """Start the background log flusher and retention sweep"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        """Stop background work and flush anything still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        self.flush_logs()
+        self.close()
+
+    async def _maintenance_loop(self):
+        last_retention = 0.0
+
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                self.flush_logs()
+
+                if time.monotonic() - last_retention >= self.retention_interval:
+                    last_retention = time.monotonic()
+                    removed = self.apply_retention()
+                    if removed:
+                        logger.info(f"Retention removed {removed} old jobs")
+            except Exception as e:
+                logger.error(f"Job store maintenance failed: {str(e)}")
+
+    @abstractmethod
+    def add_repository(self, repository: Repository):
+        ...
+
+    @abstractmethod
+    def remove_repository(self, repo_id: str) -> Optional[Repository]:
+        ...
+
+    @abstractmethod
+    def get_repository(self, repo_id: str) -> Optional[Repository]:
+        ...
+
+    @abstractmethod
+    def list_repositories(self) -> List[Repository]:
+        ...
+
+    @abstractmethod
+    def count_repositories(self) -> int:
+        ...
+
+    def find_repository(self, *identifiers: Optional[str]) -> Optional[Repository]:
+        """Connected repository matching a clone/web URL or owner/name, via the index"""
+        repo_id = self.repository_index.lookup(*identifiers)
+        return self.get_repository(repo_id) if repo_id else None
+
+    @abstractmethod
+    def add_job(self, job: AgentJob):
+        ...
+
+    @abstractmethod
+    def save_job(self, job: AgentJob):
+        """Persist a job's current status, result and logs"""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[AgentJob]:
+        ...
+
+    @abstractmethod
+    def query_jobs(self, statuses: Optional[Sequence[JobStatus]] = None, repository_id: Optional[str] = None, created_after: Optional[datetime] = None, created_before: Optional[datetime] = None, after: Optional[JobCursor] = None, limit: int = 50, with_logs: bool = False) -> List[AgentJob]:
+        """Newest-first page of jobs created strictly after ``after`` in listing order.
+
+        ``created_after`` is inclusive and ``created_before`` exclusive. Logs
+        are only loaded when ``with_logs`` is set; otherwise finished jobs
+        come back with an empty ``logs`` list.
+        """
+
+    @abstractmethod
+    def log_summary(self, job_ids: Sequence[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+        """Number of log lines and the latest line for each job"""
+
+    @abstractmethod
+    def count_jobs(self, status: Optional[JobStatus] = None) -> int:
+        ...
+
+    @abstractmethod
+    def job_counts(self) -> Dict[Tuple[str, JobStatus], int]:
+        """Number of stored jobs per (repository_id, status)"""
+
+    @abstractmethod
+    def job_times_since(self, since: datetime) -> List[Tuple[datetime, Optional[datetime], JobStatus]]:
+        """(created_at, completed_at, status) of jobs created or finished at or after ``since``"""
+
+    def flush_logs(self):
+        """Persist log lines appended to live jobs since the last flush"""
+
+    @abstractmethod
+    def apply_retention(self) -> int:
+        """Drop finished jobs past the age or count limit; returns how many were removed"""
+
+    def close(self):
+        pass
+
+class InMemoryJobStore(JobStore):
+    """Non-persistent store, bounded by the same retention limits"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._repositories: Dict[str, Repository] = {}
+        self._jobs: Dict[str, AgentJob] = {}
+
+    def add_repository(self, repository: Repository):
+        self._repositories[repository.id] = repository
+        self.repository_index.add(repository)
+
+    def remove_repository(self, repo_id: str) -> Optional[Repository]:
+        self.repository_index.remove(repo_id)
+        return self._repositories.pop(repo_id, None)
+
+    def get_repository(self, repo_id: str) -> Optional[Repository]:
+        return self._repositories.get(repo_id)
+
+    def list_repositories(self) -> List[Repository]:
+        return list(self._repositories.values())
+
+    def count_repositories(self) -> int:
+        return len(self._repositories)
+
+    def add_job(self, job: AgentJob):
+        self._jobs[job.id] = job
+        self._live[job.id] = job
+        self._job_written(job)
+
+    def save_job(self, job: AgentJob):
+        self._jobs[job.id] = job
+        self._job_written(job)
+
+    def get_job(self, job_id: str) -> Optional[AgentJob]:
+        return self._jobs.get(job_id)
+
+    def query_jobs(self, statuses: Optional[Sequence[JobStatus]] = None, repository_id: Optional[str] = None, created_after: Optional[datetime] = None, created_before: Optional[datetime] = None, after: Optional[JobCursor] = None, limit: int = 50, with_logs: bool = False) -> List[AgentJob]:
+        matches = [
+            job for job in self._jobs.values()
+            if (not statuses or job.status in statuses)
+            and (repository_id is None or job.repository_id == repository_id)
+            and (created_after is None or job.created_at >= created_after)
+            and (created_before is None or job.created_at < created_before)
+            and (after is None or (job.created_at.timestamp(), job.id) < after)
+        ]
+        matches.sort(key=lambda job: (job.created_at.timestamp(), job.id), reverse=True)
+
+        return matches[:limit]
+
+    def log_summary(self, job_ids: Sequence[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+        return {
+            job_id: (len(self._jobs[job_id].logs), self._jobs[job_id].logs[-1] if self._jobs[job_id].logs else None)
+            for job_id in job_ids if job_id in self._jobs
+        }
+
+    def count_jobs(self, status: Optional[JobStatus] = None) -> int:
+        if status is None:
+            return len(self._jobs)
+        return len([j for j in self._jobs.values() if j.status == status])
+
+    def job_counts(self) -> Dict[Tuple[str, JobStatus], int]:
+        counts: Dict[Tuple[str, JobStatus], int] = {}
+        for job in self._jobs.values():
+            counts[(job.repository_id, job.status)] = counts.get((job.repository_id, job.status), 0) + 1
+        return counts
+
+    def job_times_since(self, since: datetime) -> List[Tuple[datetime, Optional[datetime], JobStatus]]:
+        return [
+            (job.created_at, job.completed_at, job.status)
+            for job in self._jobs.values()
+            if job.created_at >= since or (job.completed_at is not None and job.completed_at >= since)
+        ]
+
+    def apply_retention(self) -> int:
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        finished = [j for j in self._jobs.values() if j.status in TERMINAL_STATUSES]
+
+        expired = {j.id for j in finished if j.created_at < cutoff}
+        overflow = len(self._jobs) - len(expired) - self.max_jobs
+        if overflow > 0:
+            remaining = [j for j in finished if j.id not in expired]
+            expired.update(j.id for j in remaining[:overflow])
+
+        removed = [(self._jobs[job_id].repository_id, self._jobs[job_id].status) for job_id in expired]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        self._jobs_removed(removed)
+
+        return len(expired)
+
+class SQLiteJobStore(JobStore):
+    """Embedded SQLite store in WAL mode.
+
+    Job rows are indexed by status, repository and creation time. Log lines
+    live in their own table and are appended in batches by the flusher
+    rather than on every ``job.logs.append``. Retention deletes old finished
+    jobs and returns the freed pages with an incremental vacuum.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._log_counts: Dict[str, int] = {}
+        self._repositories: Dict[str, Repository] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._create_schema()
+        self._load_repositories()
+        self._fail_interrupted_jobs()
+
+    def _create_schema(self):
+        # auto_vacuum only takes effect on a fresh database, before the first table exists
+        self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS repositories (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    connected_at REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    last_commit TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    repository_id TEXT NOT NULL,
+                    commit_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    completed_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    phase_timings TEXT
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+                CREATE INDEX IF NOT EXISTS idx_jobs_repository_created ON jobs (repository_id, created_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at);
+
+                CREATE TABLE IF NOT EXISTS job_logs (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    line TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                ) WITHOUT ROWID;
+            """)
+
+    def _load_repositories(self):
+        # Repositories are read on every webhook, so they are kept in memory and indexed by URL
+        for row in self._db.execute("SELECT * FROM repositories ORDER BY connected_at"):
+            repository = Repository(
+                id=row["id"],
+                name=row["name"],
+                url=row["url"],
+                connected_at=datetime.fromtimestamp(row["connected_at"]),
+                status=row["status"],
+                last_commit=row["last_commit"]
+            )
+            self._repositories[repository.id] = repository
+            self.repository_index.add(repository)
+
+    def _fail_interrupted_jobs(self):
+        """Jobs that were queued or running when the process stopped cannot resume"""
+        with self._db:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, completed_at = ? WHERE status IN (?, ?)",
+                (JobStatus.FAILED.value, "Interrupted by server restart", time.time(), JobStatus.PENDING.value, JobStatus.RUNNING.value)
+            )
+
+        if cursor.rowcount:
+            logger.warning(f"Marked {cursor.rowcount} interrupted jobs as failed")
+
+    def add_repository(self, repository: Repository):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO repositories (id, name, url, connected_at, status, last_commit) VALUES (?, ?, ?, ?, ?, ?)",
+                (repository.id, repository.name, repository.url, repository.connected_at.timestamp(), repository.status, repository.last_commit)
+            )
+        self._repositories[repository.id] = repository
+        self.repository_index.add(repository)
+
+    def remove_repository(self, repo_id: str) -> Optional[Repository]:
+        with self._db:
+            self._db.execute("DELETE FROM repositories WHERE id = ?", (repo_id,))
+        self.repository_index.remove(repo_id)
+        return self._repositories.pop(repo_id, None)
+
+    def get_repository(self, repo_id: str) -> Optional[Repository]:
+        return self._repositories.get(repo_id)
+
+    def list_repositories(self) -> List[Repository]:
+        return list(self._repositories.values())
+
+    def count_repositories(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM repositories").fetchone()[0]
+
+    def add_job(self, job: AgentJob):
+        self._live[job.id] = job
+        self._log_counts[job.id] = 0
+        self.save_job(job)
+
+    def save_job(self, job: AgentJob):
+        result = job.model_dump(mode="json", include={"result"})["result"]
+
+        with self._db:
+            self._db.execute(
+                """INSERT INTO jobs (id, repository_id, commit_hash, status, created_at, completed_at, result, error, phase_timings)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (id) DO UPDATE SET
+                       commit_hash = excluded.commit_hash,
+                       status = excluded.status,
+                       completed_at = excluded.completed_at,
+                       result = excluded.result,
+                       error = excluded.error,
+                       phase_timings = excluded.phase_timings""",
+                (
+                    job.id,
+                    job.repository_id,
+                    job.commit_hash,
+                    job.status.value,
+                    job.created_at.timestamp(),
+                    job.completed_at.timestamp() if job.completed_at else None,
+                    json.dumps(result) if result is not None else None,
+                    job.error,
+                    json.dumps(job.phase_timings)
+                )
+            )
+            self._write_logs(job)
+
+        self._job_written(job)
+
+        if job.status in TERMINAL_STATUSES:
+            self._log_counts.pop(job.id, None)
+
+    def _write_logs(self, job: AgentJob):
+        start = self._log_counts.get(job.id, 0)
+        lines = job.logs[start:]
+
+        if lines:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO job_logs (job_id, seq, line) VALUES (?, ?, ?)",
+                [(job.id, start + offset, line) for offset, line in enumerate(lines)]
+            )
+            self._log_counts[job.id] = start + len(lines)
+
+    def flush_logs(self):
+        with self._db:
+            for job in list(self._live.values()):
+                self._write_logs(job)
+
+    def get_job(self, job_id: str) -> Optional[AgentJob]:
+        if job_id in self._live:
+            return self._live[job_id]
+
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        logs = [r["line"] for r in self._db.execute("SELECT line FROM job_logs WHERE job_id = ? ORDER BY seq", (job_id,))]
+        return self._row_to_job(row, logs)
+
+    def _row_to_job(self, row: sqlite3.Row, logs: List[str]) -> AgentJob:
+        return AgentJob(
+            id=row["id"],
+            repository_id=row["repository_id"],
+            commit_hash=row["commit_hash"],
+            status=JobStatus(row["status"]),
+            created_at=datetime.fromtimestamp(row["created_at"]),
+            completed_at=datetime.fromtimestamp(row["completed_at"]) if row["completed_at"] else None,
+            logs=logs,
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            phase_timings=json.loads(row["phase_timings"]) if row["phase_timings"] else {}
+        )
+
+    def query_jobs(self, statuses: Optional[Sequence[JobStatus]] = None, repository_id: Optional[str] = None, created_after: Optional[datetime] = None, created_before: Optional[datetime] = None, after: Optional[JobCursor] = None, limit: int = 50, with_logs: bool = False) -> List[AgentJob]:
+        clauses: List[str] = []
+        params: List[Any] = []
+
+        if statuses:
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(status.value for status in statuses)
+        if repository_id is not None:
+            clauses.append("repository_id = ?")
+            params.append(repository_id)
+        if created_after is not None:
+            clauses.append("created_at >= ?")
+            params.append(created_after.timestamp())
+        if created_before is not None:
+            clauses.append("created_at < ?")
+            params.append(created_before.timestamp())
+        if after is not None:
+            clauses.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params.extend((after[0], after[0], after[1]))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._db.execute(f"SELECT * FROM jobs {where} ORDER BY created_at DESC, id DESC LIMIT ?", (*params, limit)).fetchall()
+
+        logs: Dict[str, List[str]] = {}
+        if with_logs:
+            self.flush_logs()
+            stored = [row["id"] for row in rows if row["id"] not in self._live]
+            if stored:
+                placeholders = ", ".join("?" * len(stored))
+                for r in self._db.execute(f"SELECT job_id, line FROM job_logs WHERE job_id IN ({placeholders}) ORDER BY job_id, seq", stored):
+                    logs.setdefault(r["job_id"], []).append(r["line"])
+
+        return [self._live.get(row["id"]) or self._row_to_job(row, logs.get(row["id"], [])) for row in rows]
+
+    def log_summary(self, job_ids: Sequence[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+        summary = {
+            job_id: (len(self._live[job_id].logs), self._live[job_id].logs[-1] if self._live[job_id].logs else None)
+            for job_id in job_ids if job_id in self._live
+        }
+
+        stored = [job_id for job_id in job_ids if job_id not in self._live]
+        if stored:
+            # Sequence numbers are contiguous from 0, so the last one gives the count
+            placeholders = ", ".join("?" * len(stored))
+            for r in self._db.execute(
+                f"""SELECT l.job_id, l.seq, l.line FROM job_logs l
+                    JOIN (SELECT job_id, MAX(seq) AS seq FROM job_logs WHERE job_id IN ({placeholders}) GROUP BY job_id) last
+                    ON l.job_id = last.job_id AND l.seq = last.seq""",
+                stored
+            ):
+                summary[r["job_id"]] = (r["seq"] + 1, r["line"])
+
+        return summary
+
+    def count_jobs(self, status: Optional[JobStatus] = None) -> int:
+        if status is None:
+            return self._db.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status.value,)).fetchone()[0]
+
+    def job_counts(self) -> Dict[Tuple[str, JobStatus], int]:
+        return {
+            (r["repository_id"], JobStatus(r["status"])): r["n"]
+            for r in self._db.execute("SELECT repository_id, status, COUNT(*) AS n FROM jobs GROUP BY repository_id, status")
+        }
+
+    def job_times_since(self, since: datetime) -> List[Tuple[datetime, Optional[datetime], JobStatus]]:
+        return [
+            (
+                datetime.fromtimestamp(r["created_at"]),
+                datetime.fromtimestamp(r["completed_at"]) if r["completed_at"] else None,
+                JobStatus(r["status"])
+            )
+            for r in self._db.execute(
+                "SELECT created_at, completed_at, status FROM jobs WHERE created_at >= ? OR completed_at >= ?",
+                (since.timestamp(), since.timestamp())
+            )
+        ]
+
+    def apply_retention(self) -> int:
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).timestamp()
+        terminal = tuple(s.value for s in TERMINAL_STATUSES)
+
+        with self._db:
+            expired = self._db.execute(
+                "SELECT id, repository_id, status FROM jobs WHERE created_at < ? AND status IN (?, ?)", (cutoff, *terminal)
+            ).fetchall()
+
+            overflow = self.count_jobs() - len(expired) - self.max_jobs
+            if overflow > 0:
+                expired += self._db.execute(
+                    "SELECT id, repository_id, status FROM jobs WHERE created_at >= ? AND status IN (?, ?) ORDER BY created_at LIMIT ?",
+                    (cutoff, *terminal, overflow)
+                ).fetchall()
+
+            for start in range(0, len(expired), 500):
+                chunk = [(r["id"],) for r in expired[start:start + 500]]
+                self._db.executemany("DELETE FROM job_logs WHERE job_id = ?", chunk)
+                self._db.executemany("DELETE FROM jobs WHERE id = ?", chunk)
+
+        self._jobs_removed([(r["repository_id"], JobStatus(r["status"])) for r in expired])
+        if expired:
+            self._db.execute("PRAGMA incremental_vacuum")
+
+        return len(expired)
+
+    def close(self):
+        self._db.close()
+
+def create_store(path: Optional[str], **kwargs) -> JobStore:
+    """SQLite store at ``path``, or an in-memory store when path is empty or ':memory:'"""
+    if not path or path == ":memory:":
+        return InMemoryJobStore(**kwargs)
+    return SQLiteJobStore(path, **kwargs)
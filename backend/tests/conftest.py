@@ -0,0 +1,15 @@
+"""
+Backend modules import each other by name, as they do when the app runs from this directory
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing app builds its store, caches and webhook log; keep them out of /tmp/agent_data
+_state_dir = tempfile.mkdtemp(prefix="agent-tests-")
+os.environ.setdefault("AGENT_DB_PATH", ":memory:")
+os.environ.setdefault("AGENT_CACHE_DIR", os.path.join(_state_dir, "cache"))
+os.environ.setdefault("AGENT_WEBHOOK_LOG", os.path.join(_state_dir, "webhooks.log"))
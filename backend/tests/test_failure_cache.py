@@ -0,0 +1,91 @@
+"""
+Failure analysis caching - an analysis is only reused while the code the failing test ran is unchanged
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from agent import AutonomousAgent
+from impact_map import ImpactMap, ImpactMapStore
+from llm_cache import CachedLLMClient, ResponseCache
+from models import Repository, TestResult as Result
+from pytest_runner import PytestRunner
+
+NODE_ID = "tests/test_auth.py::test_validate_token"
+TRACEBACK = """tests/test_auth.py:30: in test_validate_token
+    payload = manager.validate_token(token)
+src/auth.py:42: in validate_token
+    raise InvalidTokenError()
+E   auth.InvalidTokenError"""
+
+class CountingClient:
+    model = "test-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def stream_analyze_test_failure(self, test_name, error_message, commit_message):
+        self.calls += 1
+        yield {"type": "result", "data": {"root_cause": "secret mismatch", "fix_code": f"# fix {self.calls}"}}
+
+def write(root, path, content):
+    os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+    with open(os.path.join(root, path), "w") as f:
+        f.write(content)
+
+class TestFailureCache:
+    def setup_method(self):
+        self.agent = AutonomousAgent()
+        self.repository = Repository(id="repo-1", name="demo", url="https://github.com/acme/demo", connected_at="2024-01-01T00:00:00", status="connected")
+        self.failure = Result(test_name=NODE_ID, status="failed", duration=0.1, error_message=TRACEBACK)
+        self.backend = CountingClient()
+        self.client = CachedLLMClient(self.backend, ResponseCache())
+
+    def teardown_method(self):
+        asyncio.run(self.agent.close())
+
+    def analyze(self, checkout):
+        async def collect():
+            source = self.agent._failure_source(self.repository, checkout, self.failure)
+            return [event async for event in self.client.stream_analyze_test_failure(NODE_ID, TRACEBACK, "commit", source=source)]
+        return asyncio.run(collect())[-1]["data"]
+
+    def test_edited_module_under_test_misses(self, tmp_path):
+        """Test that changing a module named in the traceback invalidates the cached analysis"""
+        write(tmp_path, "tests/test_auth.py", "def test_validate_token(): ...\n")
+        write(tmp_path, "src/auth.py", "SECRET = 'a'\n")
+
+        assert self.analyze(tmp_path)["fix_code"] == "# fix 1"
+        assert self.analyze(tmp_path)["fix_code"] == "# fix 1"
+        assert self.backend.calls == 1
+
+        write(tmp_path, "src/auth.py", "SECRET = 'b'\n")
+
+        assert self.analyze(tmp_path)["fix_code"] == "# fix 2"
+        assert self.backend.calls == 2
+
+    def test_traced_module_is_part_of_the_source(self, tmp_path):
+        """Test that modules from the impact map count even when the traceback does not name them"""
+        store = ImpactMapStore(str(tmp_path / "impact"))
+        store.save(self.repository.id, ImpactMap(commit="abc", tests={NODE_ID: ["src/tokens.py"]}))
+        self.agent.test_runner = PytestRunner(workers=1, impact=store, warm=False)
+
+        checkout = tmp_path / "checkout"
+        write(checkout, "tests/test_auth.py", "def test_validate_token(): ...\n")
+        write(checkout, "src/tokens.py", "ALGORITHM = 'HS256'\n")
+        before = self.agent._failure_source(self.repository, checkout, self.failure)
+
+        write(checkout, "src/tokens.py", "ALGORITHM = 'HS512'\n")
+
+        assert "# src/tokens.py" in before
+        assert self.agent._failure_source(self.repository, checkout, self.failure) != before
+
+    @pytest.mark.parametrize("error_message", ["../outside.py:3: in helper", "/usr/lib/python3.11/json/decoder.py:337: in decode"])
+    def test_paths_outside_the_checkout_are_ignored(self, tmp_path, error_message):
+        """Test that traceback entries outside the checkout are not read"""
+        write(tmp_path, "tests/test_auth.py", "def test_validate_token(): ...\n")
+        self.failure.error_message = error_message
+
+        assert self.agent._failure_source(self.repository, tmp_path, self.failure) == "# tests/test_auth.py\ndef test_validate_token(): ...\n"
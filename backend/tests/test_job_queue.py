@@ -0,0 +1,142 @@
+"""
+Job queue tests - bounded capacity, push debouncing and the API's 429 backpressure
+"""
+
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import app
+from job_queue import JobQueue, QueueFullError
+from models import AgentJob, CommitEvent, JobStatus, Repository
+
+def repository(repo_id="repo-1"):
+    return Repository(id=repo_id, name="org/repo", url="https://github.com/org/repo", connected_at=datetime.now(), status="connected")
+
+def job(job_id, repo_id="repo-1"):
+    return AgentJob(id=job_id, repository_id=repo_id, commit_hash=job_id, status=JobStatus.PENDING, created_at=datetime.now())
+
+def commit_event(sha, repo_id="repo-1"):
+    return CommitEvent(repository_id=repo_id, commit_hash=sha, author="dev", message=f"commit {sha}", timestamp=datetime.now(), branch="main")
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+class TestJobQueue:
+    def setup_method(self):
+        self.handled = []
+
+    async def handler(self, job, repository, commit_event):
+        self.handled.append((job.id, commit_event.commit_hash))
+
+    def test_submit_rejects_when_full(self):
+        """Test that a submit past max_size raises QueueFullError and is counted as rejected"""
+        queue = JobQueue(self.handler, max_size=2)
+
+        assert queue.submit(job("a"), repository(), commit_event("a")) == 1
+        assert queue.submit(job("b"), repository(), commit_event("b")) == 2
+
+        try:
+            queue.submit(job("c"), repository(), commit_event("c"))
+            assert False, "expected QueueFullError"
+        except QueueFullError:
+            pass
+
+        assert queue.stats()["pending"] == 2
+        assert queue.stats()["rejected"] == 1
+        assert queue.position("c") is None
+
+    def test_superseded_job_runs_once_with_latest_event(self):
+        """Test that a keyed job superseded while held back runs once, after the delay, with the newer event"""
+        async def scenario():
+            queue = JobQueue(self.handler, num_workers=2)
+            await queue.start()
+            try:
+                entry_job = job("a")
+                queue.submit(entry_job, repository(), commit_event("first"), key="repo-1:main", delay=0.2)
+
+                await asyncio.sleep(0.1)
+                entry = queue.pending_for("repo-1:main")
+                assert entry is not None and entry.job is entry_job
+                assert queue.supersede(entry, commit_event("second"), delay=0.2) == 1
+
+                # The original delay has passed, but the supersede restarted it
+                await asyncio.sleep(0.15)
+                assert self.handled == []
+
+                await wait_for(lambda: queue.stats()["processed"] == 1)
+                assert queue.pending_for("repo-1:main") is None
+                return queue.stats()
+            finally:
+                await queue.stop()
+
+        stats = asyncio.run(scenario())
+
+        assert self.handled == [("a", "second")]
+        assert stats["superseded"] == 1
+        assert stats["pending"] == 0
+
+    def test_busy_repository_does_not_block_others(self):
+        """Test that a worker skips a job whose repository is at its limit and runs the next repository's job"""
+        release = asyncio.Event()
+        started = []
+
+        async def handler(job, repository, commit_event):
+            started.append(job.id)
+            if repository.id == "repo-1":
+                await release.wait()
+
+        async def scenario():
+            queue = JobQueue(handler, num_workers=2, per_repo_limit=1)
+            queue.submit(job("a1"), repository("repo-1"), commit_event("a1"))
+            queue.submit(job("a2"), repository("repo-1"), commit_event("a2"))
+            queue.submit(job("b1", "repo-2"), repository("repo-2"), commit_event("b1", "repo-2"))
+
+            await queue.start()
+            try:
+                await wait_for(lambda: "b1" in started)
+                assert started == ["a1", "b1"]
+
+                release.set()
+                await wait_for(lambda: queue.stats()["processed"] == 3)
+            finally:
+                await queue.stop()
+
+        asyncio.run(scenario())
+
+        assert started == ["a1", "b1", "a2"]
+
+class TestQueueBackpressure:
+    def setup_method(self):
+        self.original_queue = app.job_queue
+        self.original_store = app.store
+        app.job_queue = JobQueue(app.run_job, max_size=1)
+        app.store = app.create_store(":memory:")
+        # Without the context manager the startup hooks, and so the workers, never run
+        self.client = TestClient(app.app)
+
+    def teardown_method(self):
+        app.job_queue = self.original_queue
+        app.store = self.original_store
+
+    def test_full_queue_returns_429(self):
+        """Test that a commit arriving while the queue is full is refused with 429 and Retry-After"""
+        response = self.client.post("/repositories/connect", json={"repo_name": "org/repo", "repo_url": "https://github.com/org/repo", "access_token": "token"})
+        assert response.status_code == 200
+
+        first = self.client.post("/demo/trigger-commit")
+        assert first.status_code == 200
+        assert first.json()["queue_position"] == 1
+
+        second = self.client.post("/demo/trigger-commit")
+        assert second.status_code == 429
+        assert second.headers["Retry-After"] == "30"
+        assert "full" in second.json()["detail"]
+
+        # The rejected commit never became a job
+        assert app.store.count_jobs() == 1
+        assert app.job_queue.stats()["rejected"] == 1
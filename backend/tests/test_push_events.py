@@ -0,0 +1,65 @@
+"""
+Push event tests - a queued range absorbs later pushes to the same branch
+"""
+
+from datetime import datetime
+
+from models import CommitEvent, PushedCommit
+from push_events import changed_paths, merge_commit_events
+
+def commit(sha, *modified):
+    return PushedCommit(id=sha * 40, author="dev", message=f"commit {sha}", modified=list(modified))
+
+def event(base, *commits):
+    return CommitEvent(
+        repository_id="repo-1",
+        commit_hash=commits[-1].id,
+        author="dev",
+        message="\n".join(c.message for c in commits),
+        timestamp=datetime(2024, 1, 1),
+        branch="main",
+        base_hash=base,
+        commits=list(commits)
+    )
+
+A, B, C, D, E = (commit(sha, f"src/{sha}.py") for sha in "abcde")
+ROOT = "0123456789" * 4
+
+class TestMergeCommitEvents:
+    def test_push_on_top_extends_the_range(self):
+        """Test that a push based on the queued head keeps the queued base and appends its commits"""
+        merged = merge_commit_events(event(ROOT, A, B), event(B.id, C))
+
+        assert merged.base_hash == ROOT
+        assert merged.commit_hash == C.id
+        assert [c.id for c in merged.commits] == [A.id, B.id, C.id]
+        assert merged.message == "commit a\ncommit b\ncommit c"
+
+    def test_diverged_base_drops_rewritten_commits(self):
+        """Test that a force push onto a queued commit drops the queued commits after it"""
+        merged = merge_commit_events(event(ROOT, A, B, C), event(A.id, D))
+
+        assert merged.base_hash == ROOT
+        assert [c.id for c in merged.commits] == [A.id, D.id]
+        assert changed_paths(merged.commits) == ["src/a.py", "src/d.py"]
+
+    def test_force_push_rewriting_everything_replaces_the_range(self):
+        """Test that a force push from outside the queued range is analyzed on its own"""
+        newer = event("f" * 40, D, E)
+
+        assert merge_commit_events(event(ROOT, A, B), newer) == newer
+
+    def test_push_without_base_extends_the_range(self):
+        """Test that a push with no known base is treated as continuing the queued one"""
+        merged = merge_commit_events(event(ROOT, A), event(None, B))
+
+        assert merged.base_hash == ROOT
+        assert [c.id for c in merged.commits] == [A.id, B.id]
+
+class TestChangedPaths:
+    def test_union_of_every_commit(self):
+        """Test that added, modified and removed paths of all commits are listed once"""
+        first = PushedCommit(id="1" * 40, author="dev", message="one", added=["new.py"], modified=["src/a.py"])
+        second = PushedCommit(id="2" * 40, author="dev", message="two", modified=["src/a.py"], removed=["old.py"])
+
+        assert changed_paths([first, second]) == ["new.py", "old.py", "src/a.py"]
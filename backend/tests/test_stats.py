@@ -0,0 +1,48 @@
+"""
+Job stats tests - rolling window bucket expiry
+"""
+
+from stats import RollingWindow
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestRollingWindow:
+    def setup_method(self):
+        self.clock = Clock()
+        self.window = RollingWindow(span=60, bucket_seconds=10, clock=self.clock)
+
+    def test_events_expire_with_their_bucket(self):
+        """Test that events leave the counts once their bucket falls out of the window"""
+        self.window.add("created")
+        self.clock.now += 30
+        self.window.add("created")
+        self.window.add("failed")
+
+        assert self.window.counts() == {"created": 2, "completed": 0, "failed": 1}
+
+        self.clock.now += 30
+        assert self.window.counts() == {"created": 1, "completed": 0, "failed": 1}
+
+        self.clock.now += 30
+        assert self.window.counts() == {"created": 0, "completed": 0, "failed": 0}
+
+    def test_long_idle_gap_clears_the_window(self):
+        """Test that a gap longer than the whole ring resets every bucket"""
+        self.window.add("completed")
+        self.clock.now += 3600
+        self.window.add("completed")
+
+        assert self.window.counts()["completed"] == 1
+
+    def test_timestamps_outside_the_window_are_ignored(self):
+        """Test that events stamped before the window or in the future are not counted"""
+        self.window.add("created", at=self.clock.now - 120)
+        self.window.add("created", at=self.clock.now + 20)
+        self.window.add("created", at=self.clock.now - 50)
+
+        assert self.window.counts()["created"] == 1
@@ -0,0 +1,188 @@
+"""
+Job store tests - SQLite round-trip across restarts, repository lookup and retention
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import AgentJob, JobStatus, Repository
+from repo_index import canonical_repo_key
+from storage import InMemoryJobStore, SQLiteJobStore, create_store
+
+def repository(repo_id="repo-1", name="Org/Repo", url="https://github.com/Org/Repo.git"):
+    return Repository(id=repo_id, name=name, url=url, connected_at=datetime(2024, 1, 1), status="connected")
+
+def job(job_id, status=JobStatus.COMPLETED, age=timedelta(0), repo_id="repo-1"):
+    created_at = datetime.now() - age
+    return AgentJob(
+        id=job_id,
+        repository_id=repo_id,
+        commit_hash=f"{job_id}-sha",
+        status=status,
+        created_at=created_at,
+        completed_at=created_at if status in (JobStatus.COMPLETED, JobStatus.FAILED) else None
+    )
+
+class TestSQLiteRoundTrip:
+    def test_repositories_and_jobs_survive_reopen(self, tmp_path):
+        """Test that repositories, finished jobs with their result and flushed logs are read back after reopening"""
+        path = str(tmp_path / "agent.sqlite3")
+        store = SQLiteJobStore(path)
+        store.add_repository(repository())
+
+        finished = job("done", status=JobStatus.RUNNING)
+        store.add_job(finished)
+        finished.logs.append("🧪 Running tests")
+        store.flush_logs()
+        finished.logs.append("✅ All tests passed")
+        finished.status = JobStatus.COMPLETED
+        finished.completed_at = datetime.now()
+        finished.result = {"tests_run": 3, "fixes_applied": 0}
+        store.save_job(finished)
+        store.close()
+
+        store = SQLiteJobStore(path)
+        try:
+            assert [r.id for r in store.list_repositories()] == ["repo-1"]
+            assert store.count_repositories() == 1
+
+            loaded = store.get_job("done")
+            assert loaded.status == JobStatus.COMPLETED
+            assert loaded.result == {"tests_run": 3, "fixes_applied": 0}
+            assert loaded.logs == ["🧪 Running tests", "✅ All tests passed"]
+            assert store.log_summary(["done"]) == {"done": (2, "✅ All tests passed")}
+        finally:
+            store.close()
+
+    def test_live_job_logs_flushed_before_a_crash_are_kept(self, tmp_path):
+        """Test that a running job left by a stopped process comes back failed, with the logs flushed so far"""
+        path = str(tmp_path / "agent.sqlite3")
+        store = SQLiteJobStore(path)
+        running = job("live", status=JobStatus.RUNNING)
+        store.add_job(running)
+        running.logs.append("📥 Cloning repository")
+        store.flush_logs()
+        running.logs.append("never flushed")
+        store.close()
+
+        store = SQLiteJobStore(path)
+        try:
+            loaded = store.get_job("live")
+            assert loaded.status == JobStatus.FAILED
+            assert loaded.error == "Interrupted by server restart"
+            assert loaded.logs == ["📥 Cloning repository"]
+        finally:
+            store.close()
+
+    def test_create_store_picks_backend_from_path(self, tmp_path):
+        """Test that an empty or ':memory:' path gives the in-memory store and a file path gives SQLite"""
+        assert isinstance(create_store(None), InMemoryJobStore)
+        assert isinstance(create_store(":memory:"), InMemoryJobStore)
+
+        store = create_store(str(tmp_path / "nested" / "agent.sqlite3"))
+        try:
+            assert isinstance(store, SQLiteJobStore)
+        finally:
+            store.close()
+
+class TestRepositoryLookup:
+    @pytest.mark.parametrize("identifier", [
+        "https://github.com/Org/Repo.git",
+        "https://www.github.com/org/repo/",
+        "http://token@github.com/org/repo",
+        "git@github.com:org/repo.git",
+        "ssh://git@github.com:22/org/repo.git",
+        "org/repo",
+        "https://github.com/org/repo/tree/main"
+    ])
+    def test_url_variants_find_the_repository(self, identifier):
+        """Test that clone, web and owner/name forms of a URL all resolve to the connected repository"""
+        store = InMemoryJobStore()
+        store.add_repository(repository())
+
+        assert canonical_repo_key(identifier) == "github.com/org/repo"
+        assert store.find_repository(identifier).id == "repo-1"
+
+    def test_other_repositories_do_not_match(self):
+        """Test that a different owner, name or host is not resolved to the connected repository"""
+        store = InMemoryJobStore()
+        store.add_repository(repository())
+
+        assert store.find_repository("org/other") is None
+        assert store.find_repository("someone/repo") is None
+        assert store.find_repository("https://gitlab.com/org/repo") is None
+
+    def test_removed_repository_is_unindexed(self, tmp_path):
+        """Test that disconnecting a repository drops its lookup keys, including after a reopen"""
+        path = str(tmp_path / "agent.sqlite3")
+        store = SQLiteJobStore(path)
+        store.add_repository(repository())
+        store.add_repository(repository("repo-2", name="demo", url="demo"))
+        store.remove_repository("repo-1")
+        store.close()
+
+        store = SQLiteJobStore(path)
+        try:
+            assert store.find_repository("org/repo") is None
+            assert store.find_repository("https://github.com/acme/demo", "demo").id == "repo-2"
+            assert store.count_repositories() == 1
+        finally:
+            store.close()
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    stores = []
+
+    def make(**kwargs):
+        store = InMemoryJobStore(**kwargs) if request.param == "memory" else SQLiteJobStore(str(tmp_path / "agent.sqlite3"), **kwargs)
+        stores.append(store)
+        return store
+
+    yield make
+
+    for store in stores:
+        store.close()
+
+class TestRetention:
+    def test_finished_jobs_past_retention_are_removed(self, make_store):
+        """Test that only finished jobs older than retention_days are removed"""
+        store = make_store(retention_days=7)
+        store.add_job(job("old-done", age=timedelta(days=8)))
+        store.add_job(job("old-failed", status=JobStatus.FAILED, age=timedelta(days=8)))
+        store.add_job(job("old-running", status=JobStatus.RUNNING, age=timedelta(days=8)))
+        store.add_job(job("recent", age=timedelta(days=1)))
+
+        assert store.apply_retention() == 2
+
+        assert store.get_job("old-done") is None
+        assert store.get_job("old-failed") is None
+        assert store.get_job("old-running") is not None
+        assert store.get_job("recent") is not None
+        assert store.count_jobs() == 2
+
+    def test_overflow_removes_oldest_finished_jobs(self, make_store):
+        """Test that past max_jobs the oldest finished jobs go first and live jobs are kept"""
+        store = make_store(max_jobs=3)
+        store.add_job(job("live", status=JobStatus.PENDING, age=timedelta(hours=5)))
+        for hours in (4, 3, 2, 1):
+            store.add_job(job(f"done-{hours}", age=timedelta(hours=hours)))
+
+        assert store.apply_retention() == 2
+
+        assert store.count_jobs() == 3
+        assert store.get_job("live") is not None
+        assert store.get_job("done-4") is None
+        assert store.get_job("done-3") is None
+        assert store.get_job("done-1") is not None
+
+    def test_retention_notifies_listeners(self, make_store):
+        """Test that removed jobs are reported to listeners as leaving their status"""
+        store = make_store(retention_days=1)
+        changes = []
+        store.add_job(job("old", age=timedelta(days=2)))
+        store.add_listener(lambda repository_id, old, new: changes.append((repository_id, old, new)))
+
+        store.apply_retention()
+
+        assert changes == [("repo-1", JobStatus.COMPLETED, None)]
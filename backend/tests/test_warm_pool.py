@@ -0,0 +1,84 @@
+"""
+Warm worker tests - forked runs see the checkout they run in, not the one the worker warmed up from
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from pytest_runner import PytestRunner
+
+NODE_ID = "tests/test_settings.py::test_limit"
+
+def write(root, path, content):
+    os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+    with open(os.path.join(root, path), "w") as f:
+        f.write(content)
+
+def git(cwd, *args):
+    subprocess.run(["git", "-C", str(cwd), "-c", "user.name=test", "-c", "user.email=test@example.com", *args], check=True, capture_output=True)
+
+class TestWarmPool:
+    def setup_method(self):
+        self.runner = PytestRunner(workers=1, test_timeout=30)
+
+    def run(self, coro):
+        """Run ``coro`` and stop the warm workers on the same event loop"""
+        async def run_and_close():
+            try:
+                return await coro
+            finally:
+                await self.runner.close()
+        return asyncio.run(run_and_close())
+
+    def make_repository(self, root):
+        write(root, "settings.py", "LIMIT = 10\n")
+        write(root, "tests/test_settings.py", "import settings\n\ndef test_limit():\n    assert settings.LIMIT == 10\n")
+        git(root, "init", "-q")
+        git(root, "add", ".")
+        git(root, "commit", "-q", "-m", "init")
+
+    def test_edited_module_is_seen_by_the_next_run(self, tmp_path):
+        """Test that a module changed between two warm runs is imported afresh"""
+        self.make_repository(tmp_path)
+
+        async def run_twice():
+            first = await self.runner.run_specific_test(str(tmp_path), NODE_ID)
+            write(tmp_path, "settings.py", "LIMIT = 11\n")
+            second = await self.runner.run_specific_test(str(tmp_path), NODE_ID)
+            return first, second
+
+        first, second = self.run(run_twice())
+
+        assert first.status == "passed"
+        assert second.status == "failed"
+        assert self.runner.warm_pool.warm_runs == 2
+
+    @pytest.mark.skipif(not os.path.isdir("/proc/self"), reason="reads the worker's directory from /proc")
+    def test_worker_outlives_the_checkout_it_warmed_up_from(self, tmp_path):
+        """Test that removing the first checkout does not break runs in another worktree"""
+        main = tmp_path / "main"
+        self.make_repository(main)
+        git(main, "worktree", "add", "-q", "--detach", str(tmp_path / "first"))
+        git(main, "worktree", "add", "-q", "--detach", str(tmp_path / "second"))
+
+        async def run_in_both():
+            first = await self.runner.run_specific_test(str(tmp_path / "first"), NODE_ID)
+            worker, = self.runner.warm_pool._workers.values()
+            self.worker_cwd = os.readlink(f"/proc/{worker.process.pid}/cwd")
+            shutil.rmtree(tmp_path / "first")
+            write(tmp_path / "second", "settings.py", "LIMIT = 12\n")
+            second = await self.runner.run_specific_test(str(tmp_path / "second"), NODE_ID)
+            return first, second
+
+        first, second = self.run(run_in_both())
+
+        assert first.status == "passed"
+        assert not self.worker_cwd.startswith(str(tmp_path))
+        assert second.status == "failed"
+        assert "12" in second.error_message
+        assert self.runner.warm_pool.started == 1
+        assert self.runner.warm_pool.warm_runs == 2
@@ -0,0 +1,133 @@
+"""
+Webhook ingestion tests - delivery dedupe, the durable log and replay after a restart
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from webhook_ingest import DeliveryDeduper, InvalidSignatureError, WebhookIngestor, WebhookLog
+
+def body(n):
+    return json.dumps({"n": n}).encode()
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+class TestDeliveryDeduper:
+    def test_delivery_is_forgotten_after_ttl(self):
+        """Test that a delivery ID is reported seen until its TTL runs out"""
+        deduper = DeliveryDeduper(ttl_seconds=60)
+        deduper.add("d1", now=1000)
+
+        assert deduper.seen("d1", now=1059)
+        assert not deduper.seen("d1", now=1060)
+        assert len(deduper) == 0
+
+    def test_oldest_delivery_is_evicted_at_capacity(self):
+        """Test that past max_entries the oldest delivery ID makes room for new ones"""
+        deduper = DeliveryDeduper(ttl_seconds=60, max_entries=2)
+        for n, delivery_id in enumerate(["d1", "d2", "d3"]):
+            deduper.add(delivery_id, now=1000 + n)
+
+        assert not deduper.seen("d1", now=1003)
+        assert deduper.seen("d2", now=1003)
+        assert deduper.seen("d3", now=1003)
+
+class TestWebhookIngestor:
+    def setup_method(self):
+        self.handled = []
+
+    async def handler(self, event, payload):
+        self.handled.append((event, payload["n"]))
+
+    def test_duplicate_delivery_is_rejected(self, tmp_path):
+        """Test that a redelivered ID is not appended to the log again"""
+        ingestor = WebhookIngestor(WebhookLog(str(tmp_path / "webhooks.log")), self.handler)
+
+        assert ingestor.ingest("d1", "push", body(1))
+        assert not ingestor.ingest("d1", "push", body(1))
+
+        assert ingestor.stats()["accepted"] == 1
+        assert ingestor.stats()["duplicates"] == 1
+        assert len(list(ingestor.log.records())) == 1
+        ingestor.log.close()
+
+    def test_bad_signature_is_rejected(self, tmp_path):
+        """Test that with a secret configured an unsigned delivery raises and is not recorded"""
+        ingestor = WebhookIngestor(WebhookLog(str(tmp_path / "webhooks.log")), self.handler, secret="s3cret")
+
+        with pytest.raises(InvalidSignatureError):
+            ingestor.ingest("d1", "push", body(1), signature="sha256=00")
+
+        assert ingestor.log.size() == 0
+        assert not ingestor.deduper.seen("d1")
+        ingestor.log.close()
+
+    def test_restart_replays_unconsumed_deliveries_once(self, tmp_path):
+        """Test that after a restart consumed deliveries are not handled again, pending ones are, and old IDs stay deduplicated"""
+        path = str(tmp_path / "webhooks.log")
+
+        async def first_run():
+            ingestor = WebhookIngestor(WebhookLog(path), self.handler)
+            await ingestor.start()
+            ingestor.ingest("d1", "push", body(1))
+            await wait_for(lambda: ingestor.processed == 1)
+            await ingestor.stop()
+
+        asyncio.run(first_run())
+
+        # Accepted while the consumer was not running, e.g. just before a crash
+        ingestor = WebhookIngestor(WebhookLog(path), self.handler)
+        ingestor.ingest("d2", "push", body(2))
+        ingestor.log.close()
+
+        async def second_run():
+            ingestor = WebhookIngestor(WebhookLog(path), self.handler)
+            assert not ingestor.ingest("d1", "push", body(1))
+            assert not ingestor.ingest("d2", "push", body(2))
+
+            await ingestor.start()
+            ingestor.ingest("d3", "push", body(3))
+            await wait_for(lambda: ingestor.processed == 2)
+            await ingestor.stop()
+
+        asyncio.run(second_run())
+
+        assert self.handled == [("push", 1), ("push", 2), ("push", 3)]
+
+    def test_incomplete_trailing_record_is_dropped(self, tmp_path):
+        """Test that half a record left by a crash is cut off and later appends stay readable"""
+        path = str(tmp_path / "webhooks.log")
+        log = WebhookLog(path)
+        log.append("d1", "push", body(1))
+        complete = log.size()
+        log.append("d2", "push", body(2))
+        log.close()
+
+        with open(path, "r+b") as f:
+            f.truncate(complete + 10)
+
+        log = WebhookLog(path)
+        assert log.size() == complete
+        log.append("d3", "push", body(3))
+
+        assert [(header["delivery"], payload) for _, header, payload in log.records()] == [("d1", body(1)), ("d3", body(3))]
+        log.close()
+
+    def test_consumed_log_is_compacted(self, tmp_path):
+        """Test that a fully consumed log past max_bytes is truncated and its offset reset"""
+        log = WebhookLog(str(tmp_path / "webhooks.log"), max_bytes=1)
+        log.append("d1", "push", body(1))
+
+        assert log.compact(0) == 0
+        assert log.size() > 0
+
+        assert log.compact(log.size()) == 0
+        assert log.size() == 0
+        assert log.read_offset() == 0
+        log.close()
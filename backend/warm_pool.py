@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Files whose content decides which third-party modules a warm worker holds
+DEPENDENCY_FILES = ("requirements.txt", "requirements-dev.txt", "setup.py", "setup.cfg", "pyproject.toml")
+
+class WarmWorkerError(Exception):
+    """Raised when a warm worker cannot be started or dies; callers fall back to a cold run"""
+
+class WarmWorker:
+    """One forking worker process and the requests in flight on it"""
+
+    def __init__(self, key: str, process: asyncio.subprocess.Process):
+        self.key = key
+        self.process = process
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+        self.runs = 0
+
+        self._pids: Dict[str, asyncio.Future] = {}
+        self._exits: Dict[str, asyncio.Future] = {}
+        self._reader = asyncio.create_task(self._read())
+
+    def _future(self, futures: Dict[str, asyncio.Future], request_id: str) -> asyncio.Future:
+        if request_id not in futures:
+            futures[request_id] = asyncio.get_running_loop().create_future()
+        return futures[request_id]
+
+    async def _read(self):
+        try:
+            async for line in self.process.stdout:
+                message = json.loads(line)
+                if message.get("ready"):
+                    self.ready.set_result(message)
+                elif "pid" in message:
+                    self._future(self._pids, message["id"]).set_result(message["pid"])
+                elif "exit" in message:
+                    self._future(self._exits, message["id"]).set_result(message["exit"])
+        finally:
+            error = WarmWorkerError(f"Warm worker for {self.key} exited")
+            for future in [self.ready, *self._pids.values(), *self._exits.values()]:
+                if not future.done():
+                    future.set_exception(error)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None and not self._reader.done()
+
+    async def run(self, cwd: str, args: List[str], env: Dict[str, str], timeout: float) -> Optional[int]:
+        """Fork a child to run pytest in ``cwd``; returns its exit code, or None if it was killed"""
+        request_id = uuid.uuid4().hex
+        exit_code = self._future(self._exits, request_id)
+        self.in_flight += 1
+        self.runs += 1
+        try:
+            self.process.stdin.write((json.dumps({"id": request_id, "cwd": cwd, "args": args, "env": env}) + "\n").encode())
+            await self.process.stdin.drain()
+            pid = await asyncio.wait_for(self._future(self._pids, request_id), timeout)
+
+            try:
+                return await asyncio.wait_for(asyncio.shield(exit_code), timeout)
+            except asyncio.TimeoutError:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                return None
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise WarmWorkerError(f"Warm worker for {self.key} is gone: {str(e)}")
+        finally:
+            self._pids.pop(request_id, None)
+            self._exits.pop(request_id, None)
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    async def close(self):
+        if self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        await asyncio.gather(self._reader, return_exceptions=True)
+
+class WarmPool:
+    """Pre-imported pytest workers, one per repository.
+
+    A worker warms up from one checkout of a repository, imports the test
+    suite's dependencies once and then forks a child per run, so a run
+    only pays for the test itself and for importing the repository's own
+    modules, which are always loaded fresh from the checkout being tested.
+    Checkouts share a worker when they belong to the same repository (same
+    git common directory) and declare the same dependencies. Workers idle
+    for ``idle_timeout`` seconds are stopped, as are the least recently
+    used ones beyond ``max_workers``. Workers run in an empty directory of
+    the pool's, as the checkout they warmed up from is usually removed when
+    its job ends.
+    """
+
+    def __init__(self, command: List[str], env: Callable[[], Dict[str, str]], start_timeout: float = 60, idle_timeout: float = 300, max_workers: int = 4):
+        self.command = command
+        self.env = env
+        self.start_timeout = start_timeout
+        self.idle_timeout = idle_timeout
+        self.max_workers = max_workers
+
+        self._workers: Dict[str, WarmWorker] = {}
+        self._starting: Dict[str, asyncio.Task] = {}
+        self._prewarming: Set[asyncio.Task] = set()
+        self._home: Optional[str] = None
+        self.started = 0
+        self.warm_runs = 0
+        self.failures = 0
+
+    async def _key(self, repo_path: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            "git", "-C", repo_path, "rev-parse", "--path-format=absolute", "--git-common-dir",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        repository = stdout.decode().strip() if process.returncode == 0 else os.path.realpath(repo_path)
+
+        digest = hashlib.sha1(repository.encode())
+        for name in DEPENDENCY_FILES:
+            try:
+                with open(os.path.join(repo_path, name), "rb") as f:
+                    digest.update(name.encode() + b"\0" + f.read())
+            except FileNotFoundError:
+                pass
+
+        return digest.hexdigest()
+
+    async def _start(self, key: str, repo_path: str) -> WarmWorker:
+        started = time.perf_counter()
+        if self._home is None:
+            self._home = os.path.realpath(tempfile.mkdtemp(prefix="agent-warm-"))
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            os.path.realpath(repo_path),
+            cwd=self._home,
+            env=self.env(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        worker = WarmWorker(key, process)
+
+        try:
+            ready = await asyncio.wait_for(asyncio.shield(worker.ready), self.start_timeout)
+        except (asyncio.TimeoutError, WarmWorkerError) as e:
+            await worker.close()
+            raise WarmWorkerError(f"Warm worker for {repo_path} did not start: {str(e) or 'timed out'}")
+
+        self.started += 1
+        logger.info(f"Warm test worker ready for {repo_path} in {time.perf_counter() - started:.2f}s ({ready['modules']} modules)")
+
+        return worker
+
+    async def _worker(self, repo_path: str) -> WarmWorker:
+        key = await self._key(repo_path)
+
+        worker = self._workers.get(key)
+        if worker is not None:
+            if worker.alive:
+                return worker
+            del self._workers[key]
+            await worker.close()
+
+        # Concurrent callers for the same repository share one start
+        if key not in self._starting:
+            self._starting[key] = asyncio.create_task(self._start(key, repo_path))
+        try:
+            worker = await asyncio.shield(self._starting[key])
+        finally:
+            if self._starting.get(key) is not None and self._starting[key].done():
+                del self._starting[key]
+
+        self._workers[key] = worker
+        worker.last_used = time.monotonic()
+        await self._evict()
+
+        return worker
+
+    async def _evict(self):
+        now = time.monotonic()
+        idle = [worker for worker in self._workers.values() if not worker.in_flight]
+        idle.sort(key=lambda worker: worker.last_used)
+
+        excess = len(self._workers) - self.max_workers
+        for worker in idle:
+            if excess <= 0 and now - worker.last_used < self.idle_timeout and worker.alive:
+                continue
+            excess -= 1
+            del self._workers[worker.key]
+            await worker.close()
+
+    def prewarm(self, repo_path: str):
+        """Start the worker for ``repo_path`` in the background, if it is not running yet"""
+        async def warm():
+            try:
+                await self._worker(repo_path)
+            except WarmWorkerError as e:
+                logger.warning(str(e))
+
+        task = asyncio.create_task(warm())
+        self._prewarming.add(task)
+        task.add_done_callback(self._prewarming.discard)
+
+    async def run(self, repo_path: str, args: List[str], env: Dict[str, str], timeout: float) -> Optional[int]:
+        """Run pytest with ``args`` in ``repo_path`` on a warm worker; returns the exit code, or None if killed"""
+        try:
+            worker = await self._worker(repo_path)
+            exit_code = await worker.run(os.path.realpath(repo_path), args, env, timeout)
+        except WarmWorkerError:
+            self.failures += 1
+            raise
+
+        self.warm_runs += 1
+        return exit_code
+
+    async def close(self):
+        tasks = [*self._prewarming, *self._starting.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._starting.clear()
+
+        await asyncio.gather(*[worker.close() for worker in self._workers.values()])
+        self._workers.clear()
+        if self._home is not None:
+            shutil.rmtree(self._home, ignore_errors=True)
+            self._home = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "started": self.started,
+            "warm_runs": self.warm_runs,
+            "failures": self.failures
+        }
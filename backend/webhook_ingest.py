@@ -0,0 +1,254 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WebhookHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+class InvalidSignatureError(Exception):
+    """Raised when a webhook body does not match its X-Hub-Signature-256 header"""
+
+class RetryLater(Exception):
+    """Raised by a handler that cannot take the event yet; the consumer backs off and retries it"""
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]):
+    """Check GitHub's ``sha256=<hex>`` HMAC of the raw request body"""
+    if not signature or not signature.startswith("sha256="):
+        raise InvalidSignatureError("Missing X-Hub-Signature-256 header")
+
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, signature[len("sha256="):]):
+        raise InvalidSignatureError("Webhook signature does not match")
+
+class DeliveryDeduper:
+    """Remembers delivery IDs for ``ttl_seconds``, holding at most ``max_entries``"""
+
+    def __init__(self, ttl_seconds: float = 72 * 3600, max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+
+    def _expire(self, now: float, room: int = 0):
+        # Entries are in arrival order, so expired ones are always at the front
+        while self._expiry:
+            oldest_expiry = next(iter(self._expiry.values()))
+            if oldest_expiry > now and len(self._expiry) + room <= self.max_entries:
+                break
+            self._expiry.popitem(last=False)
+
+    def seen(self, delivery_id: str, now: Optional[float] = None) -> bool:
+        """True if the delivery was already recorded"""
+        self._expire(time.time() if now is None else now)
+        return delivery_id in self._expiry
+
+    def add(self, delivery_id: str, now: Optional[float] = None):
+        """Record a delivery"""
+        now = time.time() if now is None else now
+        self._expiry.pop(delivery_id, None)
+        self._expire(now, room=1)
+        self._expiry[delivery_id] = now + self.ttl_seconds
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+class WebhookLog:
+    """Append-only file of raw webhook deliveries.
+
+    Each record is a JSON header line with the body length, followed by
+    the body bytes as received. The consumer's read position is kept in a
+    ``.offset`` file next to the log, so unprocessed deliveries survive a
+    restart; once everything is consumed and the log has grown past
+    ``max_bytes`` it is truncated.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 16 * 1024 * 1024):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._writer = open(path, "ab")
+        self.dirty = False
+
+        # A crash can leave half a record at the end; cut it off so later appends stay readable
+        complete = 0
+        for complete, _, _ in self.records(with_body=False):
+            pass
+        if complete < self.size():
+            logger.warning(f"Dropping {self.size() - complete} bytes of incomplete webhook records")
+            self._writer.truncate(complete)
+
+    def append(self, delivery_id: str, event: str, body: bytes):
+        header = json.dumps({"delivery": delivery_id, "event": event, "received_at": time.time(), "length": len(body)})
+        self._writer.write(header.encode() + b"\n" + body + b"\n")
+        self._writer.flush()
+        self.dirty = True
+
+    def sync(self):
+        """fsync appended records; called periodically instead of per delivery"""
+        if self.dirty:
+            self.dirty = False
+            os.fsync(self._writer.fileno())
+
+    def size(self) -> int:
+        return os.fstat(self._writer.fileno()).st_size
+
+    def read_offset(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return min(int(f.read().strip() or 0), self.size())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def write_offset(self, offset: int):
+        temp_path = f"{self.offset_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(str(offset))
+        os.replace(temp_path, self.offset_path)
+
+    def records(self, offset: int = 0, with_body: bool = True) -> Iterator[Tuple[int, Dict[str, Any], bytes]]:
+        """Yield (offset after the record, header, body) for complete records from ``offset``"""
+        with open(self.path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            f.seek(offset)
+            while True:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    return
+
+                try:
+                    header = json.loads(line)
+                except ValueError:
+                    return
+
+                record_end = f.tell() + header["length"] + 1
+                if record_end > end:
+                    return
+
+                if with_body:
+                    body = f.read(header["length"] + 1)[:-1]
+                else:
+                    f.seek(record_end)
+                    body = b""
+
+                yield record_end, header, body
+
+    def compact(self, offset: int) -> int:
+        """Truncate the log if it is fully consumed and large; returns the new read offset"""
+        if offset < self.size() or self.size() < self.max_bytes:
+            return offset
+
+        self._writer.truncate(0)
+        self.write_offset(0)
+        return 0
+
+    def close(self):
+        self.sync()
+        self._writer.close()
+
+class WebhookIngestor:
+    """Accepts webhook deliveries quickly and processes them in the background.
+
+    ``ingest`` only checks the signature, drops deliveries seen before and
+    appends the raw body to the log, so the HTTP response does not wait on
+    JSON parsing or job creation. A consumer task reads the log in order
+    and passes each delivery to ``handler``.
+    """
+
+    def __init__(self, log: WebhookLog, handler: WebhookHandler, secret: Optional[str] = None, deduper: Optional[DeliveryDeduper] = None, sync_interval: float = 0.05, retry_delay: float = 1.0):
+        self.log = log
+        self.handler = handler
+        self.secret = secret
+        self.deduper = deduper or DeliveryDeduper()
+        self.sync_interval = sync_interval
+        self.retry_delay = retry_delay
+
+        self._appended = asyncio.Event()
+        self._tasks = []
+        self.accepted = 0
+        self.duplicates = 0
+        self.processed = 0
+        self.failed = 0
+
+        # Deliveries still in the log were accepted before a restart
+        for _, header, _ in self.log.records(with_body=False):
+            self.deduper.add(header["delivery"], header["received_at"])
+
+    def ingest(self, delivery_id: str, event: str, body: bytes, signature: Optional[str] = None) -> bool:
+        """Verify and record a delivery; returns False for a duplicate"""
+        if self.secret:
+            verify_signature(self.secret, body, signature)
+
+        if self.deduper.seen(delivery_id):
+            self.duplicates += 1
+            return False
+
+        # Recorded only once it is in the log, so a delivery that failed to append is accepted on retry
+        self.log.append(delivery_id, event, body)
+        self.deduper.add(delivery_id)
+        self.accepted += 1
+        self._appended.set()
+
+        return True
+
+    async def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._consume()), asyncio.create_task(self._sync_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.log.close()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            self.log.sync()
+
+    async def _consume(self):
+        offset = self.log.read_offset()
+
+        while True:
+            self._appended.clear()
+
+            for end, header, body in self.log.records(offset):
+                await self._handle(header, body)
+                offset = end
+                self.log.write_offset(offset)
+
+            offset = self.log.compact(offset)
+            await self._appended.wait()
+
+    async def _handle(self, header: Dict[str, Any], body: bytes):
+        while True:
+            try:
+                await self.handler(header["event"], json.loads(body))
+                self.processed += 1
+                return
+            except RetryLater as e:
+                logger.info(f"Webhook {header['delivery']} deferred: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+            except Exception as e:
+                # A delivery that cannot be handled is dropped rather than blocking the ones behind it
+                self.failed += 1
+                logger.error(f"Webhook {header['delivery']} ({header['event']}) failed: {str(e)}")
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "processed": self.processed,
+            "failed": self.failed,
+            "log_bytes": self.log.size(),
+            "tracked_deliveries": len(self.deduper)
+        }
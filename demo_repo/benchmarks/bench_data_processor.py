@@ -0,0 +1,43 @@
+"""
+Benchmarks for the data processor, run by the agent before and after an optimization
+"""
+
+import random
+
+from src.data_processor import DataProcessor
+
+def make_items(count, offset=0, categories=None):
+    """Items spread over categories of about ten items each by default"""
+    categories = categories or max(1, count // 10)
+    return [
+        {
+            'id': offset + i,
+            'name': f'item-{offset + i}',
+            'category': f'category-{random.randrange(categories)}'
+        }
+        for i in range(count)
+    ]
+
+class ProcessItems:
+    target = "src/data_processor.py::DataProcessor.process_items"
+    sizes = [100, 1_000, 10_000, 100_000]
+
+    def setup(self, size):
+        self.processor = DataProcessor()
+        self.items = make_items(size)
+
+    def run(self):
+        return self.processor.process_items(self.items)
+
+class BulkProcess:
+    """Batches of 20 items; the size is the number of batches"""
+    target = "src/data_processor.py::DataProcessor.bulk_process"
+    sizes = [5, 25, 100, 500]
+
+    def setup(self, size):
+        self.processor = DataProcessor()
+        categories = max(1, size * 2)
+        self.batches = [make_items(20, offset=batch * 20, categories=categories) for batch in range(size)]
+
+    def run(self):
+        return self.processor.bulk_process(self.batches)
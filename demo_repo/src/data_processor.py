@@ -2,6 +2,51 @@
 Data processing module with intentional O(n²) performance issues
 """
 
+from collections.abc import Sequence
+
+def _indexable(value):
+    """True if value works as a dict key that matches exactly the values == matches"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return value == value
+
+class RelatedItems(Sequence):
+    """
+    The items related to one item: its category's items except those sharing its id
+    A view over the list shared by the whole category, so building one copies nothing
+    """
+    
+    __slots__ = ('_group', '_item_id', '_length', '_items')
+    
+    def __init__(self, group, item_id, length):
+        self._group = group
+        self._item_id = item_id
+        self._length = length
+        self._items = None
+    
+    def __len__(self):
+        return self._length
+    
+    def __iter__(self):
+        if self._items is not None:
+            return iter(self._items)
+        return (other for other in self._group if other.get('id') != self._item_id)
+    
+    def __getitem__(self, index):
+        if self._items is None:
+            self._items = list(iter(self))
+        return self._items[index]
+    
+    def __eq__(self, other):
+        if isinstance(other, (list, RelatedItems)):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    def __repr__(self):
+        return repr(list(self))
+
 class DataProcessor:
     def __init__(self):
         self.processed_count = 0
@@ -9,15 +54,65 @@ class DataProcessor:
     def process_items(self, items):
         """
         Process a list of items
-        Contains intentional O(n²) performance issue
+        Items are grouped by category once, so related counts take O(n)
+        """
+        groups = self._group_by_category(items)
+        if groups is None:
+            return self._process_items_pairwise(items)
+        
+        processed_items = []
+        
+        for item in items:
+            if item:
+                group, id_counts = groups.get(item.get('category'), ((), {}))
+                # Everything in the category except items sharing this one's id
+                related_items = RelatedItems(group, item.get('id'), len(group) - id_counts.get(item.get('id'), 0))
+            else:
+                related_items = RelatedItems((), None, 0)
+            
+            processed_item = {
+                'id': item.get('id'),
+                'name': item.get('name'),
+                'related_count': len(related_items),
+                'related_items': related_items
+            }
+            
+            processed_items.append(processed_item)
+        
+        self.processed_count += len(processed_items)
+        return processed_items
+    
+    def _group_by_category(self, items):
+        """
+        Map each category to its items, in input order, and a count of their ids
+        None if a category or id cannot be used as a dict key the way == compares it
+        """
+        groups = {}
+        
+        for item in items:
+            if not item:
+                continue
+            
+            category, item_id = item.get('category'), item.get('id')
+            if not (_indexable(category) and _indexable(item_id)):
+                return None
+            
+            group, id_counts = groups.setdefault(category, ([], {}))
+            group.append(item)
+            id_counts[item_id] = id_counts.get(item_id, 0) + 1
+        
+        return groups
+    
+    def _process_items_pairwise(self, items):
+        """
+        Compare every item with every other one, O(n²)
+        Only used when the items cannot be grouped by category
         """
         processed_items = []
         
-        # This is intentionally inefficient O(n²) algorithm
         for item in items:
             related_items = []
             
-            # Nested loop creates O(n²) complexity
             for other_item in items:
                 if self._are_related(item, other_item):
                     related_items.append(other_item)
@@ -4,12 +4,23 @@ Contains intentional issues for the autonomous agent to detect and fix.
 """
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from auth import AuthManager
-from data_processor import DataProcessor
+from data_processor import DataProcessor, RelatedItems
 from payment_service import PaymentService
 from validators import EmailValidator
 
+class JSONProvider(DefaultJSONProvider):
+    """Serializes related-item views exactly like the lists they stand for"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, RelatedItems):
+            return list(o)
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = JSONProvider(app)
 auth_manager = AuthManager()
 data_processor = DataProcessor()
 payment_service = PaymentService()
@@ -43,11 +54,10 @@ def validate_email():
 
 @app.route('/api/process-data', methods=['POST'])
 def process_data():
-    """Data processing endpoint - has O(n²) performance issue"""
+    """Data processing endpoint"""
     data = request.get_json()
     items = data.get('items', [])
     
-    # This uses inefficient O(n²) algorithm
     processed = data_processor.process_items(items)
     
     return jsonify({'processed_items': processed, 'count': len(processed)})
@@ -0,0 +1,50 @@
+"""
+Data processing tests - the category index must give the same results as comparing every pair
+"""
+
+import json
+import random
+import pytest
+from src.data_processor import DataProcessor
+
+def make_items(count, categories):
+    random.seed(count)
+    items = [
+        {'id': random.randrange(count), 'name': f'item-{i}', 'category': random.choice(categories)}
+        for i in range(count)
+    ]
+    # Items without an id or a category, empty ones and ids that compare equal across types
+    items += [{}, {'id': 3}, {'category': categories[0]}, {'id': 1.0, 'category': categories[0]}, {'id': True, 'category': categories[0]}]
+    random.shuffle(items)
+    return items
+
+class TestDataProcessor:
+    def setup_method(self):
+        self.processor = DataProcessor()
+
+    @pytest.mark.parametrize("categories", [['a', 'b', 'c'], ['a', None, 1, 1.0], ['only']])
+    def test_process_items_matches_pairwise(self, categories):
+        """Test that the indexed results equal the pairwise ones"""
+        items = make_items(200, categories)
+
+        processed = self.processor.process_items(items)
+        expected = self.processor._process_items_pairwise(items)
+
+        assert processed == expected
+        assert json.dumps(processed, default=list) == json.dumps(expected)
+
+    def test_related_items_support_indexing(self):
+        """Test that related items behave like the list they stand for"""
+        items = make_items(50, ['a', 'b'])
+
+        for processed, expected in zip(self.processor.process_items(items), self.processor._process_items_pairwise(items)):
+            related = processed['related_items']
+            assert list(related) == expected['related_items']
+            assert related[::-1] == expected['related_items'][::-1]
+
+    def test_unhashable_categories_fall_back_to_pairwise(self):
+        """Test items whose categories cannot be indexed"""
+        items = make_items(30, ['a', ['not', 'hashable']])
+
+        assert self.processor.process_items(items) == self.processor._process_items_pairwise(items)
+        assert self.processor.get_stats()['total_processed'] == 2 * len(items)
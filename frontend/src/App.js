@@ -91,6 +91,17 @@ function App() {
     }
   };
 
+  const handleDisconnectRepository = async (repoId) => {
+    try {
+      await apiService.disconnectRepository(repoId);
+      await loadRepositories();
+      return true;
+    } catch (error) {
+      console.error('Failed to disconnect repository:', error);
+      return false;
+    }
+  };
+
   const handleTriggerDemo = async () => {
     try {
       await apiService.triggerDemoCommit();
@@ -153,6 +164,7 @@ function App() {
                     <Repositories 
                       repositories={repositories}
                       onConnectRepository={handleConnectRepository}
+                      onDisconnectRepository={handleDisconnectRepository}
                       onRefresh={loadRepositories}
                     />
                   } 
@@ -226,11 +226,11 @@ const RunningJobCard = ({ job }) => (
       <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-accent-green"></div>
     </div>
     
-    {job.logs && job.logs.length > 0 && (
+    {job.last_log && (
       <div className="space-y-1">
         <p className="text-xs text-gray-500">Latest:</p>
         <p className="text-sm text-gray-300">
-          {formatters.truncateText(job.logs[job.logs.length - 1], 60)}
+          {formatters.truncateText(job.last_log, 60)}
         </p>
       </div>
     )}
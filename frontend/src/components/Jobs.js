@@ -1,6 +1,6 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { Activity, Clock, CheckCircle, AlertCircle, Eye, RefreshCw, Filter } from 'lucide-react';
-import { formatters } from '../services/api';
+import { apiService, formatters } from '../services/api';
 
 const Jobs = ({ jobs, onRefresh }) => {
   const [selectedJob, setSelectedJob] = useState(null);
@@ -169,15 +169,15 @@ const JobCard = ({ job, onViewDetails }) => {
         
         <div>
           <span className="text-gray-400">Logs</span>
-          <p className="text-white font-medium">{job.logs?.length || 0} entries</p>
+          <p className="text-white font-medium">{job.log_count || 0} entries</p>
         </div>
       </div>
       
-      {job.logs && job.logs.length > 0 && (
+      {job.last_log && (
         <div className="mt-4 pt-4 border-t border-app">
           <p className="text-xs text-gray-500 mb-2">Latest Log:</p>
           <p className="text-sm text-gray-300 bg-hover p-3 rounded-lg">
-            {formatters.truncateText(job.logs[job.logs.length - 1], 120)}
+            {formatters.truncateText(job.last_log, 120)}
           </p>
         </div>
       )}
@@ -194,7 +194,45 @@ const JobCard = ({ job, onViewDetails }) => {
   );
 };
 
-const JobDetailsModal = ({ job, onClose }) => {
+const JobDetailsModal = ({ job: summary, onClose }) => {
+  const [details, setDetails] = useState(null);
+
+  // The job list only carries summaries; logs and result are loaded for the selected job,
+  // then new log lines and status changes are streamed while it is still running
+  useEffect(() => {
+    let cancelled = false;
+    let unsubscribe = null;
+
+    apiService.getJob(summary.id)
+      .then(response => {
+        if (cancelled) return;
+        const job = response.job;
+        setDetails(job);
+
+        if (job.status === 'pending' || job.status === 'running') {
+          unsubscribe = apiService.subscribeToJob(job.id, {
+            offset: job.logs.length,
+            onLog: (event) => setDetails(current => ({ ...current, logs: [...current.logs, event.line] })),
+            onStatus: (event) => setDetails(current => ({
+              ...current,
+              status: event.status,
+              error: event.error,
+              completed_at: event.completed_at
+            })),
+            // The final result is only part of the full job
+            onEnd: () => apiService.getJob(job.id).then(final => { if (!cancelled) setDetails(final.job); })
+          });
+        }
+      })
+      .catch(error => console.error('Failed to load job details:', error));
+
+    return () => {
+      cancelled = true;
+      if (unsubscribe) unsubscribe();
+    };
+  }, [summary.id]);
+
+  const job = details || summary;
   const statusInfo = formatters.formatJobStatus(job.status);
   
   return (
@@ -279,7 +317,9 @@ const JobDetailsModal = ({ job, onClose }) => {
           {/* Logs */}
           <div>
             <h3 className="text-lg font-semibold text-white mb-4">Execution Logs</h3>
-            {job.logs && job.logs.length > 0 ? (
+            {!details ? (
+              <p className="text-gray-400 italic">Loading logs...</p>
+            ) : job.logs && job.logs.length > 0 ? (
               <div className="bg-hover rounded-lg p-4 font-mono text-sm max-h-96 overflow-y-auto">
                 {job.logs.map((log, index) => (
                   <div key={index} className="text-gray-300 mb-2">
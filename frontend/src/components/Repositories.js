@@ -1,8 +1,8 @@
 import React, { useState } from 'react';
-import { GitBranch, Plus, ExternalLink, Calendar, CheckCircle, AlertCircle } from 'lucide-react';
+import { GitBranch, Plus, ExternalLink, Calendar, CheckCircle, AlertCircle, Unlink } from 'lucide-react';
 import { formatters } from '../services/api';
 
-const Repositories = ({ repositories, onConnectRepository, onRefresh }) => {
+const Repositories = ({ repositories, onConnectRepository, onDisconnectRepository, onRefresh }) => {
   const [showConnectModal, setShowConnectModal] = useState(false);
   const [isConnecting, setIsConnecting] = useState(false);
   const [formData, setFormData] = useState({
@@ -77,7 +77,7 @@ const Repositories = ({ repositories, onConnectRepository, onRefresh }) => {
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
           {repositories.map((repo) => (
-            <RepositoryCard key={repo.id} repository={repo} />
+            <RepositoryCard key={repo.id} repository={repo} onDisconnect={onDisconnectRepository} />
           ))}
         </div>
       )}
@@ -168,7 +168,22 @@ const Repositories = ({ repositories, onConnectRepository, onRefresh }) => {
   );
 };
 
-const RepositoryCard = ({ repository }) => {
+const RepositoryCard = ({ repository, onDisconnect }) => {
+  const [isDisconnecting, setIsDisconnecting] = useState(false);
+
+  const handleDisconnect = async () => {
+    if (!window.confirm(`Disconnect ${repository.name}? Its past jobs will be kept.`)) {
+      return;
+    }
+
+    setIsDisconnecting(true);
+    try {
+      await onDisconnect(repository.id);
+    } finally {
+      setIsDisconnecting(false);
+    }
+  };
+
   return (
     <div className="bg-card rounded-lg p-6 border border-app hover:border-accent-green transition-colors">
       <div className="flex items-start justify-between mb-4">
@@ -214,6 +229,14 @@ const RepositoryCard = ({ repository }) => {
             <ExternalLink className="h-4 w-4" />
             <span>View Repository</span>
           </button>
+          <button
+            onClick={handleDisconnect}
+            disabled={isDisconnecting}
+            className="flex items-center justify-center space-x-2 px-3 py-2 bg-hover hover:bg-red-400/10 text-gray-300 hover:text-red-400 disabled:opacity-50 rounded-lg transition-colors text-sm"
+          >
+            <Unlink className="h-4 w-4" />
+            <span>{isDisconnecting ? 'Disconnecting...' : 'Disconnect'}</span>
+          </button>
         </div>
       </div>
     </div>
@@ -34,6 +34,9 @@ api.interceptors.response.use(
   }
 );
 
+// Last job list response per query, keyed by its parameters
+const jobListCache = new Map();
+
 export const apiService = {
   // Repository endpoints
   async getRepositories() {
@@ -46,9 +49,30 @@ export const apiService = {
     return response.data;
   },
 
+  async disconnectRepository(repoId) {
+    const response = await api.delete(`/repositories/${repoId}`);
+    return response.data;
+  },
+
   // Job endpoints
-  async getJobs() {
-    const response = await api.get('/jobs');
+  async getJobs(params = {}) {
+    // Revalidate with the last ETag so unchanged job lists come back as an empty 304
+    const key = JSON.stringify(params);
+    const cached = jobListCache.get(key);
+    const response = await api.get('/jobs', {
+      params,
+      paramsSerializer: { indexes: null },
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+    });
+
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+
+    if (response.headers.etag) {
+      jobListCache.set(key, { etag: response.headers.etag, data: response.data });
+    }
     return response.data;
   },
 
@@ -57,6 +81,21 @@ export const apiService = {
     return response.data;
   },
 
+  // Live job events; EventSource reconnects by itself and resumes from the last received line
+  subscribeToJob(jobId, { offset = 0, onLog, onStatus, onEnd } = {}) {
+    const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events?offset=${offset}`);
+
+    source.addEventListener('log', (event) => onLog && onLog(JSON.parse(event.data)));
+    source.addEventListener('status', (event) => onStatus && onStatus(JSON.parse(event.data)));
+    source.addEventListener('end', (event) => {
+      source.close();
+      if (onEnd) onEnd(JSON.parse(event.data));
+    });
+    source.onerror = () => console.warn(`Job event stream for ${jobId} interrupted, reconnecting`);
+
+    return () => source.close();
+  },
+
   // Dashboard endpoints
   async getDashboardStats() {
     const response = await api.get('/dashboard/stats');